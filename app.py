@@ -1,15 +1,37 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import os
 import json
-import requests
 import re
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-from supabase import create_client, Client
+import importlib
+import importlib.util
+import multiprocessing
+import zipfile
+import gzip
+import struct
+import hashlib
+import textwrap
+from datetime import datetime, timedelta, timezone
+from flask import Flask, Blueprint, Response, make_response, send_file, send_from_directory, render_template, request, jsonify, session, redirect, url_for, stream_with_context
+import click
 import sqlite3
 import threading
-import jwt
-import bcrypt
+import queue
+import atexit
+import contextvars
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FuturesTimeout, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
 from functools import wraps
+from urllib.parse import urlparse
+from html import unescape as html_unescape
+from markupsafe import escape
+from werkzeug.utils import safe_join
 
 # Optional imports for professional APIs (graceful fallback if not installed)
 try:
@@ -18,38 +40,112 @@ try:
 except ImportError:
     print("Note: python-dotenv not installed. Create .env file manually for API keys.")
 
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    print("Note: google-generativeai not installed. Using demo mode for AI analysis.")
-    genai = None
-    GEMINI_AVAILABLE = False
+# === PROVIDER REGISTRY ===
+# Heavy SDKs are imported on first use instead of at startup, so processes that
+# only serve pages or auth never pay for Gemini, Reddit or Supabase imports.
 
-try:
-    import praw
-    REDDIT_AVAILABLE = True
-except ImportError:
-    print("Note: praw not installed. Using demo mode for Reddit sentiment.")
-    praw = None
-    REDDIT_AVAILABLE = False
+PROVIDERS = {
+    'supabase': {
+        'module': 'supabase',
+        'missing': "Note: supabase not installed. Supabase storage disabled."
+    },
+    'gemini': {
+        'module': 'google.generativeai',
+        'missing': "Note: google-generativeai not installed. Using demo mode for AI analysis."
+    },
+    'reddit': {
+        'module': 'praw',
+        'missing': "Note: praw not installed. Using demo mode for Reddit sentiment."
+    },
+    'jwt': {
+        'module': 'jwt',
+        'missing': "Note: PyJWT not installed. Token authentication unavailable."
+    },
+    'bcrypt': {
+        'module': 'bcrypt',
+        'missing': "Note: bcrypt not installed. Password authentication unavailable."
+    },
+    'requests': {
+        'module': 'requests',
+        'missing': "Note: requests not installed. External API calls disabled."
+    },
+    'numpy': {
+        'module': 'numpy',
+        'missing': "Note: numpy not installed. Using demo mode for sentiment scoring."
+    },
+    'bs4': {
+        'module': 'bs4',
+        'missing': "Note: beautifulsoup4 not installed. Competitor pages will not be parsed."
+    },
+    'feedparser': {
+        'module': 'feedparser',
+        'missing': "Note: feedparser not installed. Trend ingestion disabled."
+    },
+    'weasyprint': {
+        'module': 'weasyprint',
+        'missing': "Note: weasyprint not installed. PDF exports use the built-in text renderer."
+    }
+}
+
+_provider_state = {}
+_provider_lock = threading.Lock()
 
-app = Flask(__name__)
-app.secret_key = 'nexus_mvp_2024_secure_key'
+def get_provider(name):
+    """Return the SDK module for a provider, importing it on first use (None if unavailable)"""
+    state = _provider_state.get(name)
+    if state is None:
+        with _provider_lock:
+            state = _provider_state.get(name)
+            if state is None:
+                spec = PROVIDERS[name]
+                started = time.perf_counter()
+                try:
+                    module, error = importlib.import_module(spec['module']), None
+                except ImportError as e:
+                    module, error = None, str(e)
+                    print(spec['missing'])
+                state = {
+                    'module': module,
+                    'error': error,
+                    'seconds': time.perf_counter() - started,
+                    'loaded_at': datetime.now().isoformat()
+                }
+                _provider_state[name] = state
+    return state['module']
+
+class ProviderUnavailable(Exception):
+    """Raised when a request needs a provider SDK that is not installed (answered with a 503)"""
+
+def require_provider(name):
+    """Like get_provider(), but raise ProviderUnavailable instead of returning None"""
+    module = get_provider(name)
+    if module is None:
+        raise ProviderUnavailable(f"Server misconfigured: the '{PROVIDERS[name]['module']}' package is not installed")
+    return module
+
+def provider_import_report():
+    """Report which providers have been loaded in this process and what each import cost"""
+    providers = []
+    for name, spec in PROVIDERS.items():
+        state = _provider_state.get(name)
+        providers.append({
+            'name': name,
+            'module': spec['module'],
+            'loaded': bool(state and state['module']),
+            'available': state['module'] is not None if state else None,
+            'import_seconds': round(state['seconds'], 4) if state else None,
+            'loaded_at': state['loaded_at'] if state else None,
+            'error': state['error'] if state else None
+        })
+    return {
+        'app_import_seconds': round(APP_IMPORT_SECONDS, 4),
+        'providers': providers
+    }
 
 # Supabase Configuration
 SUPABASE_URL = os.getenv('SUPABASE_URL', 'demo_url')
 SUPABASE_KEY = os.getenv('SUPABASE_ANON_KEY', 'demo_key')
 
-# Initialize Supabase client
-supabase: Client = None
-if SUPABASE_URL != 'demo_url' and SUPABASE_KEY != 'demo_key':
-    try:
-        supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-        print("✅ Supabase configured successfully")
-    except Exception as e:
-        print(f"⚠️ Supabase configuration failed: {e}")
-
 # API Configuration
 BRAVE_API_KEY = os.getenv('BRAVE_API_KEY', 'demo_key')
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', 'demo_key')
@@ -58,29 +154,22 @@ REDDIT_CLIENT_SECRET = os.getenv('REDDIT_CLIENT_SECRET', 'demo_secret')
 REDDIT_USER_AGENT = os.getenv('REDDIT_USER_AGENT', 'nexus_intelligence_bot/1.0')
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN', 'demo_token')
 
-# Initialize APIs conditionally
-if GEMINI_AVAILABLE and genai and GEMINI_API_KEY != 'demo_key':
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        print("✅ Gemini AI configured successfully")
-    except Exception as e:
-        print(f"⚠️ Gemini AI configuration failed: {e}")
+# Auth / storage configuration
+SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'nexus_mvp_2024_secure_key')
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', SECRET_KEY)
+JWT_ALGORITHM = 'HS256'
+JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', '24'))
+DATABASE_PATH = os.getenv('NEXUS_DB_PATH', 'nexus_data.db')
 
-# Reddit API setup
+# Outbound API clients. These are built per process by init_process_resources()
+# (never at import time) so a preloaded master can fork workers without sharing
+# sockets or gRPC channels between them.
+supabase = None
 reddit = None
-if REDDIT_AVAILABLE and praw and REDDIT_CLIENT_ID != 'demo_id':
-    try:
-        reddit = praw.Reddit(
-            client_id=REDDIT_CLIENT_ID,
-            client_secret=REDDIT_CLIENT_SECRET,
-            user_agent=REDDIT_USER_AGENT
-        )
-        print("✅ Reddit API configured successfully")
-    except Exception as e:
-        print(f"⚠️ Reddit API configuration failed: {e}")
-        reddit = None
+_process_state = {'pid': None}
+_process_lock = threading.Lock()
 
-print("🚀 Nexus MVP - Project Roadmap Generator")
+bp = Blueprint('nexus', __name__, cli_group=None)
 
 # === AUTHENTICATION HELPERS ===
 
@@ -100,25 +189,793 @@ def get_user_usage_limits():
     if not user:
         return {'max_projects': 1, 'current_projects': 0}
     
-    # Get user's project count from Supabase
-    if supabase:
+    # Limits come from the user's plan; usage from the denormalized counter
+    return get_project_usage(user['id'])
+
+# === REDDIT SENTIMENT PIPELINE ===
+# Submissions and comments for an idea's keywords stream through generators in
+# fixed-size batches; each batch is scored in one NumPy pass against the
+# lexicon and folded into running totals, so memory does not grow with the
+# number of posts. NEXUS_REDDIT_FIXTURE replays a recorded NDJSON stream.
+
+REDDIT_POST_LIMIT = int(os.getenv('NEXUS_REDDIT_POST_LIMIT', '100'))
+REDDIT_COMMENTS_PER_POST = int(os.getenv('NEXUS_REDDIT_COMMENTS_PER_POST', '10'))
+# Comment trees cost one request per submission, so only the top posts get them
+REDDIT_COMMENT_POSTS = int(os.getenv('NEXUS_REDDIT_COMMENT_POSTS', '10'))
+# Report generation stops reading Reddit after this long and scores what it has
+REDDIT_BUDGET_SECONDS = float(os.getenv('NEXUS_REDDIT_BUDGET_SECONDS', '8'))
+REDDIT_FIXTURE = os.getenv('NEXUS_REDDIT_FIXTURE')
+SENTIMENT_BATCH_SIZE = 256
+PAIN_POINT_EXAMPLES = 3
+
+SENTIMENT_LEXICON = {
+    'love': 1.0, 'great': 0.8, 'awesome': 0.9, 'amazing': 0.9, 'excellent': 0.9, 'good': 0.5,
+    'useful': 0.6, 'helpful': 0.6, 'easy': 0.5, 'recommend': 0.7, 'best': 0.7, 'works': 0.3,
+    'hate': -1.0, 'terrible': -0.9, 'awful': -0.9, 'worst': -0.9, 'bad': -0.6, 'annoying': -0.7,
+    'frustrating': -0.8, 'useless': -0.8, 'broken': -0.7, 'buggy': -0.7, 'slow': -0.5,
+    'expensive': -0.5, 'overpriced': -0.7, 'confusing': -0.6, 'clunky': -0.6, 'crash': -0.7,
+    'crashes': -0.7, 'missing': -0.4, 'lacks': -0.5, 'wish': -0.2, 'disappointed': -0.7
+}
+
+PAIN_POINT_LEXICON = {
+    'Existing solutions are too expensive': ['expensive', 'overpriced', 'pricey', 'subscription', 'cost', 'costs'],
+    'Current tools are hard to use': ['confusing', 'clunky', 'complicated', 'unintuitive', 'cluttered'],
+    'Important features are missing': ['missing', 'lacks', 'wish', 'doesnt', 'cant'],
+    'Products are unreliable or buggy': ['buggy', 'broken', 'crash', 'crashes', 'glitch', 'unreliable'],
+    'Performance is too slow': ['slow', 'laggy', 'lag', 'loading'],
+    'Poor support and communication': ['support', 'ignored', 'unresponsive', 'refund']
+}
+
+_SENTIMENT_VOCAB = sorted(set(SENTIMENT_LEXICON) | {w for words in PAIN_POINT_LEXICON.values() for w in words})
+_SENTIMENT_INDEX = {word: i for i, word in enumerate(_SENTIMENT_VOCAB)}
+_PAIN_POINT_NAMES = list(PAIN_POINT_LEXICON)
+
+def idea_keywords(project_idea, limit=4):
+    """Pick the search keywords for an idea from its normalized shingles"""
+    keywords = []
+    for word in re.findall(r'[a-z0-9]+', project_idea.lower()):
+        for shingle in idea_shingles(word):
+            if shingle not in keywords:
+                keywords.append(shingle)
+    return keywords[:limit]
+
+def iter_reddit_posts(keywords, budget_seconds=None):
+    """Yield {'text', 'score', 'kind'} for matching submissions and their top comments.
+
+    Stops once `budget_seconds` (default NEXUS_REDDIT_BUDGET_SECONDS; 0 for
+    no limit) have passed, so a slow Reddit API can't hold up a report.
+    """
+    if REDDIT_FIXTURE:
+        yield from iter_recorded_reddit_posts(REDDIT_FIXTURE)
+        return
+
+    ensure_process_resources()
+    if reddit is None or not keywords:
+        return
+
+    budget_seconds = REDDIT_BUDGET_SECONDS if budget_seconds is None else budget_seconds
+    deadline = time.monotonic() + budget_seconds if budget_seconds > 0 else None
+    submissions = reddit.subreddit('all').search(' '.join(keywords), sort='relevance',
+                                                 time_filter='year', limit=REDDIT_POST_LIMIT)
+    for position, submission in enumerate(submissions):
+        if deadline is not None and time.monotonic() > deadline:
+            print(f"⚠️ Reddit budget of {budget_seconds}s spent after {position} posts; scoring what was read")
+            return
+        yield {
+            'text': f"{submission.title}\n{submission.selftext or ''}",
+            'score': submission.score,
+            'kind': 'submission'
+        }
+        if REDDIT_COMMENTS_PER_POST and position < REDDIT_COMMENT_POSTS:
+            submission.comment_sort = 'top'
+            submission.comments.replace_more(limit=0)
+            for comment in submission.comments[:REDDIT_COMMENTS_PER_POST]:
+                yield {'text': comment.body, 'score': comment.score, 'kind': 'comment'}
+
+def iter_recorded_reddit_posts(path):
+    """Replay posts recorded with `flask record-reddit`"""
+    with open(path, encoding='utf-8') as fixture:
+        for line in fixture:
+            if line.strip():
+                yield json.loads(line)
+
+def iter_batches(items, size):
+    """Group an iterator into lists of at most `size` items"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def score_sentiment_batch(np, texts):
+    """Score a batch of texts in one vectorized pass.
+
+    Returns (sentiment, pain_hits): sentiment is one score in [-1, 1] per
+    text; pain_hits is a boolean texts x pain-point matrix.
+    """
+    rows, cols, lengths = [], [], []
+    for row, text in enumerate(texts):
+        tokens = re.findall(r"[a-z]+", text.lower().replace("'", ''))
+        lengths.append(len(tokens))
+        for token in tokens:
+            col = _SENTIMENT_INDEX.get(token)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    counts = np.zeros((len(texts), len(_SENTIMENT_VOCAB)), dtype=np.float32)
+    np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)), 1.0)
+
+    weights, pain_matrix = _sentiment_weights(np)
+    raw = counts @ weights
+    hits = np.maximum(counts.sum(axis=1), 1.0)
+    sentiment = np.clip(raw / np.sqrt(hits), -1.0, 1.0)
+    sentiment[np.asarray(lengths) == 0] = 0.0
+    pain_hits = (counts @ pain_matrix) > 0
+    return sentiment, pain_hits
+
+_sentiment_weight_cache = {}
+
+def _sentiment_weights(np):
+    """Lexicon weight vector and vocab x pain-point matrix (built once per process)"""
+    if 'weights' not in _sentiment_weight_cache:
+        weights = np.array([SENTIMENT_LEXICON.get(w, 0.0) for w in _SENTIMENT_VOCAB], dtype=np.float32)
+        pain_matrix = np.zeros((len(_SENTIMENT_VOCAB), len(_PAIN_POINT_NAMES)), dtype=np.float32)
+        for j, name in enumerate(_PAIN_POINT_NAMES):
+            for word in PAIN_POINT_LEXICON[name]:
+                pain_matrix[_SENTIMENT_INDEX[word], j] = 1.0
+        _sentiment_weight_cache['weights'] = (weights, pain_matrix)
+    return _sentiment_weight_cache['weights']
+
+def analyze_reddit_sentiment(posts):
+    """Fold a stream of posts into sentiment and pain-point aggregates.
+
+    Only running totals and a few example quotes per pain point are kept, so
+    memory is constant in the number of posts. Returns None if NumPy is
+    unavailable or no posts were seen.
+    """
+    np = get_provider('numpy')
+    if np is None:
+        return None
+
+    total = 0
+    weight_sum = 0.0
+    weighted_sentiment = 0.0
+    negative = positive = 0
+    pain_counts = np.zeros(len(_PAIN_POINT_NAMES), dtype=np.int64)
+    examples = {name: [] for name in _PAIN_POINT_NAMES}
+
+    for batch in iter_batches(posts, SENTIMENT_BATCH_SIZE):
+        texts = [post.get('text') or '' for post in batch]
+        sentiment, pain_hits = score_sentiment_batch(np, texts)
+        engagement = np.log1p(np.maximum([post.get('score') or 0 for post in batch], 0)) + 1.0
+
+        total += len(batch)
+        weight_sum += float(engagement.sum())
+        weighted_sentiment += float((sentiment * engagement).sum())
+        negative += int((sentiment < -0.1).sum())
+        positive += int((sentiment > 0.1).sum())
+        pain_counts += pain_hits.sum(axis=0)
+
+        for row, col in zip(*np.nonzero(pain_hits)):
+            quotes = examples[_PAIN_POINT_NAMES[col]]
+            quote = texts[row].strip().splitlines()[0][:200]
+            if len(quotes) < PAIN_POINT_EXAMPLES and quote not in quotes:
+                quotes.append(quote)
+
+    if total == 0:
+        return None
+
+    return {
+        'posts_analyzed': total,
+        'average_sentiment': round(weighted_sentiment / weight_sum, 3),
+        'negative_share': round(negative / total, 3),
+        'positive_share': round(positive / total, 3),
+        'pain_points': [
+            {'pain_point': _PAIN_POINT_NAMES[i], 'mentions': int(pain_counts[i]),
+             'examples': examples[_PAIN_POINT_NAMES[i]]}
+            for i in np.argsort(-pain_counts) if pain_counts[i] > 0
+        ]
+    }
+
+def compute_opportunity_score(sentiment):
+    """Score 1-10 from discussion volume, pain-point density and dissatisfaction"""
+    total = sentiment['posts_analyzed']
+    mentions = sum(p['mentions'] for p in sentiment['pain_points'])
+    volume = min(1.0, (total ** 0.5) / 30)
+    pain_density = min(1.0, mentions / total)
+    dissatisfaction = sentiment['negative_share']
+    score = 1 + 9 * (0.35 * volume + 0.40 * pain_density + 0.25 * dissatisfaction)
+    return round(min(10.0, max(1.0, score)), 1)
+
+# === TECHNOLOGY POPULARITY INDEX ===
+# A local snapshot of GitHub stats (stars, recent commits, issue velocity) per
+# candidate technology. It is refreshed out of band with conditional requests,
+# so unchanged resources come back as 304s that do not count against the
+# API quota, and report generation only reads the snapshot.
+
+GITHUB_API_URL = 'https://api.github.com'
+TECH_INDEX_REFRESH_HOURS = float(os.getenv('NEXUS_TECH_INDEX_REFRESH_HOURS', '0'))
+TECH_INDEX_MEMORY_TTL = 60
+GITHUB_PAGE_SIZE = 100
+# Upper bound on issue pages read per repo (GITHUB_PAGE_SIZE entries each)
+TECH_ISSUE_MAX_PAGES = int(os.getenv('NEXUS_TECH_ISSUE_MAX_PAGES', '10'))
+
+TECH_CANDIDATES = {
+    'React': {'repo': 'facebook/react', 'layer': 'frontend'},
+    'Vue.js': {'repo': 'vuejs/core', 'layer': 'frontend'},
+    'Angular': {'repo': 'angular/angular', 'layer': 'frontend'},
+    'Svelte': {'repo': 'sveltejs/svelte', 'layer': 'frontend'},
+    'Next.js': {'repo': 'vercel/next.js', 'layer': 'frontend'},
+    'Node.js with Express': {'repo': 'expressjs/express', 'layer': 'backend'},
+    'Python with FastAPI': {'repo': 'fastapi/fastapi', 'layer': 'backend'},
+    'Django': {'repo': 'django/django', 'layer': 'backend'},
+    'Go': {'repo': 'golang/go', 'layer': 'backend'},
+    'PHP with Laravel': {'repo': 'laravel/framework', 'layer': 'backend'},
+    'PostgreSQL': {'repo': 'postgres/postgres', 'layer': 'database'},
+    'MongoDB': {'repo': 'mongodb/mongo', 'layer': 'database'},
+    'MySQL': {'repo': 'mysql/mysql-server', 'layer': 'database'},
+    'Supabase': {'repo': 'supabase/supabase', 'layer': 'database'}
+}
+
+_tech_index_cache = {'loaded_at': 0.0, 'scores': {}}
+_tech_refresher = {'thread': None}
+
+def github_get(url, params=None):
+    """GET a GitHub API resource, revalidating the stored copy with If-None-Match.
+
+    Returns (status, body) where status is 'fresh', 'not_modified' or
+    'pending' (GitHub is still computing statistics), or (None, None) on error.
+    """
+    requests = get_provider('requests')
+    if requests is None:
+        return None, None
+
+    cache_key = url + ('?' + '&'.join(f'{k}={v}' for k, v in sorted(params.items())) if params else '')
+    conn = connect_db()
+    try:
+        row = conn.execute('SELECT etag, body FROM github_etags WHERE url = ?', (cache_key,)).fetchone()
+        headers = {'Accept': 'application/vnd.github+json'}
+        if GITHUB_TOKEN != 'demo_token':
+            headers['Authorization'] = f'Bearer {GITHUB_TOKEN}'
+        if row:
+            headers['If-None-Match'] = row[0]
+
         try:
-            result = supabase.table('projects').select('id').eq('user_id', user['id']).execute()
-            current_projects = len(result.data)
-        except:
-            current_projects = 0
-    else:
-        current_projects = 0
-    
-    # Free users get 3 projects, premium users get unlimited
-    max_projects = 3 if user.get('plan', 'free') == 'free' else 999
-    
+            response = requests.get(url, params=params, headers=headers, timeout=10)
+        except requests.RequestException as e:
+            print(f"GitHub request failed for {url}: {e}")
+            return None, None
+
+        if response.status_code == 304 and row:
+            return 'not_modified', json.loads(row[1])
+        if response.status_code == 202:
+            return 'pending', json.loads(row[1]) if row else None
+        if response.status_code != 200:
+            print(f"GitHub returned {response.status_code} for {url}")
+            return None, None
+
+        body = response.json()
+        if response.headers.get('ETag'):
+            conn.execute('''
+                INSERT OR REPLACE INTO github_etags (url, etag, body, fetched_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (cache_key, response.headers['ETag'], json.dumps(body)))
+            conn.commit()
+        return 'fresh', body
+    finally:
+        conn.close()
+
+def count_recent_issues(repo, since):
+    """Issues (pull requests excluded) updated since `since`, paging up to TECH_ISSUE_MAX_PAGES"""
+    count = 0
+    for page in range(1, TECH_ISSUE_MAX_PAGES + 1):
+        _, issues = github_get(f'{GITHUB_API_URL}/repos/{repo}/issues',
+                               {'state': 'all', 'since': since, 'per_page': GITHUB_PAGE_SIZE, 'page': page})
+        if not issues:
+            break
+        # The issues API also lists pull requests; those carry a `pull_request` key
+        count += sum(1 for issue in issues if 'pull_request' not in issue)
+        if len(issues) < GITHUB_PAGE_SIZE:
+            break
+    return count
+
+def fetch_tech_stats(repo):
+    """Collect stars, 4-week commit count and 30-day issue velocity for one repo"""
+    _, info = github_get(f'{GITHUB_API_URL}/repos/{repo}')
+    if not info:
+        return None
+    _, participation = github_get(f'{GITHUB_API_URL}/repos/{repo}/stats/participation')
+    # Day-granular `since` keeps the URL (and so its ETag) stable within a day
+    since = (datetime.utcnow() - timedelta(days=30)).strftime('%Y-%m-%dT00:00:00Z')
+
     return {
-        'max_projects': max_projects,
-        'current_projects': current_projects,
-        'can_create': current_projects < max_projects
+        'stars': info.get('stargazers_count', 0),
+        'forks': info.get('forks_count', 0),
+        'open_issues': info.get('open_issues_count', 0),
+        'commits_4w': sum((participation or {}).get('all', [])[-4:]),
+        'issues_30d': count_recent_issues(repo, since)
+    }
+
+def refresh_tech_popularity_index():
+    """Refresh every candidate's stats and recompute the snapshot scores"""
+    refreshed = 0
+    stats = {}
+    for tech, candidate in TECH_CANDIDATES.items():
+        result = fetch_tech_stats(candidate['repo'])
+        if result:
+            stats[tech] = result
+            refreshed += 1
+
+    if not stats:
+        return 0
+
+    # Score each signal relative to the best candidate in the same layer
+    scores = {}
+    for layer in {c['layer'] for c in TECH_CANDIDATES.values()}:
+        techs = [t for t in stats if TECH_CANDIDATES[t]['layer'] == layer]
+        if not techs:
+            continue
+        max_stars = max(stats[t]['stars'] for t in techs) or 1
+        max_commits = max(stats[t]['commits_4w'] for t in techs) or 1
+        max_issues = max(stats[t]['issues_30d'] for t in techs) or 1
+        for t in techs:
+            s = stats[t]
+            scores[t] = round(100 * (0.5 * (s['stars'] / max_stars) ** 0.5 +
+                                     0.3 * s['commits_4w'] / max_commits +
+                                     0.2 * s['issues_30d'] / max_issues), 1)
+
+    with db_lock:
+        conn = connect_db()
+        conn.executemany('''
+            INSERT OR REPLACE INTO tech_popularity
+                (technology, repo, layer, stars, forks, open_issues, commits_4w, issues_30d, score, refreshed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', [(t, TECH_CANDIDATES[t]['repo'], TECH_CANDIDATES[t]['layer'], s['stars'], s['forks'],
+               s['open_issues'], s['commits_4w'], s['issues_30d'], scores.get(t, 0.0))
+              for t, s in stats.items()])
+        conn.commit()
+        conn.close()
+
+    _tech_index_cache['loaded_at'] = 0.0
+    return refreshed
+
+def get_tech_popularity():
+    """Return {technology: snapshot row}, served from memory between reloads"""
+    if time.monotonic() - _tech_index_cache['loaded_at'] > TECH_INDEX_MEMORY_TTL:
+        try:
+            conn = connect_db()
+            rows = conn.execute('''
+                SELECT technology, stars, commits_4w, issues_30d, score, refreshed_at FROM tech_popularity
+            ''').fetchall()
+            conn.close()
+            _tech_index_cache['scores'] = {
+                r[0]: {'stars': r[1], 'commits_4w': r[2], 'issues_30d': r[3], 'score': r[4], 'refreshed_at': r[5]}
+                for r in rows
+            }
+        except sqlite3.Error as e:
+            print(f"Error loading tech popularity index: {e}")
+        _tech_index_cache['loaded_at'] = time.monotonic()
+    return _tech_index_cache['scores']
+
+def tech_index_is_stale():
+    """True when the snapshot is missing or older than the refresh interval"""
+    conn = connect_db()
+    try:
+        row = conn.execute('''
+            SELECT MIN(refreshed_at) < datetime('now', ?) OR COUNT(*) = 0 FROM tech_popularity
+        ''', (f'-{TECH_INDEX_REFRESH_HOURS} hours',)).fetchone()
+        return bool(row[0])
+    finally:
+        conn.close()
+
+def apply_tech_popularity(stack):
+    """Annotate a tech stack with snapshot scores and rank alternatives by them"""
+    popularity = get_tech_popularity()
+    if not popularity:
+        return stack
+
+    for choice in stack.values():
+        if not isinstance(choice, dict) or 'primary' not in choice:
+            continue
+        if choice['primary'] in popularity:
+            choice['popularity_score'] = popularity[choice['primary']]['score']
+        choice['alternatives'] = sorted(
+            choice['alternatives'],
+            key=lambda tech: -popularity.get(tech, {}).get('score', -1)
+        )
+    stack['popularity_snapshot'] = max(row['refreshed_at'] for row in popularity.values())
+    return stack
+
+def start_tech_index_refresher():
+    """Start a daemon thread that refreshes a stale snapshot every interval"""
+    if TECH_INDEX_REFRESH_HOURS <= 0:
+        return
+    thread = _tech_refresher['thread']
+    if thread is not None and thread.is_alive():
+        return
+
+    def run():
+        while True:
+            try:
+                if tech_index_is_stale():
+                    print(f"✅ Tech popularity index refreshed ({refresh_tech_popularity_index()} technologies)")
+            except Exception as e:
+                print(f"⚠️ Tech popularity refresh failed: {e}")
+            time.sleep(TECH_INDEX_REFRESH_HOURS * 3600)
+
+    _tech_refresher['thread'] = threading.Thread(target=run, name='tech-index-refresher', daemon=True)
+    _tech_refresher['thread'].start()
+
+# === TECH STACK SCORING ENGINE ===
+# Every candidate technology has a feature vector (affordability, ease of
+# learning, scalability, mobile fit, web fit, ecosystem) plus its normalized
+# GitHub popularity from the snapshot above. An idea and any refinement
+# modifiers become one weight vector, and all candidates are scored with a
+# single matrix-vector product; the best candidate per layer is recommended.
+
+TECH_LAYERS = ('frontend', 'backend', 'database', 'deployment')
+TECH_FEATURES = ('affordability', 'ease_of_learning', 'scalability', 'mobile_fit', 'web_fit', 'ecosystem')
+
+TECH_KNOWLEDGE_BASE = [
+    # name, layer, features (same order as TECH_FEATURES), reasoning, supporting tools
+    ('React', 'frontend', (1.0, 0.6, 0.8, 0.5, 1.0, 1.0),
+     'Large ecosystem, excellent documentation, industry standard', ['TypeScript', 'Tailwind CSS', 'Vite']),
+    ('Next.js', 'frontend', (1.0, 0.55, 0.9, 0.5, 1.0, 0.85),
+     'React with server rendering and routing built in', ['TypeScript', 'Tailwind CSS', 'Vercel Analytics']),
+    ('Vue.js', 'frontend', (1.0, 0.8, 0.7, 0.4, 0.9, 0.7),
+     'Gentle learning curve with a batteries-included ecosystem', ['Pinia', 'Vite', 'Vuetify']),
+    ('Angular', 'frontend', (1.0, 0.35, 0.9, 0.4, 0.9, 0.7),
+     'Opinionated framework suited to large teams and enterprise apps', ['RxJS', 'Angular Material', 'Nx']),
+    ('Svelte', 'frontend', (1.0, 0.85, 0.65, 0.4, 0.85, 0.45),
+     'Minimal boilerplate and very small bundles', ['SvelteKit', 'Vite', 'Skeleton UI']),
+    ('React Native', 'frontend', (1.0, 0.5, 0.7, 1.0, 0.3, 0.75),
+     'Native iOS and Android apps from one JavaScript codebase', ['Expo', 'TypeScript', 'React Navigation']),
+    ('Flutter', 'frontend', (1.0, 0.5, 0.75, 1.0, 0.4, 0.7),
+     'Polished cross-platform mobile UI from a single Dart codebase', ['Dart', 'Riverpod', 'Firebase SDK']),
+    ('Node.js with Express', 'backend', (1.0, 0.7, 0.7, 0.7, 0.9, 1.0),
+     'JavaScript ecosystem consistency, scalable, extensive libraries',
+     ['JWT for auth', 'Helmet for security', 'Morgan for logging']),
+    ('Python with FastAPI', 'backend', (1.0, 0.75, 0.75, 0.7, 0.8, 0.75),
+     'Fast to write, typed request validation, great for data/AI features', ['Pydantic', 'SQLAlchemy', 'Uvicorn']),
+    ('Django', 'backend', (1.0, 0.6, 0.75, 0.6, 0.9, 0.8),
+     'Admin, auth and ORM included; productive for CRUD-heavy products', ['Django REST Framework', 'Celery', 'Gunicorn']),
+    ('Go', 'backend', (1.0, 0.4, 1.0, 0.7, 0.7, 0.6),
+     'High throughput and low memory for services that must scale', ['Gin', 'sqlc', 'Prometheus client']),
+    ('PHP with Laravel', 'backend', (1.0, 0.65, 0.6, 0.5, 0.85, 0.7),
+     'Mature full-stack framework with cheap, ubiquitous hosting', ['Eloquent ORM', 'Laravel Sanctum', 'Horizon']),
+    ('Firebase Cloud Functions', 'backend', (0.7, 0.85, 0.8, 0.9, 0.6, 0.7),
+     'Serverless backend with no servers to manage, ideal for mobile apps', ['Firebase Auth', 'Cloud Scheduler', 'Emulator Suite']),
+    ('PostgreSQL', 'database', (0.9, 0.6, 0.9, 0.6, 0.9, 1.0),
+     'Robust, scalable, excellent for complex queries', ['Prisma ORM', 'Redis for caching']),
+    ('MongoDB', 'database', (0.8, 0.75, 0.8, 0.7, 0.8, 0.8),
+     'Flexible documents for fast-changing data models', ['Mongoose', 'MongoDB Atlas']),
+    ('MySQL', 'database', (0.9, 0.65, 0.8, 0.6, 0.85, 0.85),
+     'Widely hosted relational database with simple operations', ['PlanetScale', 'Prisma ORM']),
+    ('Supabase', 'database', (0.85, 0.85, 0.75, 0.8, 0.9, 0.65),
+     'Hosted Postgres with auth, storage and realtime out of the box', ['Supabase Auth', 'Row Level Security']),
+    ('SQLite', 'database', (1.0, 0.95, 0.3, 0.7, 0.6, 0.7),
+     'Zero-ops embedded database, perfect for prototypes and small apps', ['Litestream', 'Drizzle ORM']),
+    ('Firebase Firestore', 'database', (0.7, 0.85, 0.8, 1.0, 0.6, 0.7),
+     'Realtime document store with offline sync for mobile clients', ['Firebase Auth', 'Security Rules']),
+    ('Vercel/Netlify + Railway/Heroku', 'deployment', (0.75, 0.85, 0.7, 0.5, 1.0, 0.8),
+     'Easy deployment, good free tiers, scalable', ['Docker', 'GitHub Actions', 'CloudFlare']),
+    ('Vercel + PlanetScale (Free tier)', 'deployment', (1.0, 0.85, 0.6, 0.5, 0.9, 0.6),
+     'Optimized for budget-conscious development with generous free tiers',
+     ['GitHub Actions (free)', 'Cloudflare (free)']),
+    ('AWS', 'deployment', (0.45, 0.3, 1.0, 0.8, 0.9, 1.0),
+     'Every building block for large-scale production workloads', ['Terraform', 'CloudWatch', 'ECS/Fargate']),
+    ('Google Cloud', 'deployment', (0.5, 0.35, 1.0, 0.8, 0.9, 0.85),
+     'Managed containers and data services with strong autoscaling', ['Cloud Run', 'Cloud Build', 'Cloud SQL']),
+    ('DigitalOcean', 'deployment', (0.7, 0.6, 0.75, 0.6, 0.8, 0.7),
+     'Predictable pricing and simple managed services', ['App Platform', 'Managed Databases', 'Spaces']),
+    ('Fly.io', 'deployment', (0.8, 0.65, 0.75, 0.6, 0.8, 0.5),
+     'Run containers close to users with a generous free allowance', ['flyctl', 'LiteFS', 'Upstash Redis']),
+    ('App Store / Play Store + Firebase Hosting', 'deployment', (0.8, 0.8, 0.7, 1.0, 0.4, 0.6),
+     'Automated store releases with hosted backend and landing page',
+     ['Fastlane', 'Firebase App Distribution', 'Crashlytics']),
+]
+
+# Baseline weights (features, then popularity) and the shifts applied by idea
+# keywords and refinement modifiers
+TECH_BASE_WEIGHTS = {'affordability': 0.5, 'ease_of_learning': 0.6, 'scalability': 0.6, 'mobile_fit': 0.3,
+                     'web_fit': 0.8, 'ecosystem': 0.8, 'popularity': 0.3}
+IDEA_TECH_SIGNALS = {
+    'mobile': {'mobile_fit': 1.2}, 'ios': {'mobile_fit': 1.2}, 'android': {'mobile_fit': 1.2},
+    'app': {'mobile_fit': 0.2},
+    'web': {'web_fit': 0.5}, 'website': {'web_fit': 0.5}, 'dashboard': {'web_fit': 0.5},
+    'saas': {'web_fit': 0.5, 'scalability': 0.3}, 'portal': {'web_fit': 0.5},
+    'enterprise': {'scalability': 0.8}, 'scale': {'scalability': 0.6}, 'realtime': {'scalability': 0.6},
+    'marketplace': {'scalability': 0.5}, 'analytics': {'scalability': 0.4},
+    'student': {'affordability': 0.8}, 'hobby': {'affordability': 0.8}, 'personal': {'affordability': 0.6},
+    'nonprofit': {'affordability': 0.8}, 'budget': {'affordability': 0.8}, 'cheap': {'affordability': 0.8},
+    'simple': {'ease_of_learning': 0.6}, 'beginner': {'ease_of_learning': 0.8}, 'prototype': {'ease_of_learning': 0.6},
+}
+TECH_MODIFIER_WEIGHTS = {
+    'mobile_first': {'mobile_fit': 1.5},
+    'web_focus': {'web_fit': 1.0},
+    'simplify': {'ease_of_learning': 1.5},
+    'enhance': {'scalability': 1.2},
+    'budget': {'affordability': 2.0}
+}
+TECH_ALTERNATIVES = 3
+
+_tech_engine_cache = {'snapshot': None, 'matrix': None}
+
+def tech_weight_vector(project_idea, modifiers=()):
+    """Turn idea keywords and refinement modifiers into {feature: weight} plus the signals used"""
+    weights = dict(TECH_BASE_WEIGHTS)
+    signals = []
+    words = set(re.findall(r'[a-z]+', (project_idea or '').lower()))
+    for word in sorted(words & IDEA_TECH_SIGNALS.keys()):
+        signals.append(word)
+        for feature, shift in IDEA_TECH_SIGNALS[word].items():
+            weights[feature] += shift
+    for modifier in modifiers:
+        if modifier in TECH_MODIFIER_WEIGHTS:
+            signals.append(modifier)
+            for feature, shift in TECH_MODIFIER_WEIGHTS[modifier].items():
+                weights[feature] += shift
+    return weights, signals
+
+def _tech_engine_matrix(np):
+    """Candidate x feature matrix and layer mask, rebuilt when the popularity snapshot changes"""
+    popularity = get_tech_popularity()
+    snapshot = max((row['refreshed_at'] for row in popularity.values()), default=None)
+    if _tech_engine_cache['matrix'] is None or _tech_engine_cache['snapshot'] != snapshot:
+        top = max((row['score'] for row in popularity.values()), default=0) or 1.0
+        features = np.array([
+            list(vector) + [popularity[name]['score'] / top if name in popularity else 0.5]
+            for name, _, vector, _, _ in TECH_KNOWLEDGE_BASE
+        ], dtype=np.float32)
+        layers = np.array([[layer == l for l in TECH_LAYERS] for _, layer, _, _, _ in TECH_KNOWLEDGE_BASE])
+        _tech_engine_cache.update(snapshot=snapshot, matrix=(features, layers))
+    return _tech_engine_cache['matrix'], popularity, snapshot
+
+def rank_tech_candidates(weights):
+    """Score every candidate in one matrix product; returns {layer: [(name, score), ...]} best first"""
+    np = get_provider('numpy')
+    if np is None:
+        return None
+
+    (features, layers), popularity, snapshot = _tech_engine_matrix(np)
+    weight_vector = np.array([weights[f] for f in TECH_FEATURES] + [weights['popularity']], dtype=np.float32)
+    scores = features @ weight_vector
+    per_layer = np.where(layers, scores[:, None], -np.inf)
+    order = np.argsort(-per_layer, axis=0)
+
+    ranking = {}
+    for j, layer in enumerate(TECH_LAYERS):
+        ranking[layer] = [(TECH_KNOWLEDGE_BASE[i][0], float(scores[i]))
+                          for i in order[:, j] if layers[i, j]]
+    return ranking, popularity, snapshot
+
+def recommend_tech_stack(project_idea, modifiers=()):
+    """Personalized stack for an idea (and chat modifiers); None without NumPy"""
+    weights, signals = tech_weight_vector(project_idea, modifiers)
+    ranked = rank_tech_candidates(weights)
+    if ranked is None:
+        return None
+    ranking, popularity, snapshot = ranked
+
+    catalog = {name: (reasoning, tools) for name, _, _, reasoning, tools in TECH_KNOWLEDGE_BASE}
+    stack = {}
+    for layer in TECH_LAYERS:
+        (primary, score), rest = ranking[layer][0], ranking[layer][1:1 + TECH_ALTERNATIVES]
+        reasoning, tools = catalog[primary]
+        stack[layer] = {
+            'primary': primary,
+            'reasoning': reasoning,
+            'alternatives': [name for name, _ in rest],
+            'supporting_tools': list(tools),
+            'fit_score': round(score, 3)
+        }
+        if primary in popularity:
+            stack[layer]['popularity_score'] = popularity[primary]['score']
+
+    ease = weights['ease_of_learning'] / sum(weights.values())
+    stack['development_timeline'] = '8-14 weeks for full stack development' if ease > 0.2 \
+        else '12-20 weeks for full stack development'
+    stack['personalized_for'] = signals
+    if snapshot:
+        stack['popularity_snapshot'] = snapshot
+    return stack
+
+# === COMPETITOR DISCOVERY ===
+# Brave queries and landing-page fetches fan out on a thread pool; HTML is
+# parsed in a process pool with the fastest installed BeautifulSoup parser.
+# Parsed pages are cached in SQLite with a TTL, results are deduplicated by
+# domain, and the whole stage stops at its latency budget with what it has.
+
+BRAVE_SEARCH_URL = 'https://api.search.brave.com/res/v1/web/search'
+COMPETITOR_BUDGET_SECONDS = float(os.getenv('NEXUS_COMPETITOR_BUDGET_SECONDS', '6'))
+COMPETITOR_PAGE_TTL_HOURS = int(os.getenv('NEXUS_COMPETITOR_PAGE_TTL_HOURS', '24'))
+COMPETITOR_MAX_RESULTS = 6
+COMPETITOR_FETCH_WORKERS = 8
+COMPETITOR_PARSE_WORKERS = int(os.getenv('NEXUS_PARSE_WORKERS', '2'))
+COMPETITOR_QUERY_TEMPLATES = ['{idea} app', '{idea} alternatives', 'best {idea} tools', '{idea} startup']
+COMPETITOR_SKIP_DOMAINS = {
+    'reddit.com', 'youtube.com', 'wikipedia.org', 'medium.com', 'quora.com', 'linkedin.com',
+    'facebook.com', 'twitter.com', 'x.com', 'github.com', 'play.google.com', 'apps.apple.com'
+}
+
+_competitor_pools = {'pid': None, 'fetch': None, 'parse': None}
+
+def html_parser_name():
+    """Pick the fastest BeautifulSoup parser that is installed"""
+    for parser, module in (('lxml', 'lxml'), ('html5lib', 'html5lib')):
+        if importlib.util.find_spec(module):
+            return parser
+    return 'html.parser'
+
+def parse_competitor_page(html, parser):
+    """Extract title, description and headings from a landing page (runs in a worker process)"""
+    soup = get_provider('bs4').BeautifulSoup(html, parser)
+    description = soup.find('meta', attrs={'name': 'description'}) or soup.find('meta', attrs={'property': 'og:description'})
+    headings = [h.get_text(' ', strip=True) for h in soup.find_all(['h1', 'h2'], limit=6)]
+    text = soup.get_text(' ', strip=True).lower()
+    return {
+        'title': soup.title.get_text(strip=True) if soup.title else None,
+        'description': description.get('content', '').strip() if description else None,
+        'headings': [h for h in headings if h][:4],
+        'mentions_pricing': 'pricing' in text or 'per month' in text or '/mo' in text,
+        'mentions_free_tier': 'free plan' in text or 'free trial' in text or 'free forever' in text
     }
 
+def get_competitor_pools():
+    """Thread pool for network I/O and process pool for parsing, created per process"""
+    if _competitor_pools['pid'] != os.getpid():
+        _competitor_pools['fetch'] = ThreadPoolExecutor(max_workers=COMPETITOR_FETCH_WORKERS,
+                                                        thread_name_prefix='competitor-fetch')
+        # Spawned (not forked) workers: this process already runs other threads
+        _competitor_pools['parse'] = ProcessPoolExecutor(max_workers=COMPETITOR_PARSE_WORKERS,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+        _competitor_pools['pid'] = os.getpid()
+    return _competitor_pools['fetch'], _competitor_pools['parse']
+
+def competitor_domain(url):
+    """Normalize a URL to its registrable-ish domain for deduplication"""
+    domain = urlparse(url).netloc.lower().split(':')[0]
+    return domain[4:] if domain.startswith('www.') else domain
+
+def brave_search(query, count=10):
+    """Run one Brave web search; returns a list of {'url', 'title', 'description'}"""
+    requests = get_provider('requests')
+    if requests is None or BRAVE_API_KEY == 'demo_key':
+        return []
+    response = requests.get(
+        BRAVE_SEARCH_URL,
+        params={'q': query, 'count': count},
+        headers={'Accept': 'application/json', 'X-Subscription-Token': BRAVE_API_KEY},
+        timeout=COMPETITOR_BUDGET_SECONDS
+    )
+    response.raise_for_status()
+    return [{'url': r['url'], 'title': r.get('title'), 'description': r.get('description')}
+            for r in response.json().get('web', {}).get('results', [])]
+
+def fetch_page_html(url):
+    requests = get_provider('requests')
+    response = requests.get(url, timeout=COMPETITOR_BUDGET_SECONDS,
+                            headers={'User-Agent': 'Mozilla/5.0 (compatible; NexusBot/1.0)'})
+    response.raise_for_status()
+    return response.text[:500000]
+
+def get_cached_competitor_page(url):
+    conn = connect_db()
+    try:
+        row = conn.execute('''
+            SELECT data FROM competitor_page_cache
+            WHERE url = ? AND fetched_at >= datetime('now', ?)
+        ''', (url, f'-{COMPETITOR_PAGE_TTL_HOURS} hours')).fetchone()
+        return json.loads(row[0]) if row else None
+    finally:
+        conn.close()
+
+def store_competitor_page(url, data):
+    conn = connect_db()
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO competitor_page_cache (url, data, fetched_at)
+            VALUES (?, ?, CURRENT_TIMESTAMP)
+        ''', (url, json.dumps(data)))
+        conn.commit()
+    finally:
+        conn.close()
+
+def plain_text(value, limit=300):
+    """Scraped or search-result text reduced to plain text: entities decoded, tags and extra whitespace removed"""
+    if not value:
+        return value
+    text = re.sub(r'<[^>]*>', ' ', html_unescape(str(value)))
+    return ' '.join(text.replace('<', ' ').replace('>', ' ').split())[:limit]
+
+def discover_competitors(project_idea, budget_seconds=None):
+    """Find competitor sites for an idea within a latency budget.
+
+    Returns {'competitors': [...], 'partial': bool}; `partial` is set when the
+    budget ran out before every query, fetch or parse finished.
+    """
+    deadline = time.monotonic() + (budget_seconds or COMPETITOR_BUDGET_SECONDS)
+    fetch_pool, parse_pool = get_competitor_pools()
+    partial = False
+
+    # 1. Fan out the search queries
+    queries = [template.format(idea=project_idea) for template in COMPETITOR_QUERY_TEMPLATES]
+    search_futures = [fetch_pool.submit(brave_search, query) for query in queries]
+    done, pending = wait(search_futures, timeout=max(0, deadline - time.monotonic()))
+    partial |= bool(pending)
+
+    candidates = {}
+    for future in search_futures:
+        if future not in done or future.exception():
+            continue
+        for result in future.result():
+            domain = competitor_domain(result['url'])
+            if domain and domain not in COMPETITOR_SKIP_DOMAINS and domain not in candidates:
+                candidates[domain] = result
+    candidates = dict(list(candidates.items())[:COMPETITOR_MAX_RESULTS])
+
+    # 2. Serve cached pages, fetch the rest concurrently
+    pages = {}
+    fetches = {}
+    for domain, result in candidates.items():
+        cached = get_cached_competitor_page(result['url'])
+        if cached is not None:
+            pages[domain] = cached
+        else:
+            fetches[fetch_pool.submit(fetch_page_html, result['url'])] = domain
+
+    # 3. Hand each fetched page to the parser pool as soon as it arrives
+    parser = html_parser_name()
+    parses = {}
+    for future in as_completed_within(fetches, deadline):
+        if future.exception() or get_provider('bs4') is None:
+            continue
+        try:
+            parses[parse_pool.submit(parse_competitor_page, future.result(), parser)] = fetches[future]
+        except BrokenProcessPool as e:
+            print(f"Competitor parse pool failed, recreating: {e}")
+            _competitor_pools['pid'] = None
+            partial = True
+            break
+    partial |= any(f.cancelled() or not f.done() for f in fetches)
+
+    for future in as_completed_within(parses, deadline):
+        if future.exception():
+            continue
+        domain = parses[future]
+        pages[domain] = future.result()
+        store_competitor_page(candidates[domain]['url'], pages[domain])
+    partial |= any(f.cancelled() or not f.done() for f in parses)
+
+    competitors = []
+    for domain, result in candidates.items():
+        page = pages.get(domain, {})
+        competitors.append({
+            'name': plain_text(page.get('title') or result.get('title')) or domain,
+            'domain': domain,
+            'url': result['url'],
+            'description': plain_text(page.get('description') or result.get('description')),
+            'strengths': [plain_text(heading) for heading in page.get('headings', [])[:2]],
+            'weaknesses': [],
+            'market_share': 'Unknown',
+            'has_pricing_page': page.get('mentions_pricing', False),
+            'offers_free_tier': page.get('mentions_free_tier', False)
+        })
+    return {'competitors': competitors, 'partial': partial}
+
+def as_completed_within(futures, deadline):
+    """Yield futures as they complete, stopping (and cancelling the rest) at the deadline"""
+    try:
+        for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+            yield future
+    except FuturesTimeout:
+        for future in futures:
+            future.cancel()
+
 # === PROJECT GENERATION CORE ===
 
 def generate_visual_roadmap(project_idea):
@@ -187,7 +1044,21 @@ def generate_visual_roadmap(project_idea):
 def generate_opportunity_analysis(project_idea):
     """Generate market opportunity analysis"""
     try:
-        # This would use real APIs in production
+        market_trends = describe_market_trends(project_idea)
+        sentiment = analyze_reddit_sentiment(iter_reddit_posts(idea_keywords(project_idea)))
+        if sentiment:
+            pain_points = [p['pain_point'] for p in sentiment['pain_points'][:4]]
+            return {
+                'market_size': f"{sentiment['posts_analyzed']} recent community discussions analyzed",
+                'target_audience': 'Reddit users discussing ' + ', '.join(idea_keywords(project_idea)),
+                'pain_points': pain_points or ['No recurring complaints found in community discussions'],
+                'opportunity_score': compute_opportunity_score(sentiment),
+                'community_sentiment': sentiment,
+                'market_trends': market_trends,
+                'validation_sources': ['Reddit discussions']
+            }
+
+        # Demo mode: no Reddit client, fixture or NumPy available
         return {
             'market_size': 'Large and growing market with significant potential',
             'target_audience': 'Identified based on market research and competitor analysis',
@@ -198,11 +1069,7 @@ def generate_opportunity_analysis(project_idea):
                 'Poor user experience in competitor products'
             ],
             'opportunity_score': 8.5,
-            'market_trends': [
-                'Increasing demand for digital solutions',
-                'Growing mobile-first user base',
-                'Rising expectations for seamless user experience'
-            ],
+            'market_trends': market_trends,
             'validation_sources': ['Reddit discussions', 'Industry reports', 'User surveys']
         }
     except Exception as e:
@@ -212,6 +1079,27 @@ def generate_opportunity_analysis(project_idea):
 def generate_competitive_landscape(project_idea):
     """Generate competitive analysis"""
     try:
+        discovered = discover_competitors(project_idea) if BRAVE_API_KEY != 'demo_key' else None
+        if discovered and discovered['competitors']:
+            competitors = discovered['competitors']
+            return {
+                'direct_competitors': competitors,
+                'indirect_competitors': [
+                    'Manual/traditional approaches',
+                    'DIY tools and platforms'
+                ],
+                'competitive_advantages': [
+                    'Unique feature combination',
+                    'Better user experience',
+                    'More affordable pricing' if sum(c['has_pricing_page'] for c in competitors) > len(competitors) / 2
+                    else 'Clear, transparent pricing',
+                    'Superior technology stack'
+                ],
+                'market_gap': f"{len(competitors)} established players found; differentiate on focus and user experience",
+                'partial_results': discovered['partial']
+            }
+
+        # Demo mode: no Brave API key configured
         return {
             'direct_competitors': [
                 {
@@ -291,10 +1179,15 @@ def generate_mvp_blueprint(project_idea):
         print(f"Error generating MVP blueprint: {e}")
         return {}
 
-def generate_tech_stack_recommendation(project_idea):
+def generate_tech_stack_recommendation(project_idea, modifiers=()):
     """Generate technology stack recommendations"""
     try:
-        return {
+        recommended = recommend_tech_stack(project_idea, modifiers)
+        if recommended:
+            return recommended
+
+        # Demo mode: no NumPy, fall back to the default stack
+        stack = {
             'frontend': {
                 'primary': 'React',
                 'reasoning': 'Large ecosystem, excellent documentation, industry standard',
@@ -321,61 +1214,118 @@ def generate_tech_stack_recommendation(project_idea):
             },
             'development_timeline': '12-20 weeks for full stack development'
         }
+        return apply_tech_popularity(stack)
     except Exception as e:
         print(f"Error generating tech stack: {e}")
         return {}
 
+# Curated resources per technology, keyed by TECH_KNOWLEDGE_BASE name
+LEARNING_RESOURCES = {
+    'React': [
+        {
+            'title': 'Official React Documentation',
+            'url': 'https://react.dev/learn',
+            'type': 'Documentation',
+            'rating': '★★★★★'
+        },
+        {
+            'title': 'React - The Complete Guide (Udemy)',
+            'url': 'https://www.udemy.com/course/react-the-complete-guide-incl-redux/',
+            'type': 'Course',
+            'rating': '★★★★★'
+        }
+    ],
+    'Next.js': [
+        {'title': 'Next.js Documentation', 'url': 'https://nextjs.org/docs', 'type': 'Documentation', 'rating': '★★★★★'}
+    ],
+    'Vue.js': [
+        {'title': 'Vue.js Guide', 'url': 'https://vuejs.org/guide/introduction.html', 'type': 'Documentation', 'rating': '★★★★★'}
+    ],
+    'Angular': [
+        {'title': 'Angular Documentation', 'url': 'https://angular.dev/overview', 'type': 'Documentation', 'rating': '★★★★☆'}
+    ],
+    'Svelte': [
+        {'title': 'Svelte Tutorial', 'url': 'https://svelte.dev/tutorial', 'type': 'Tutorial', 'rating': '★★★★★'}
+    ],
+    'React Native': [
+        {'title': 'React Native Documentation', 'url': 'https://reactnative.dev/docs/getting-started', 'type': 'Documentation', 'rating': '★★★★☆'}
+    ],
+    'Flutter': [
+        {'title': 'Flutter Documentation', 'url': 'https://docs.flutter.dev/', 'type': 'Documentation', 'rating': '★★★★★'}
+    ],
+    'Node.js with Express': [
+        {
+            'title': 'Node.js Official Guides',
+            'url': 'https://nodejs.org/en/docs/guides/',
+            'type': 'Documentation',
+            'rating': '★★★★★'
+        },
+        {
+            'title': 'Node.js Crash Course (YouTube)',
+            'url': 'https://www.youtube.com/watch?v=fBNz5xF-Kx4',
+            'type': 'Video',
+            'rating': '★★★★☆'
+        }
+    ],
+    'Python with FastAPI': [
+        {'title': 'FastAPI Tutorial', 'url': 'https://fastapi.tiangolo.com/tutorial/', 'type': 'Tutorial', 'rating': '★★★★★'}
+    ],
+    'Django': [
+        {'title': 'Writing your first Django app', 'url': 'https://docs.djangoproject.com/en/stable/intro/tutorial01/', 'type': 'Tutorial', 'rating': '★★★★★'}
+    ],
+    'Go': [
+        {'title': 'A Tour of Go', 'url': 'https://go.dev/tour/', 'type': 'Tutorial', 'rating': '★★★★★'}
+    ],
+    'PHP with Laravel': [
+        {'title': 'Laravel Documentation', 'url': 'https://laravel.com/docs', 'type': 'Documentation', 'rating': '★★★★★'}
+    ],
+    'Firebase Cloud Functions': [
+        {'title': 'Cloud Functions for Firebase', 'url': 'https://firebase.google.com/docs/functions', 'type': 'Documentation', 'rating': '★★★★☆'}
+    ],
+    'PostgreSQL': [
+        {
+            'title': 'PostgreSQL Tutorial',
+            'url': 'https://www.postgresql.org/docs/current/tutorial.html',
+            'type': 'Documentation',
+            'rating': '★★★★★'
+        }
+    ],
+    'MongoDB': [
+        {'title': 'MongoDB University', 'url': 'https://learn.mongodb.com/', 'type': 'Course', 'rating': '★★★★★'}
+    ],
+    'MySQL': [
+        {'title': 'MySQL Tutorial', 'url': 'https://dev.mysql.com/doc/refman/8.0/en/tutorial.html', 'type': 'Documentation', 'rating': '★★★★☆'}
+    ],
+    'Supabase': [
+        {'title': 'Supabase Documentation', 'url': 'https://supabase.com/docs', 'type': 'Documentation', 'rating': '★★★★★'}
+    ],
+    'SQLite': [
+        {'title': 'SQLite Documentation', 'url': 'https://www.sqlite.org/docs.html', 'type': 'Documentation', 'rating': '★★★★☆'}
+    ],
+    'Firebase Firestore': [
+        {'title': 'Cloud Firestore Documentation', 'url': 'https://firebase.google.com/docs/firestore', 'type': 'Documentation', 'rating': '★★★★☆'}
+    ]
+}
+LEARNING_DEFAULT_STACK = {'frontend': 'React', 'backend': 'Node.js with Express', 'database': 'PostgreSQL'}
+
 def generate_learning_hub(tech_stack):
-    """Generate curated learning resources"""
+    """Generate curated learning resources for the stack's primary technologies"""
     try:
-        resources = {
-            'React': [
-                {
-                    'title': 'Official React Documentation',
-                    'url': 'https://react.dev/learn',
-                    'type': 'Documentation',
-                    'rating': '★★★★★'
-                },
-                {
-                    'title': 'React - The Complete Guide (Udemy)',
-                    'url': 'https://www.udemy.com/course/react-the-complete-guide-incl-redux/',
-                    'type': 'Course',
-                    'rating': '★★★★★'
-                }
-            ],
-            'Node.js': [
-                {
-                    'title': 'Node.js Official Guides',
-                    'url': 'https://nodejs.org/en/docs/guides/',
-                    'type': 'Documentation',
-                    'rating': '★★★★★'
-                },
-                {
-                    'title': 'Node.js Crash Course (YouTube)',
-                    'url': 'https://www.youtube.com/watch?v=fBNz5xF-Kx4',
-                    'type': 'Video',
-                    'rating': '★★★★☆'
-                }
-            ],
-            'PostgreSQL': [
-                {
-                    'title': 'PostgreSQL Tutorial',
-                    'url': 'https://www.postgresql.org/docs/current/tutorial.html',
-                    'type': 'Documentation',
-                    'rating': '★★★★★'
-                }
-            ]
+        primaries = {
+            layer: ((tech_stack or {}).get(layer) or {}).get('primary') or default
+            for layer, default in LEARNING_DEFAULT_STACK.items()
         }
+        resources = {name: LEARNING_RESOURCES[name] for name in primaries.values() if name in LEARNING_RESOURCES}
         
         return {
             'beginner_path': [
                 'Start with HTML/CSS/JavaScript fundamentals',
-                'Learn React basics and component architecture',
-                'Understand backend concepts with Node.js',
-                'Database design with PostgreSQL'
+                f"Learn {primaries['frontend']} basics and component architecture",
+                f"Understand backend concepts with {primaries['backend']}",
+                f"Database design with {primaries['database']}"
             ],
             'intermediate_path': [
-                'Advanced React patterns and state management',
+                f"Advanced {primaries['frontend']} patterns and state management",
                 'RESTful API design and implementation',
                 'Database optimization and relationships',
                 'Authentication and security practices'
@@ -393,16 +1343,22 @@ def generate_learning_hub(tech_stack):
         print(f"Error generating learning hub: {e}")
         return {}
 
-def generate_complete_project_report(project_idea):
-    """Generate the complete Nexus Intelligence report"""
+def generate_complete_project_report(project_idea, shared=None):
+    """Generate the complete Nexus Intelligence report
+
+    `shared` holds sections already computed for related ideas (a variation
+    batch or a near-duplicate prior report), keyed by section name; those are
+    reused instead of regenerated.
+    """
+    shared = shared or {}
     try:
         # Generate all sections
         roadmap = generate_visual_roadmap(project_idea)
-        opportunity = generate_opportunity_analysis(project_idea)
-        competitive = generate_competitive_landscape(project_idea)
-        mvp = generate_mvp_blueprint(project_idea)
-        tech_stack = generate_tech_stack_recommendation(project_idea)
-        learning = generate_learning_hub(tech_stack)
+        opportunity = shared.get('opportunity_analysis') or generate_opportunity_analysis(project_idea)
+        competitive = shared.get('competitive_landscape') or generate_competitive_landscape(project_idea)
+        mvp = shared.get('mvp_blueprint') or generate_mvp_blueprint(project_idea)
+        tech_stack = shared.get('tech_stack') or generate_tech_stack_recommendation(project_idea)
+        learning = shared.get('learning_hub') or generate_learning_hub(tech_stack)
         
         return {
             'project_idea': project_idea,
@@ -420,17 +1376,403 @@ def generate_complete_project_report(project_idea):
         print(f"Error generating complete report: {e}")
         return None
 
+# === IDEA VARIATION ENGINE ===
+
+MAX_VARIATIONS = 8
+
+VARIATION_TEMPLATES = [
+    'Mobile-first {idea}',
+    'Lean-budget {idea}',
+    '{idea} for small businesses',
+    'AI-powered {idea}',
+    '{idea} marketplace',
+    'Subscription-based {idea}',
+    'Community-driven {idea}',
+    'Enterprise {idea}'
+]
+
+def generate_idea_variations(project_idea, count):
+    """Produce up to `count` distinct variants of a project idea"""
+    idea = project_idea.strip().rstrip('.')
+    variations = []
+    for template in VARIATION_TEMPLATES[:max(1, min(count, MAX_VARIATIONS))]:
+        variation = template.format(idea=idea)
+        variation = variation[0].upper() + variation[1:]
+        if variation not in variations:
+            variations.append(variation)
+    return variations
+
+# Sections that depend on the base idea's market, not on the variant
+VARIATION_MARKET_SECTIONS = {
+    'opportunity_analysis': generate_opportunity_analysis,
+    'competitive_landscape': generate_competitive_landscape,
+    'mvp_blueprint': generate_mvp_blueprint
+}
+
+def generate_variation_report(variation, market, lookups):
+    """One variant's report from the shared market sections and memoized tech lookups"""
+    _, signals = tech_weight_vector(variation)
+    tech_stack = lookups.get(('tech_stack', tuple(signals)),
+                             lambda: generate_tech_stack_recommendation(variation))
+    primaries = tuple((tech_stack.get(layer) or {}).get('primary') for layer in LEARNING_DEFAULT_STACK)
+    shared = dict(market, tech_stack=tech_stack,
+                  learning_hub=lookups.get(('learning_hub', primaries), lambda: generate_learning_hub(tech_stack)))
+    return generate_complete_project_report(variation, shared=shared)
+
+def generate_variation_batch(project_idea, count, workers=None):
+    """Generate reports for N variants of an idea together.
+
+    The market sections (Reddit sentiment and trends, competitors, MVP)
+    depend on the base idea rather than the variant, so each is looked up
+    once, concurrently. Variants are then assembled on the same pool; tech
+    stacks are memoized by their scoring signals and learning hubs by their
+    primary technologies, so variants that agree share one lookup.
+    """
+    variations = generate_idea_variations(project_idea, count)
+    lookups = BatchLookupCache()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers or BATCH_WORKERS), thread_name_prefix='nexus-variation')
+    try:
+        market_futures = {name: pool.submit(generate, project_idea)
+                          for name, generate in VARIATION_MARKET_SECTIONS.items()}
+        market = {name: future.result() for name, future in market_futures.items()}
+        futures = {variation: pool.submit(generate_variation_report, variation, market, lookups)
+                   for variation in variations}
+
+        reports = {}
+        for variation in variations:
+            report = futures[variation].result()
+            if report:
+                report['variation_of'] = project_idea
+                reports[variation] = report
+        return reports
+    finally:
+        pool.shutdown(wait=False)
+
+def save_variations_to_db(user_id, project_idea, reports):
+    """Cache generated variation reports for a user, replacing older copies"""
+    try:
+        with db_lock:
+            conn = connect_db()
+            cursor = conn.cursor()
+
+            cursor.executemany('''
+                INSERT OR REPLACE INTO idea_variations (user_id, base_idea, variation, report_data, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', [(user_id, project_idea, variation, json.dumps(report), datetime.now().isoformat())
+                  for variation, report in reports.items()])
+
+            conn.commit()
+            conn.close()
+            return True
+
+    except Exception as e:
+        print(f"Error saving variations: {e}")
+        return False
+
+def get_cached_variation(user_id, variation):
+    """Load a cached variation report and its sibling variations"""
+    try:
+        conn = connect_db()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT base_idea, report_data FROM idea_variations
+            WHERE user_id = ? AND variation = ?
+        ''', (user_id, variation))
+        row = cursor.fetchone()
+        if not row:
+            conn.close()
+            return None, []
+
+        cursor.execute('''
+            SELECT variation FROM idea_variations
+            WHERE user_id = ? AND base_idea = ?
+            ORDER BY id
+        ''', (user_id, row[0]))
+        siblings = [r[0] for r in cursor.fetchall()]
+
+        conn.close()
+        return json.loads(row[1]), siblings
+
+    except Exception as e:
+        print(f"Error loading variation: {e}")
+        return None, []
+
+def variation_report_to_results(report):
+    """Flatten a variation report into the result cards shown on variation_results.html"""
+    results = []
+    intelligence = report.get('nexus_intelligence', {})
+    resources = intelligence.get('learning_hub', {}).get('resources_by_technology', {})
+
+    for phase in (report.get('visual_roadmap') or {}).get('phases', []):
+        results.append({
+            'title': f"Phase {phase['id']}: {phase['title']}",
+            'link': '#',
+            'snippet': phase['description'],
+            'categories': ['Roadmap'],
+            'summary': f"{phase['duration']} — " + '; '.join(phase['key_activities'])
+        })
+
+    for feature in intelligence.get('mvp_blueprint', {}).get('core_features', []):
+        results.append({
+            'title': feature['name'],
+            'link': '#',
+            'snippet': feature['description'],
+            'categories': ['MVP', feature['priority']],
+            'summary': f"Estimated effort: {feature['effort']}"
+        })
+
+    for layer, choice in intelligence.get('tech_stack', {}).items():
+        if not isinstance(choice, dict):
+            continue
+        tech_resources = next((items for tech, items in resources.items() if tech in choice['primary']), [])
+        results.append({
+            'title': f"{layer.title()}: {choice['primary']}",
+            'link': tech_resources[0]['url'] if tech_resources else '#',
+            'snippet': choice['reasoning'],
+            'categories': ['Technology'],
+            'summary': 'Alternatives: ' + ', '.join(choice.get('alternatives', []))
+        })
+
+    for competitor in intelligence.get('competitive_landscape', {}).get('direct_competitors', []):
+        results.append({
+            'title': competitor['name'],
+            'link': '#',
+            'snippet': f"Market share: {competitor['market_share']}",
+            'categories': ['Competition'],
+            'summary': 'Strengths: ' + ', '.join(competitor['strengths']) +
+                       '. Weaknesses: ' + ', '.join(competitor['weaknesses'])
+        })
+
+    # The template prints these fields with |safe (search results carry
+    # highlight markup), and report text can come from scraped pages
+    for result in results:
+        for key in ('title', 'snippet', 'summary'):
+            result[key] = str(escape(result[key]))
+    return results
+
+# === BATCH GENERATION ===
+
+BATCH_MAX_IDEAS = int(os.getenv('NEXUS_BATCH_MAX_IDEAS', '50'))
+BATCH_WORKERS = int(os.getenv('NEXUS_BATCH_WORKERS', '4'))
+BATCH_CHUNK_SIZE = int(os.getenv('NEXUS_BATCH_CHUNK_SIZE', '10'))
+
+class BatchLookupCache:
+    """Single-flight memo for upstream lookups shared by one batch.
+
+    Ideas that reduce to the same keywords hit Reddit and Brave once; the
+    first worker to ask computes the section and the others wait on it.
+    """
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = self._futures[key] = Future()
+        if owner:
+            try:
+                future.set_result(compute())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+def generate_batch_report(project_idea, lookups):
+    """Generate one report, reusing sections other batch items already fetched"""
+    keywords = tuple(idea_keywords(project_idea))
+    tech_stack = generate_tech_stack_recommendation(project_idea)
+    shared = {
+        'opportunity_analysis': lookups.get(('opportunity_analysis', keywords),
+                                            lambda: generate_opportunity_analysis(project_idea)),
+        'competitive_landscape': lookups.get(('competitive_landscape', keywords),
+                                             lambda: generate_competitive_landscape(project_idea)),
+        'mvp_blueprint': lookups.get('mvp_blueprint', lambda: generate_mvp_blueprint(project_idea)),
+        'tech_stack': tech_stack,
+        'learning_hub': generate_learning_hub(tech_stack)
+    }
+    return generate_complete_project_report(project_idea, shared=shared)
+
+def iter_batch_generation(user_id, ideas, workers=None, chunk_size=None, reservation_id=None):
+    """Generate and save reports for many ideas, yielding progress events.
+
+    Reports are generated on a thread pool and written in chunks, one
+    transaction per chunk. Events are dicts: `generated` as each report
+    finishes, `saved` once its chunk commits, `failed` for items that could
+    not be generated or saved, and a final `done` summary. Saved projects draw
+    on `reservation_id` when quota was reserved for the batch up front.
+    """
+    started = time.perf_counter()
+    chunk_size = max(1, chunk_size or BATCH_CHUNK_SIZE)
+    lookups = BatchLookupCache()
+    pending = []
+    counts = {'saved': 0, 'failed': 0}
+
+    yield {'event': 'started', 'total': len(ideas)}
+
+    def flush():
+        project_ids = save_projects_batch(user_id, [(idea, report) for _, idea, report in pending], reservation_id)
+        events = []
+        for position, (index, idea, _) in enumerate(pending):
+            if project_ids:
+                events.append({'event': 'saved', 'index': index, 'project_id': project_ids[position]})
+            else:
+                events.append({'event': 'failed', 'index': index, 'message': 'Failed to save project'})
+            counts[events[-1]['event']] += 1
+        pending.clear()
+        return events
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers or BATCH_WORKERS), thread_name_prefix='nexus-batch')
+    try:
+        futures = {pool.submit(generate_batch_report, idea, lookups): (index, idea)
+                   for index, idea in enumerate(ideas)}
+        for future in as_completed(futures):
+            index, idea = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                print(f"Batch item {index} failed: {e}")
+                report = None
+            if not report:
+                counts['failed'] += 1
+                yield {'event': 'failed', 'index': index, 'message': 'Failed to generate project report'}
+                continue
+
+            yield {'event': 'generated', 'index': index, 'project_idea': idea}
+            pending.append((index, idea, report))
+            if len(pending) >= chunk_size:
+                yield from flush()
+
+        if pending:
+            yield from flush()
+    finally:
+        # Stop queued work if the consumer went away mid-batch
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    yield {
+        'event': 'done',
+        'saved': counts['saved'],
+        'failed': counts['failed'],
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
+
 # === DATABASE HELPERS ===
 
 db_lock = threading.Lock()
 
+def open_db(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA busy_timeout = 30000')
+    return conn
+
+def connect_db(shard=None):
+    """Open a new SQLite connection to the application database.
+
+    Connections are opened per call and never cached at module level, so they
+    are never inherited across a fork. With sharding on, the connection is to
+    `shard` (default: the shard bound to the current request) with the global
+    database attached, so unqualified table names resolve to whichever file
+    holds the table.
+    """
+    shard = current_shard() if shard is None else shard
+    if shard is None:
+        return open_db(DATABASE_PATH)
+    conn = open_db(shard_path(shard))
+    conn.execute('ATTACH DATABASE ? AS global_db', (DATABASE_PATH,))
+    return conn
+
+def connect_global_db():
+    """Connection to the global database (users, sessions, shard map) whatever shard is bound"""
+    return open_db(DATABASE_PATH)
+
+def ensure_column(cursor, table, column, definition):
+    """Add a column to an existing table if an older schema lacks it"""
+    cursor.execute(f'PRAGMA table_info({table})')
+    if column not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        return True
+    return False
+
+def init_tenant_tables(cursor):
+    """Create the per-user tables: projects, chat history and the tables derived from them.
+
+    With sharding on, these are the only tables a shard file holds.
+    """
+    # Projects table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            project_name TEXT NOT NULL,
+            project_idea TEXT NOT NULL,
+            report_data TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1,
+            section_versions TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+    ''')
+    ensure_column(cursor, 'projects', 'version', 'INTEGER NOT NULL DEFAULT 1')
+    ensure_column(cursor, 'projects', 'section_versions', 'TEXT')
+    ensure_column(cursor, 'projects', 'deleted_at', 'TIMESTAMP')
+    migrated_timestamps = normalize_project_timestamps(cursor)
+
+    # Conversations table for chat interactions
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            user_message TEXT NOT NULL,
+            ai_response TEXT NOT NULL,
+            refinements TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    ''')
+
+    # Soft-deleted projects whose history the background purger has not removed yet
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS project_purge_queue (
+            project_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_conversations_created ON conversations (created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_conversations_project ON conversations (project_id, id)')
+
+    # Rolling per-project summary of conversation turns up to summarized_through
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            project_id INTEGER PRIMARY KEY,
+            summary TEXT NOT NULL DEFAULT '',
+            summarized_through INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    ''')
+
+    init_report_sections(cursor)
+    init_usage_rollups(cursor)
+    if migrated_timestamps:
+        # Project days moved to UTC; recount them
+        backfill_usage_rollups(cursor)
+    init_search_index(cursor)
+
 def init_db():
-    """Initialize the database with required tables"""
+    """Initialize the global database with required tables"""
     try:
         with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
+            conn = connect_global_db()
             cursor = conn.cursor()
             
+            # New databases return freed pages via incremental VACUUM (no-op on existing files)
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            
             # Users table for JWT authentication
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -445,32 +1787,28 @@ def init_db():
                 )
             ''')
             
-            # Projects table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS projects (
+            # Per-user tables (with sharding on, only rows from before it was enabled live here)
+            init_tenant_tables(cursor)
+            
+            # Plan and denormalized project quota counter (projects + reserved slots)
+            ensure_column(cursor, 'users', 'plan', "TEXT NOT NULL DEFAULT 'free'")
+            ensure_column(cursor, 'users', 'project_limit', 'INTEGER')
+            backfill_project_count = ensure_column(cursor, 'users', 'project_count', 'INTEGER NOT NULL DEFAULT 0')
+            
+            # Project slots claimed by in-flight generations
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS project_reservations (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id INTEGER NOT NULL,
-                    project_name TEXT NOT NULL,
-                    project_idea TEXT NOT NULL,
-                    report_data TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    slots INTEGER NOT NULL,
+                    expires_at TIMESTAMP NOT NULL,
                     FOREIGN KEY (user_id) REFERENCES users (id)
                 )
             ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_project_reservations_user ON project_reservations (user_id)')
             
-            # Conversations table for chat interactions
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    project_id INTEGER NOT NULL,
-                    user_message TEXT NOT NULL,
-                    ai_response TEXT NOT NULL,
-                    refinements TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (project_id) REFERENCES projects (id)
-                )
-            ''')
+            if backfill_project_count:
+                recount_user_projects(cursor)
             
             # User sessions table for token management
             cursor.execute('''
@@ -485,6 +1823,122 @@ def init_db():
                 )
             ''')
             
+            # Cached reports for idea variations
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS idea_variations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    base_idea TEXT NOT NULL,
+                    variation TEXT NOT NULL,
+                    report_data TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (user_id, variation),
+                    FOREIGN KEY (user_id) REFERENCES users (id)
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_idea_variations_base
+                ON idea_variations (user_id, base_idea)
+            ''')
+            
+            # Gemini prompt cache and daily token accounting
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    prompt_hash TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS llm_token_usage (
+                    scope TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    tokens INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (scope, day)
+                )
+            ''')
+            
+            # GitHub technology popularity snapshot and conditional-request cache
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS tech_popularity (
+                    technology TEXT PRIMARY KEY,
+                    repo TEXT NOT NULL,
+                    layer TEXT NOT NULL,
+                    stars INTEGER NOT NULL DEFAULT 0,
+                    forks INTEGER NOT NULL DEFAULT 0,
+                    open_issues INTEGER NOT NULL DEFAULT 0,
+                    commits_4w INTEGER NOT NULL DEFAULT 0,
+                    issues_30d INTEGER NOT NULL DEFAULT 0,
+                    score REAL NOT NULL DEFAULT 0,
+                    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS github_etags (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Parsed competitor landing pages (TTL cache)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS competitor_page_cache (
+                    url TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # RSS/Atom trend ingestion state and rolling term counts
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trend_feeds (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    last_polled_at TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trend_entries (
+                    entry_key TEXT PRIMARY KEY,
+                    feed_url TEXT NOT NULL,
+                    title TEXT,
+                    seen_at TEXT NOT NULL
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trend_terms (
+                    term TEXT NOT NULL,
+                    related TEXT NOT NULL DEFAULT '',
+                    day TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (term, day, related)
+                ) WITHOUT ROWID
+            ''')
+            
+            # Stored responses for Idempotency-Key retries (status_code NULL while in flight)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS idempotency_keys (
+                    user_id INTEGER NOT NULL,
+                    scope TEXT NOT NULL,
+                    idempotency_key TEXT NOT NULL,
+                    request_hash TEXT NOT NULL,
+                    status_code INTEGER,
+                    response_body TEXT,
+                    content_type TEXT,
+                    locked_until TEXT NOT NULL,
+                    expires_at TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (user_id, scope, idempotency_key)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys (expires_at)')
+            
+            init_similarity_index(cursor)
+            
             conn.commit()
             conn.close()
             print("✅ Database initialized successfully")
@@ -492,15 +1946,649 @@ def init_db():
     except Exception as e:
         print(f"⚠️ Database initialization failed: {e}")
 
+# === TENANT SHARDING ===
+# With NEXUS_SHARD_COUNT > 0 each user's projects, chat history and the
+# tables derived from them live in one of N shard files, chosen by a stable
+# (jump consistent) hash of the user id and pinned in the user_shards map.
+# Users, sessions, quota and the other shared tables stay in the global
+# database, which every shard connection attaches, so the same SQL works in
+# both modes. Each shard gets its own group-commit writer, so chat turns and
+# report updates for users on different shards never wait on the same file
+# lock. Project ids come from one global sequence and stay unique (and
+# unchanged) when a user is moved between shards.
+
+SHARD_COUNT = int(os.getenv('NEXUS_SHARD_COUNT', '0'))
+SHARD_DIR = os.getenv('NEXUS_SHARD_DIR', '')
+
+_shard_context = contextvars.ContextVar('nexus_shard', default=None)
+_shard_locks = {}
+
+def current_shard():
+    """Shard bound to the current request or job (None: unsharded, or the global database)"""
+    return _shard_context.get()
+
+def shard_ids():
+    """Every shard id, or [None] when sharding is off"""
+    return list(range(SHARD_COUNT)) if SHARD_COUNT > 0 else [None]
+
+def database_ids():
+    """Every database file: the global one (None) followed by the shards"""
+    return [None] + (list(range(SHARD_COUNT)) if SHARD_COUNT > 0 else [])
+
+def database_files():
+    """(shard, path) for every database file, global first"""
+    return [(shard, DATABASE_PATH if shard is None else shard_path(shard)) for shard in database_ids()]
+
+def shard_path(shard):
+    base, ext = os.path.splitext(os.path.basename(DATABASE_PATH))
+    return os.path.join(SHARD_DIR or os.path.dirname(DATABASE_PATH), f"{base}.shard{shard}{ext or '.db'}")
+
+def db_lock_for(shard):
+    """In-process write lock for one database file"""
+    if shard is None:
+        return db_lock
+    return _shard_locks.setdefault(shard, threading.Lock())
+
+def stable_shard(user_id, shard_count=None):
+    """Jump consistent hash: going from n to n+1 shards moves only 1/(n+1) of the users"""
+    shard_count = SHARD_COUNT if shard_count is None else shard_count
+    key = int.from_bytes(hashlib.sha1(str(user_id).encode('utf-8')).digest()[:8], 'big')
+    bucket, jump = -1, 0
+    while jump < shard_count:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+def shard_for_user(user_id):
+    """The user's shard from the shard map, assigning the hash shard on first use"""
+    if SHARD_COUNT <= 0 or user_id is None:
+        return None
+    conn = connect_global_db()
+    try:
+        row = conn.execute('SELECT shard FROM user_shards WHERE user_id = ?', (user_id,)).fetchone()
+        if row is None:
+            conn.execute('INSERT OR IGNORE INTO user_shards (user_id, shard) VALUES (?, ?)',
+                         (user_id, stable_shard(user_id)))
+            conn.commit()
+            row = conn.execute('SELECT shard FROM user_shards WHERE user_id = ?', (user_id,)).fetchone()
+        return row[0]
+    finally:
+        conn.close()
+
+def bind_user_shard(user_id):
+    """Route this request's project and conversation queries to the user's shard"""
+    _shard_context.set(shard_for_user(user_id))
+
+# Endpoints that never touch a shard, so they skip the session and shard map
+SHARDLESS_ENDPOINTS = frozenset({'static', 'nexus.asset'})
+
+def bind_request_shard():
+    """before_request hook: bind the session user's shard (JWT routes rebind in require_auth).
+
+    The shard is cached in the session next to `user`, tagged with
+    SHARD_COUNT so a resharded deployment looks it up again.
+    """
+    _shard_context.set(None)
+    if SHARD_COUNT <= 0 or request.endpoint in SHARDLESS_ENDPOINTS:
+        return
+    user = session.get('user')
+    if not user:
+        return
+    cached = session.get('user_shard')
+    if not cached or cached.get('user_id') != user['id'] or cached.get('shard_count') != SHARD_COUNT:
+        cached = {'user_id': user['id'], 'shard_count': SHARD_COUNT, 'shard': shard_for_user(user['id'])}
+        session['user_shard'] = cached
+    _shard_context.set(cached['shard'])
+
+@contextmanager
+def shard_scope(shard):
+    token = _shard_context.set(shard)
+    try:
+        yield shard
+    finally:
+        _shard_context.reset(token)
+
+def each_shard():
+    """Iterate the shards with each one bound in turn (a single None pass when unsharded)"""
+    for shard in shard_ids():
+        with shard_scope(shard):
+            yield shard
+
+def query_all_shards(sql, params=()):
+    """Run a read-only query on every shard; returns (shard, row) pairs"""
+    results = []
+    for shard in shard_ids():
+        conn = connect_db(shard)
+        try:
+            results += [(shard, row) for row in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+    return results
+
+def allocate_project_id(cursor):
+    """Next id from the global project sequence (None when unsharded: SQLite assigns it)"""
+    if SHARD_COUNT <= 0:
+        return None
+    cursor.execute('INSERT INTO project_ids DEFAULT VALUES')
+    project_id = cursor.lastrowid
+    cursor.execute('DELETE FROM project_ids WHERE id < ?', (project_id,))
+    return project_id
+
+def init_shards():
+    """Create the shard map and bring every shard file up to the current schema.
+
+    Shard files only ever get the per-user tables (init_tenant_tables), so
+    every other name resolves to the attached global database.
+    """
+    if SHARD_COUNT <= 0:
+        return
+    with db_lock:
+        conn = connect_global_db()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS user_shards (
+                user_id INTEGER PRIMARY KEY,
+                shard INTEGER NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
+        conn.execute('CREATE TABLE IF NOT EXISTS project_ids (id INTEGER PRIMARY KEY AUTOINCREMENT)')
+        # Start above any project still in the global database from before sharding
+        conn.execute('''
+            INSERT INTO project_ids (id)
+            SELECT last_id FROM (SELECT MAX(id) AS last_id FROM projects)
+            WHERE last_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM project_ids)
+        ''')
+        conn.commit()
+        conn.close()
+
+    for shard in shard_ids():
+        path = shard_path(shard)
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with db_lock_for(shard):
+            conn = open_db(path)
+            cursor = conn.cursor()
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            init_tenant_tables(cursor)
+            conn.commit()
+            conn.close()
+
+def _table_columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})')]
+
+def move_user_shard(user_id, source, target):
+    """Move one user's rows from `source` (None: pre-sharding rows in the global
+    database) to shard `target` and repoint the shard map, in one transaction.
+
+    Project ids are kept; conversation ids are reassigned by the target, so
+    the user's rolling summaries are dropped and rebuilt on the next chat.
+    Returns the number of projects moved.
+    """
+    conn = connect_db(target)
+    try:
+        src = 'global_db'
+        if source is not None:
+            conn.execute('ATTACH DATABASE ? AS src', (shard_path(source),))
+            src = 'src'
+        conn.execute('BEGIN IMMEDIATE')
+        project_ids = [row[0] for row in conn.execute(f'SELECT id FROM {src}.projects WHERE user_id = ?', (user_id,))]
+        marks = ','.join('?' * len(project_ids))
+
+        if project_ids:
+            for table, where in (('projects', f'id IN ({marks})'),
+                                 ('project_sections', f'project_id IN ({marks})'),
+                                 ('project_purge_queue', f'project_id IN ({marks})')):
+                source_columns = set(_table_columns(conn, src, table))
+                columns = ', '.join(c for c in _table_columns(conn, 'main', table) if c in source_columns)
+                conn.execute(f'INSERT INTO main.{table} ({columns}) SELECT {columns} FROM {src}.{table} WHERE {where}',
+                             project_ids)
+
+            columns = ', '.join(c for c in _table_columns(conn, 'main', 'conversations') if c != 'id')
+            conn.execute(f'''
+                INSERT INTO main.conversations ({columns})
+                SELECT {columns} FROM {src}.conversations WHERE project_id IN ({marks}) ORDER BY id
+            ''', project_ids)
+
+            if SEARCH_AVAILABLE:
+                conn.execute(f'''
+                    INSERT INTO main.projects_fts (rowid, project_idea, report_text, user_id)
+                    SELECT rowid, project_idea, report_text, user_id FROM {src}.projects_fts WHERE rowid IN ({marks})
+                ''', project_ids)
+                conn.execute(f'''
+                    INSERT INTO main.conversations_fts (rowid, user_message, ai_response, project_id, user_id)
+                    SELECT id, user_message, ai_response, project_id, ? FROM main.conversations WHERE project_id IN ({marks})
+                ''', [user_id] + project_ids)
+                conn.execute(f'''
+                    DELETE FROM {src}.conversations_fts
+                    WHERE rowid IN (SELECT id FROM {src}.conversations WHERE project_id IN ({marks}))
+                ''', project_ids)
+                conn.execute(f'DELETE FROM {src}.projects_fts WHERE rowid IN ({marks})', project_ids)
+
+            for table in ('conversations', 'conversation_summaries', 'project_sections', 'project_purge_queue'):
+                conn.execute(f'DELETE FROM {src}.{table} WHERE project_id IN ({marks})', project_ids)
+            conn.execute(f'DELETE FROM {src}.projects WHERE id IN ({marks})', project_ids)
+
+        conn.execute('''
+            INSERT INTO global_db.user_shards (user_id, shard) VALUES (?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET shard = excluded.shard
+        ''', (user_id, target))
+        conn.commit()
+        return len(project_ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def plan_shard_moves():
+    """(user_id, source, target) for every user not yet on its hash shard.
+
+    Users with rows still in the global database (from before sharding was
+    turned on) get a move with source None.
+    """
+    if SHARD_COUNT <= 0:
+        return []
+    conn = connect_global_db()
+    try:
+        users = conn.execute('''
+            SELECT u.id, m.shard FROM users u LEFT JOIN user_shards m ON m.user_id = u.id ORDER BY u.id
+        ''').fetchall()
+        legacy = {row[0] for row in conn.execute('SELECT DISTINCT user_id FROM projects')}
+    finally:
+        conn.close()
+
+    moves = []
+    for user_id, current in users:
+        target = stable_shard(user_id)
+        if user_id in legacy:
+            moves.append((user_id, None, target))
+        if current is not None and current != target:
+            moves.append((user_id, current, target))
+    return moves
+
+def rebalance_shards(dry_run=False):
+    """Move every misplaced user to its hash shard (run with the app stopped)"""
+    moves = plan_shard_moves()
+    report = {'users': len({user_id for user_id, _, _ in moves}), 'moves': [], 'projects_moved': 0}
+    for user_id, source, target in moves:
+        entry = {'user_id': user_id, 'from': 'global' if source is None else source, 'to': target}
+        if not dry_run:
+            entry['projects'] = move_user_shard(user_id, source, target)
+            report['projects_moved'] += entry['projects']
+        report['moves'].append(entry)
+    return report
+
+def shard_status():
+    """Per-database user, project and conversation counts and file sizes (admin view)"""
+    conn = connect_global_db()
+    try:
+        users = dict(conn.execute('SELECT shard, COUNT(*) FROM user_shards GROUP BY shard').fetchall()) \
+            if SHARD_COUNT > 0 else {}
+    finally:
+        conn.close()
+
+    counts = {}
+    for shard, row in query_all_shards('''
+        SELECT (SELECT COUNT(*) FROM projects WHERE deleted_at IS NULL), (SELECT COUNT(*) FROM conversations)
+    '''):
+        counts[shard] = row
+
+    shards = []
+    for shard in shard_ids():
+        path = shard_path(shard) if shard is not None else DATABASE_PATH
+        projects, conversations = counts.get(shard, (0, 0))
+        shards.append({
+            'shard': shard,
+            'path': path,
+            'users': users.get(shard, 0),
+            'projects': projects,
+            'conversations': conversations,
+            'bytes': os.path.getsize(path) if os.path.exists(path) else 0
+        })
+    return {'shard_count': SHARD_COUNT, 'shards': shards, 'pending_moves': len(plan_shard_moves())}
+
+# === GROUP COMMIT WRITER ===
+
+# Conversation inserts, report updates and project saves are queued to one
+# writer thread per process (per database file when sharded), which applies
+# everything that arrives within NEXUS_WRITE_BATCH_DELAY_MS (up to
+# NEXUS_WRITE_BATCH_SIZE jobs) in a single transaction, so a burst of chat
+# turns pays for one fsync instead of many.
+WRITE_QUEUE_ENABLED = os.getenv('NEXUS_WRITE_QUEUE', '1') != '0'
+WRITE_BATCH_SIZE = int(os.getenv('NEXUS_WRITE_BATCH_SIZE', '64'))
+WRITE_BATCH_DELAY_MS = float(os.getenv('NEXUS_WRITE_BATCH_DELAY_MS', '5'))
+
+_write_queue = {'writers': {}, 'pid': None}
+_write_queue_lock = threading.Lock()
+_WRITE_QUEUE_STOP = object()
+
+def commit_write_batch(jobs, shard=None):
+    """Apply (write_fn, future) jobs in one transaction and resolve their futures.
+
+    Each job runs in its own savepoint, so a failing job is rolled back and
+    reported to its caller without discarding the rest of the batch.
+    """
+    # A shard batch can write the shard and the attached global database in
+    # either order (project insert: global id sequence first; delete: shard
+    # first). BEGIN IMMEDIATE takes both write locks up front, so writers in
+    # two processes can't each hold one and wait on the other.
+    begin = 'BEGIN' if shard is None else 'BEGIN IMMEDIATE'
+    outcomes = []
+    try:
+        with db_lock_for(shard):
+            conn = connect_db(shard)
+            try:
+                cursor = conn.cursor()
+                cursor.execute(begin)
+                for write, _ in jobs:
+                    cursor.execute('SAVEPOINT write_job')
+                    try:
+                        outcomes.append((write(cursor), None))
+                    except Exception as e:
+                        cursor.execute('ROLLBACK TO write_job')
+                        outcomes.append((None, e))
+                    cursor.execute('RELEASE write_job')
+                conn.commit()
+            finally:
+                conn.close()
+    except Exception as e:
+        print(f"⚠️ Group commit of {len(jobs)} writes failed: {e}")
+        for _, future in jobs:
+            future.set_exception(e)
+        return
+
+    for (_, future), (result, error) in zip(jobs, outcomes):
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+def _run_write_queue(jobs_queue, shard=None):
+    """Writer loop: block for one job, then gather more until the batch is full or due"""
+    stopping = False
+    while not stopping:
+        job = jobs_queue.get()
+        if job is _WRITE_QUEUE_STOP:
+            break
+        batch = [job]
+        deadline = time.monotonic() + WRITE_BATCH_DELAY_MS / 1000
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                job = jobs_queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if job is _WRITE_QUEUE_STOP:
+                stopping = True
+                break
+            batch.append(job)
+        commit_write_batch(batch, shard)
+
+def start_write_queue():
+    """Start this process's group-commit writer threads (one per database file)"""
+    if not WRITE_QUEUE_ENABLED:
+        return
+    with _write_queue_lock:
+        writers = _write_queue['writers']
+        if _write_queue['pid'] == os.getpid() and writers and all(t.is_alive() for _, t in writers.values()):
+            return
+        writers = {}
+        for shard in database_ids():
+            jobs_queue = queue.Queue()
+            name = 'write-queue' if shard is None else f'write-queue-shard{shard}'
+            writers[shard] = (jobs_queue, threading.Thread(target=_run_write_queue, args=(jobs_queue, shard),
+                                                           name=name, daemon=True))
+        _write_queue.update(writers=writers, pid=os.getpid())
+        for _, thread in writers.values():
+            thread.start()
+
+def stop_write_queue(timeout=30):
+    """Flush every queued write and stop the writers (runs at interpreter exit)"""
+    with _write_queue_lock:
+        if _write_queue['pid'] != os.getpid() or not _write_queue['writers']:
+            return
+        writers = _write_queue['writers']
+        _write_queue.update(writers={}, pid=None)
+
+    for jobs_queue, _ in writers.values():
+        jobs_queue.put(_WRITE_QUEUE_STOP)
+    for shard, (jobs_queue, thread) in writers.items():
+        thread.join(timeout)
+
+        # Anything queued behind the stop marker is written synchronously
+        leftovers = []
+        while True:
+            try:
+                job = jobs_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not _WRITE_QUEUE_STOP:
+                leftovers.append(job)
+        if leftovers:
+            commit_write_batch(leftovers, shard)
+
+def reset_write_queue():
+    """Forget writers inherited from the parent process (their threads did not survive the fork)"""
+    _write_queue.update(writers={}, pid=None)
+
+def _log_write_failure(future):
+    if future.exception() is not None:
+        print(f"⚠️ Queued write failed: {future.exception()}")
+
+def submit_write(write, wait=True):
+    """Queue `write(cursor)` for the next group commit.
+
+    With wait=True, block until the batch is committed and return the
+    function's result (re-raising its exception). With wait=False, return the
+    pending Future immediately. Without a running writer (CLI commands,
+    NEXUS_WRITE_QUEUE=0) the write is committed on the calling thread.
+    Writes go to the shard bound to the caller (see shard_scope).
+    """
+    future = Future()
+    shard = current_shard()
+    with _write_queue_lock:
+        writer = _write_queue['writers'].get(shard) if _write_queue['pid'] == os.getpid() else None
+        if writer is not None:
+            writer[0].put((write, future))
+    if writer is None:
+        commit_write_batch([(write, future)], shard)
+
+    if wait:
+        return future.result()
+    future.add_done_callback(_log_write_failure)
+    return future
+
+atexit.register(stop_write_queue)
+
+# === PROJECT QUOTA ===
+
+# users.project_count is the number of projects a user owns plus the slots
+# currently reserved by in-flight generations. It is only changed by
+# single-statement conditional updates inside the same transaction as the
+# project insert/delete, so concurrent requests cannot overshoot the limit.
+PLAN_PROJECT_LIMITS = {'free': 3, 'pro': 25, 'premium': 999}
+RESERVATION_TTL_SECONDS = int(os.getenv('NEXUS_RESERVATION_TTL_SECONDS', '900'))
+
+class ProjectLimitReached(Exception):
+    def __init__(self, usage):
+        super().__init__(f"Project limit of {usage['max_projects']} reached")
+        self.usage = usage
+
+def project_limit_for(plan, project_limit=None):
+    """Project limit for a plan, unless the user has an explicit override"""
+    if project_limit is not None:
+        return project_limit
+    return PLAN_PROJECT_LIMITS.get(plan or 'free', PLAN_PROJECT_LIMITS['free'])
+
+def recount_user_projects(cursor, user_id=None):
+    """Rebuild project_count from the projects and reservations tables"""
+    where, params = ('WHERE id = ?', (user_id,)) if user_id is not None else ('', ())
+    cursor.execute(f'''
+        UPDATE users SET project_count =
+            (SELECT COUNT(*) FROM projects WHERE projects.user_id = users.id AND deleted_at IS NULL)
+            + COALESCE((SELECT SUM(slots) FROM project_reservations r WHERE r.user_id = users.id), 0)
+        {where}
+    ''', params)
+
+def get_project_usage(user_id):
+    """Read a user's plan limit and current usage from the counter (no COUNT(*))"""
+    try:
+        conn = connect_db()
+        # Expired reservations stay in project_count until the next reservation
+        # sweeps them, so leave their slots out of the usage reported here
+        row = conn.execute('''
+            SELECT plan, project_limit, project_count - COALESCE(
+                (SELECT SUM(slots) FROM project_reservations WHERE user_id = users.id AND expires_at < ?), 0)
+            FROM users WHERE id = ?
+        ''', (reservation_timestamp(), user_id)).fetchone()
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"Error reading project usage: {e}")
+        row = None
+
+    plan, project_limit, current_projects = row if row else ('free', None, 0)
+    max_projects = project_limit_for(plan, project_limit)
+    return {
+        'plan': plan,
+        'max_projects': max_projects,
+        'current_projects': current_projects,
+        'can_create': current_projects < max_projects
+    }
+
+def reservation_timestamp(moment=None):
+    """UTC ISO timestamp for project_reservations.expires_at comparisons"""
+    return (moment or datetime.now(timezone.utc)).isoformat()
+
+def _expire_reservations(cursor, user_id):
+    """Return slots held by reservations whose generation never finished"""
+    now = reservation_timestamp()
+    cursor.execute('''
+        UPDATE users SET project_count = project_count - COALESCE(
+            (SELECT SUM(slots) FROM project_reservations WHERE user_id = ? AND expires_at < ?), 0)
+        WHERE id = ?
+    ''', (user_id, now, user_id))
+    cursor.execute('DELETE FROM project_reservations WHERE user_id = ? AND expires_at < ?', (user_id, now))
+
+def _project_limit(cursor, user_id):
+    """Plan limit for a user, read inside the caller's write transaction"""
+    cursor.execute('SELECT plan, project_limit FROM users WHERE id = ?', (user_id,))
+    row = cursor.fetchone()
+    return project_limit_for(*row) if row else PLAN_PROJECT_LIMITS['free']
+
+def reserve_project_slots(user_id, slots=1):
+    """Atomically claim quota for `slots` new projects before generating them.
+
+    Returns a reservation id; raises ProjectLimitReached if the claim would
+    exceed the user's plan limit.
+    """
+    def write(cursor):
+        _expire_reservations(cursor, user_id)
+        max_projects = _project_limit(cursor, user_id)
+        cursor.execute('''
+            UPDATE users SET project_count = project_count + ?
+            WHERE id = ? AND project_count + ? <= ?
+        ''', (slots, user_id, slots, max_projects))
+        if cursor.rowcount == 0:
+            return None
+        expires_at = reservation_timestamp(datetime.now(timezone.utc) + timedelta(seconds=RESERVATION_TTL_SECONDS))
+        cursor.execute('INSERT INTO project_reservations (user_id, slots, expires_at) VALUES (?, ?, ?)',
+                       (user_id, slots, expires_at))
+        return cursor.lastrowid
+
+    reservation_id = submit_write(write)
+    if reservation_id is None:
+        raise ProjectLimitReached(get_project_usage(user_id))
+    return reservation_id
+
+def consume_project_slot(cursor, user_id, reservation_id=None):
+    """Count one new project, drawing on a reservation when one is still held.
+
+    Without a held slot the project must fit under the plan limit; raises
+    ProjectLimitReached otherwise so the caller's insert is rolled back.
+    """
+    if reservation_id is not None:
+        cursor.execute('UPDATE project_reservations SET slots = slots - 1 WHERE id = ? AND slots > 0',
+                       (reservation_id,))
+        if cursor.rowcount:
+            return
+    _expire_reservations(cursor, user_id)
+    max_projects = _project_limit(cursor, user_id)
+    cursor.execute('UPDATE users SET project_count = project_count + 1 WHERE id = ? AND project_count + 1 <= ?',
+                   (user_id, max_projects))
+    if cursor.rowcount == 0:
+        cursor.execute('SELECT plan, project_count FROM users WHERE id = ?', (user_id,))
+        plan, current_projects = cursor.fetchone() or ('free', 0)
+        raise ProjectLimitReached({
+            'plan': plan,
+            'max_projects': max_projects,
+            'current_projects': current_projects,
+            'can_create': False
+        })
+
+def release_project_reservation(reservation_id):
+    """Give back whatever slots a reservation did not use (safe to call twice)"""
+    def write(cursor):
+        cursor.execute('SELECT user_id, slots FROM project_reservations WHERE id = ?', (reservation_id,))
+        row = cursor.fetchone()
+        if not row:
+            return 0
+        cursor.execute('UPDATE users SET project_count = project_count - ? WHERE id = ?', (row[1], row[0]))
+        cursor.execute('DELETE FROM project_reservations WHERE id = ?', (reservation_id,))
+        return row[1]
+
+    try:
+        return submit_write(write)
+    except Exception as e:
+        print(f"Error releasing project reservation: {e}")
+        return 0
+
+def delete_project(project_id, user_id):
+    """Soft-delete a project: hide it and free its quota slot in one short transaction.
+
+    Chat history, sections and exports are removed later, a batch at a time,
+    by the background purger (purge_deleted_projects).
+    """
+    def write(cursor):
+        cursor.execute('''
+            UPDATE projects SET deleted_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND user_id = ? AND deleted_at IS NULL
+        ''', (project_id, user_id))
+        if cursor.rowcount == 0:
+            return False
+        cursor.execute('UPDATE users SET project_count = MAX(project_count - 1, 0) WHERE id = ?', (user_id,))
+        cursor.execute('INSERT OR IGNORE INTO project_purge_queue (project_id, user_id) VALUES (?, ?)',
+                       (project_id, user_id))
+        # A few rows each, so they go now; chat turns leave the index with the purge
+        if SEARCH_AVAILABLE:
+            cursor.execute('DELETE FROM projects_fts WHERE rowid = ?', (project_id,))
+        unindex_project_similarity(cursor, project_id)
+        return True
+
+    try:
+        deleted = submit_write(write)
+    except Exception as e:
+        print(f"Error deleting project: {e}")
+        return False
+    if deleted:
+        _project_purger['wake'].set()
+    return deleted
+
 # === JWT AUTHENTICATION SYSTEM ===
 
+@bp.app_errorhandler(ProviderUnavailable)
+def provider_unavailable(e):
+    print(f"⚠️ {e}")
+    return jsonify({'success': False, 'message': str(e)}), 503
+
 def hash_password(password):
     """Hash a password with bcrypt"""
+    bcrypt = require_provider('bcrypt')
     salt = bcrypt.gensalt()
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 def verify_password(password, hashed):
     """Verify a password against its hash"""
+    bcrypt = require_provider('bcrypt')
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 def generate_jwt_token(user_id, email):
@@ -511,10 +2599,12 @@ def generate_jwt_token(user_id, email):
         'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
         'iat': datetime.utcnow()
     }
+    jwt = require_provider('jwt')
     return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 def decode_jwt_token(token):
     """Decode and validate a JWT token"""
+    jwt = require_provider('jwt')
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
         return payload
@@ -527,7 +2617,7 @@ def create_user(email, name, password):
     """Create a new user in the database"""
     try:
         with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
+            conn = connect_db()
             cursor = conn.cursor()
             
             # Check if user already exists
@@ -548,6 +2638,8 @@ def create_user(email, name, password):
             
             return user_id, None
             
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"Error creating user: {e}")
         return None, "Failed to create user"
@@ -556,7 +2648,7 @@ def authenticate_user(email, password):
     """Authenticate a user by email and password"""
     try:
         with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
+            conn = connect_db()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -584,6 +2676,8 @@ def authenticate_user(email, password):
                 'name': name
             }, None
             
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"Error authenticating user: {e}")
         return None, "Authentication failed"
@@ -592,11 +2686,11 @@ def get_user_by_id(user_id):
     """Get user information by ID"""
     try:
         with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
+            conn = connect_db()
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT id, email, name, is_active
+                SELECT id, email, name, is_active, plan
                 FROM users WHERE id = ?
             ''', (user_id,))
             
@@ -608,7 +2702,8 @@ def get_user_by_id(user_id):
                     'id': user[0],
                     'email': user[1],
                     'name': user[2],
-                    'is_active': user[3]
+                    'is_active': user[3],
+                    'plan': user[4]
                 }
             return None
             
@@ -643,27 +2738,54 @@ def require_auth(f):
         if not user or not user['is_active']:
             return jsonify({'error': 'User not found or inactive'}), 401
         
-        # Add user to request context
+        # Add user to request context and route its queries to the user's shard
         request.current_user = user
+        bind_user_shard(user['id'])
         return f(*args, **kwargs)
     
     return decorated_function
 
-def save_conversation(project_id, user_message, ai_response, refinements=None):
-    """Save a conversation exchange to the database"""
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv('NEXUS_ADMIN_EMAILS', '').split(',') if email.strip()}
+
+def require_admin(f):
+    """Decorator for admin-only routes (JWT user listed in NEXUS_ADMIN_EMAILS)"""
+    @wraps(f)
+    @require_auth
+    def decorated_function(*args, **kwargs):
+        if request.current_user['email'].lower() not in ADMIN_EMAILS:
+            return jsonify({'error': 'Admin access required'}), 403
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+def save_conversation(project_id, user_message, ai_response, refinements=None, wait=True, intent=None,
+                      user_id=None):
+    """Save a conversation exchange to the database
+
+    `intent` (from analyze_user_refinement_request) feeds the analytics
+    rollups. Once committed, a background fold updates the project's
+    conversation summary (charged to `user_id`). Returns the conversation id,
+    or the pending write's Future when wait=False.
+    """
+    def write(cursor):
+        cursor.execute('''
+            INSERT INTO conversations (project_id, user_message, ai_response, refinements)
+            VALUES (?, ?, ?, ?)
+        ''', (project_id, user_message, ai_response, json.dumps(refinements) if refinements else None))
+        conversation_id = cursor.lastrowid
+        index_conversation(cursor, conversation_id, project_id, user_message, ai_response)
+        if intent:
+            bump_rollups(cursor, rollup_day(), refinement_rollup_counts(intent))
+        return conversation_id
+
     try:
-        with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO conversations (project_id, user_message, ai_response, refinements)
-                VALUES (?, ?, ?, ?)
-            ''', (project_id, user_message, ai_response, json.dumps(refinements) if refinements else None))
-            
-            conn.commit()
-            conn.close()
-            return cursor.lastrowid
+        shard = current_shard()
+        result = submit_write(write, wait=wait)
+        if wait:
+            schedule_summary_fold(project_id, user_id, shard)
+        else:
+            result.add_done_callback(lambda _: schedule_summary_fold(project_id, user_id, shard))
+        return result
             
     except Exception as e:
         print(f"Error saving conversation: {e}")
@@ -673,7 +2795,7 @@ def get_conversation_history(project_id):
     """Get conversation history for a project"""
     try:
         with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
+            conn = connect_db()
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -699,72 +2821,1866 @@ def get_conversation_history(project_id):
         print(f"Error loading conversation history: {e}")
         return []
 
-def count_user_projects(user_id):
-    """Count the number of projects for a user"""
+def insert_project(cursor, user_id, project_idea, report, reservation_id=None):
+    """Insert a project row, its quota count and search/similarity entries; caller commits"""
+    # Extract project name from the idea (first 100 characters)
+    project_name = project_idea[:100] + "..." if len(project_idea) > 100 else project_idea
+    
+    created_at = utc_timestamp()
+    cursor.execute('''
+        INSERT INTO projects (id, user_id, project_name, project_idea, report_data, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (allocate_project_id(cursor), user_id, project_name, project_idea, json.dumps(report), created_at))
+    
+    project_id = cursor.lastrowid
+    consume_project_slot(cursor, user_id, reservation_id)
+    bump_rollups(cursor, rollup_day(created_at), {('projects_generated', ''): 1})
+    write_report_sections(cursor, project_id, split_report_sections(report))
+    index_project(cursor, project_id, user_id, project_idea, report)
+    index_project_similarity(cursor, project_id, user_id, project_idea)
+    return project_id
+
+def save_project_to_db(user_id, project_idea, report, reservation_id=None):
+    """Save a project to the database"""
     try:
-        with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT COUNT(*) FROM projects WHERE user_id = ?', (user_id,))
-            count = cursor.fetchone()[0]
-            
-            conn.close()
-            return count
+        project_id = submit_write(lambda cursor: insert_project(cursor, user_id, project_idea, report, reservation_id))
+        print(f"✅ Project saved with ID: {project_id}")
+        return project_id
             
+    except ProjectLimitReached:
+        raise
     except Exception as e:
-        print(f"Error counting user projects: {e}")
-        return 0
+        print(f"Error saving project: {e}")
+        return None
 
-def save_project_to_db(user_id, project_idea, report):
-    """Save a project to the database"""
+def save_projects_batch(user_id, items, reservation_id=None):
+    """Save (project_idea, report) pairs in a single transaction.
+
+    Returns the new project ids in input order, or None if the chunk was
+    rolled back.
+    """
     try:
-        with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
+        # Streamed batches outlive the request, so bind the user's shard here
+        with shard_scope(shard_for_user(user_id)):
+            project_ids = submit_write(
+                lambda cursor: [insert_project(cursor, user_id, idea, report, reservation_id) for idea, report in items]
+            )
+        print(f"✅ Saved {len(project_ids)} projects in one batch")
+        return project_ids
+
+    except Exception as e:
+        print(f"Error saving project batch: {e}")
+        return None
+
+# Optimistic concurrency for report refinements: every write bumps
+# projects.version and records, per section, the version that last wrote it.
+# Refinements write only their own sections with a compare-and-swap on the
+# version, so concurrent chat turns never need db_lock and never lose updates.
+
+PROJECT_UPDATE_RETRIES = 5
+
+class ProjectUpdateConflict(Exception):
+    """Raised when a refinement still conflicts after PROJECT_UPDATE_RETRIES attempts"""
+
+def report_section_path(section):
+    """JSON path of a report section inside report_data"""
+    if section == 'visual_roadmap':
+        return '$.visual_roadmap'
+    return f'$.nexus_intelligence.{section}'
+
+def get_project_for_user(project_id, user_id, sections=None):
+    """Load a project (with parsed report and concurrency metadata) owned by user_id
+
+    With `sections`, only those report sections (plus 'meta') are read and
+    decoded; report_data then holds a partial report of the same shape.
+    """
+    conn = connect_db()
+    try:
+        row = conn.execute(f'''
+            SELECT id, user_id, project_name, project_idea, {'NULL' if sections is not None else 'report_data'},
+                   version, section_versions, created_at, updated_at
+            FROM projects WHERE id = ? AND user_id = ? AND deleted_at IS NULL
+        ''', (project_id, user_id)).fetchone()
+        if row and sections is not None:
+            report = assemble_report(read_report_sections(conn, project_id, [REPORT_META_SECTION, *sections]))
+    finally:
+        conn.close()
+
+    if not row:
+        return None
+    return {
+        'id': row[0],
+        'user_id': row[1],
+        'project_name': row[2],
+        'project_idea': row[3],
+        'report_data': json.loads(row[4]) if sections is None else report,
+        'version': row[5],
+        'section_versions': json.loads(row[6]) if row[6] else {},
+        'created_at': row[7],
+        'updated_at': row[8]
+    }
+
+def list_user_projects(user_id):
+    """A user's live projects, newest first (metadata only, no report)"""
+    conn = connect_db()
+    try:
+        rows = conn.execute('''
+            SELECT id, project_name, project_idea, version, created_at, updated_at
+            FROM projects WHERE user_id = ? AND deleted_at IS NULL
+            ORDER BY created_at DESC, id DESC
+        ''', (user_id,)).fetchall()
+    finally:
+        conn.close()
+    return [dict(zip(('id', 'project_name', 'project_idea', 'version', 'created_at', 'updated_at'), row))
+            for row in rows]
+
+def compare_and_set_sections(project_id, expected_version, section_updates):
+    """Write only `section_updates` if the project is still at `expected_version`.
+
+    Returns the new version, or None if another writer got there first.
+    """
+    report_args, version_args = [], []
+    for section, value in section_updates.items():
+        report_args += [report_section_path(section), json.dumps(value)]
+        version_args += [f'$.{section}']
+
+    conn = connect_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE projects
+            SET report_data = json_set(report_data, {', '.join(['?, json(?)'] * len(section_updates))}),
+                section_versions = json_set(COALESCE(section_versions, '{{}}'),
+                                            {', '.join(['?, version + 1'] * len(section_updates))}),
+                version = version + 1,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND version = ?
+        ''', report_args + version_args + [project_id, expected_version])
+        if cursor.rowcount == 0:
+            conn.rollback()
+            return None
+
+        write_report_sections(cursor, project_id, section_updates)
+        cursor.execute('SELECT report_data FROM projects WHERE id = ?', (project_id,))
+        reindex_project_report(cursor, project_id, json.loads(cursor.fetchone()[0]))
+        conn.commit()
+        return expected_version + 1
+    finally:
+        conn.close()
+
+def refine_project_report(project_id, user_id, compute_updates, sections=None):
+    """Optimistic read-modify-write of a project report.
+
+    `compute_updates(report)` returns (section_updates, result). On a version
+    conflict, if the other writer touched different sections the same updates
+    are re-applied on top of the new version; if it touched one of ours, the
+    updates are recomputed from the fresh report. Returns
+    (project, result, updated) where project reflects the stored state.
+    `sections` limits the report passed to compute_updates (and returned) to
+    the sections the refinement actually reads.
+    """
+    project = get_project_for_user(project_id, user_id, sections)
+    if project is None:
+        return None, None, False
+
+    section_updates, result = compute_updates(project['report_data'])
+    for _ in range(PROJECT_UPDATE_RETRIES):
+        if not section_updates:
+            return project, result, False
+
+        if compare_and_set_sections(project_id, project['version'], section_updates):
+            return get_project_for_user(project_id, user_id, sections), result, True
+
+        latest = get_project_for_user(project_id, user_id, sections)
+        if latest is None:
+            return None, None, False
+        overlapping = [section for section in section_updates
+                       if latest['section_versions'].get(section) != project['section_versions'].get(section)]
+        if overlapping:
+            section_updates, result = compute_updates(latest['report_data'])
+        project = latest
+
+    raise ProjectUpdateConflict(f"Project {project_id} kept changing during refinement")
+
+# === SECTIONED REPORT STORAGE ===
+
+# Each report is also stored one row per section in project_sections, so a
+# reader that needs only tech_stack reads and decodes only that row.
+# report_data stays the full document for export, search and the HTML pages;
+# both are written in the same transaction.
+REPORT_SECTIONS = ('visual_roadmap', 'opportunity_analysis', 'competitive_landscape',
+                   'mvp_blueprint', 'tech_stack', 'learning_hub')
+REPORT_META_SECTION = 'meta'
+PROJECT_FIELDS = ('id', 'user_id', 'project_name', 'project_idea', 'report_data', 'version',
+                  'section_versions', 'created_at', 'updated_at')
+
+def split_report_sections(report):
+    """Break a report into {section: value}; top-level scalars go into 'meta'"""
+    intelligence = report.get('nexus_intelligence', {})
+    sections = {name: intelligence[name] for name in REPORT_SECTIONS if name in intelligence}
+    if 'visual_roadmap' in report:
+        sections['visual_roadmap'] = report['visual_roadmap']
+    sections[REPORT_META_SECTION] = {key: value for key, value in report.items()
+                                     if key not in ('visual_roadmap', 'nexus_intelligence')}
+    return sections
+
+def assemble_report(sections):
+    """Inverse of split_report_sections; missing sections are simply absent"""
+    report = dict(sections.get(REPORT_META_SECTION, {}))
+    if 'visual_roadmap' in sections:
+        report['visual_roadmap'] = sections['visual_roadmap']
+    intelligence = {name: sections[name] for name in REPORT_SECTIONS
+                    if name != 'visual_roadmap' and name in sections}
+    if intelligence:
+        report['nexus_intelligence'] = intelligence
+    return report
+
+def parse_field_list(value, allowed, name):
+    """Parse a comma-separated `fields=` / `sections=` value; None means everything"""
+    if not value:
+        return None
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown {name}: {', '.join(unknown)} (allowed: {', '.join(allowed)})")
+    return items
+
+def init_report_sections(cursor):
+    """Create the per-section table and backfill it the first time it is created"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'project_sections'")
+    is_new = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS project_sections (
+            project_id INTEGER NOT NULL,
+            section TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (project_id, section),
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        ) WITHOUT ROWID
+    ''')
+
+    if is_new:
+        cursor.execute('SELECT id, report_data FROM projects')
+        for project_id, report_data in cursor.fetchall():
+            write_report_sections(cursor, project_id, split_report_sections(json.loads(report_data)))
+
+def write_report_sections(cursor, project_id, sections):
+    """Upsert the given sections of one project; caller commits"""
+    cursor.executemany('INSERT OR REPLACE INTO project_sections (project_id, section, data) VALUES (?, ?, ?)',
+                       [(project_id, name, json.dumps(value)) for name, value in sections.items()])
+
+def read_report_sections(conn, project_id, sections):
+    """Read and decode only the requested sections of one project"""
+    if not sections:
+        return {}
+    rows = conn.execute(f'''
+        SELECT section, data FROM project_sections
+        WHERE project_id = ? AND section IN ({', '.join('?' * len(sections))})
+    ''', [project_id, *sections]).fetchall()
+    return {name: json.loads(data) for name, data in rows}
+
+# === ANALYTICS ROLLUPS ===
+
+# Per-day counters bumped in the same transaction as the conversation or
+# project write they describe, so dashboards read a few hundred rollup rows
+# instead of scanning (and re-classifying) every conversation.
+ANALYTICS_MAX_DAYS = 365
+
+def utc_timestamp(moment=None):
+    """UTC time in CURRENT_TIMESTAMP's format; a naive `moment` is taken as local time"""
+    moment = datetime.now(timezone.utc) if moment is None else moment.astimezone(timezone.utc)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+def rollup_day(timestamp=None):
+    """UTC day bucket of a utc_timestamp() / CURRENT_TIMESTAMP value"""
+    return (timestamp or utc_timestamp())[:10]
+
+def normalize_project_timestamps(cursor):
+    """Rewrite legacy local-time project created_at values (ISO 'T' form) as UTC; returns the row count"""
+    cursor.execute("SELECT id, created_at FROM projects WHERE created_at LIKE '____-__-__T%'")
+    rows = cursor.fetchall()
+    cursor.executemany('UPDATE projects SET created_at = ? WHERE id = ?',
+                       [(utc_timestamp(datetime.fromisoformat(created_at)), project_id)
+                        for project_id, created_at in rows])
+    return len(rows)
+
+def bump_rollups(cursor, day, counts):
+    """Add {(metric, dimension): n} to the rollups for one day; caller commits"""
+    cursor.executemany('''
+        INSERT INTO usage_rollups (day, metric, dimension, count) VALUES (?, ?, ?, ?)
+        ON CONFLICT (day, metric, dimension) DO UPDATE SET count = count + excluded.count
+    ''', [(day, metric, dimension, n) for (metric, dimension), n in counts.items()])
+
+def refinement_rollup_counts(intent):
+    """Rollup increments for one chat turn's refinement intent"""
+    counts = {('chat_turns', ''): 1, ('refinement_type', intent.get('type', 'general')): 1}
+    for modifier in set(intent.get('modifications', [])):
+        counts[('refinement_modifier', modifier)] = 1
+    return counts
+
+def init_usage_rollups(cursor):
+    """Create the rollup table and backfill it from history the first time"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'usage_rollups'")
+    is_new = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usage_rollups (
+            day TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            dimension TEXT NOT NULL DEFAULT '',
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, metric, dimension)
+        ) WITHOUT ROWID
+    ''')
+
+    if is_new:
+        backfill_usage_rollups(cursor)
+
+def backfill_usage_rollups(cursor):
+    """Recompute every rollup from the projects and conversations tables (one full scan)"""
+    cursor.execute('DELETE FROM usage_rollups')
+    cursor.execute('SELECT substr(created_at, 1, 10), COUNT(*) FROM projects GROUP BY 1')
+    for day, n in cursor.fetchall():
+        bump_rollups(cursor, day, {('projects_generated', ''): n})
+
+    cursor.execute('SELECT created_at, user_message FROM conversations')
+    for created_at, user_message in cursor.fetchall():
+        intent = analyze_user_refinement_request(user_message, None)
+        bump_rollups(cursor, rollup_day(created_at), refinement_rollup_counts(intent))
+
+def get_usage_analytics(days=30):
+    """Daily series and totals per metric for the last `days` days"""
+    days = max(1, min(days, ANALYTICS_MAX_DAYS))
+    since = (datetime.utcnow() - timedelta(days=days - 1)).strftime('%Y-%m-%d')
+    rows = query_all_shards('''
+        SELECT day, metric, dimension, count FROM usage_rollups
+        WHERE day >= ? ORDER BY day
+    ''', (since,))
+
+    metrics = {}
+    for _, (day, metric, dimension, count) in sorted(rows, key=lambda item: item[1][0]):
+        entry = metrics.setdefault(metric, {'total': 0, 'by_dimension': {}, 'daily': {}})
+        entry['total'] += count
+        if dimension:
+            entry['by_dimension'][dimension] = entry['by_dimension'].get(dimension, 0) + count
+        entry['daily'][day] = entry['daily'].get(day, 0) + count
+    return {'since': since, 'days': days, 'metrics': metrics}
+
+# === FULL-TEXT SEARCH ===
+# FTS5 indexes over project ideas, flattened report text and chat history.
+# Rows share the source table's id and are written in the same transaction
+# as the source row.
+
+SEARCH_AVAILABLE = True
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+SEARCH_SKIP_FIELDS = {'generated_at', 'url', 'rating', 'status'}
+
+def flatten_report_text(report):
+    """Collect the human-readable strings of a report into one searchable blob"""
+    parts = []
+
+    def walk(value):
+        if isinstance(value, dict):
+            for key, item in value.items():
+                if key not in SEARCH_SKIP_FIELDS:
+                    walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+        elif isinstance(value, str) and not value.startswith(('http://', 'https://')):
+            parts.append(value)
+
+    walk(report or {})
+    return '\n'.join(parts)
+
+def init_search_index(cursor):
+    """Create the FTS5 tables and backfill them the first time they are created"""
+    global SEARCH_AVAILABLE
+    cursor.execute("SELECT name FROM sqlite_master WHERE name IN ('projects_fts', 'conversations_fts')")
+    existing = {row[0] for row in cursor.fetchall()}
+
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS projects_fts USING fts5(
+                project_idea, report_text, user_id UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+                user_message, ai_response, project_id UNINDEXED, user_id UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        SEARCH_AVAILABLE = False
+        print(f"⚠️ Full-text search disabled (SQLite built without FTS5): {e}")
+        return
+
+    if 'projects_fts' not in existing:
+        cursor.execute('SELECT id, user_id, project_idea, report_data FROM projects WHERE deleted_at IS NULL')
+        for project_id, user_id, project_idea, report_data in cursor.fetchall():
+            index_project(cursor, project_id, user_id, project_idea, json.loads(report_data))
+    if 'conversations_fts' not in existing:
+        cursor.execute('''
+            INSERT INTO conversations_fts (rowid, user_message, ai_response, project_id, user_id)
+            SELECT c.id, c.user_message, c.ai_response, c.project_id, p.user_id
+            FROM conversations c JOIN projects p ON p.id = c.project_id
+            WHERE p.deleted_at IS NULL
+        ''')
+
+def index_project(cursor, project_id, user_id, project_idea, report):
+    """Add a newly inserted project to the search index"""
+    if not SEARCH_AVAILABLE:
+        return
+    cursor.execute('''
+        INSERT INTO projects_fts (rowid, project_idea, report_text, user_id)
+        VALUES (?, ?, ?, ?)
+    ''', (project_id, project_idea, flatten_report_text(report), user_id))
+
+def reindex_project_report(cursor, project_id, report):
+    """Refresh the indexed report text after a report update"""
+    if not SEARCH_AVAILABLE:
+        return
+    cursor.execute('''
+        UPDATE projects_fts SET report_text = ? WHERE rowid = ?
+    ''', (flatten_report_text(report), project_id))
+
+def unindex_project(cursor, project_id):
+    """Remove a project and its chat turns from the search index"""
+    if not SEARCH_AVAILABLE:
+        return
+    cursor.execute('DELETE FROM projects_fts WHERE rowid = ?', (project_id,))
+    cursor.execute('DELETE FROM conversations_fts WHERE project_id = ?', (project_id,))
+
+def index_conversation(cursor, conversation_id, project_id, user_message, ai_response):
+    """Add a saved chat turn to the search index"""
+    if not SEARCH_AVAILABLE:
+        return
+    cursor.execute('''
+        INSERT INTO conversations_fts (rowid, user_message, ai_response, project_id, user_id)
+        SELECT ?, ?, ?, id, user_id FROM projects WHERE id = ?
+    ''', (conversation_id, user_message, ai_response, project_id))
+
+def build_fts_query(text):
+    """Turn free text into a safe FTS5 query: every term must match, the last as a prefix"""
+    terms = re.findall(r'\w+', text.lower())
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def search_user_content(user_id, text, scope='all', page=1, per_page=SEARCH_PAGE_SIZE):
+    """Ranked, paginated search over a user's projects and conversations"""
+    query = build_fts_query(text)
+    if not query or not SEARCH_AVAILABLE:
+        return {'results': [], 'page': page, 'per_page': per_page, 'has_more': False}
+
+    selects, params = [], []
+    if scope in ('all', 'projects'):
+        selects.append('''
+            SELECT 'project' AS kind, rowid AS id, rowid AS project_id,
+                   snippet(projects_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                   bm25(projects_fts, 5.0, 1.0) AS rank
+            FROM projects_fts
+            WHERE projects_fts MATCH ? AND user_id = ?
+        ''')
+        params += [query, user_id]
+    if scope in ('all', 'conversations'):
+        selects.append('''
+            SELECT 'conversation' AS kind, rowid AS id, project_id,
+                   snippet(conversations_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                   bm25(conversations_fts, 2.0, 1.0) AS rank
+            FROM conversations_fts
+            WHERE conversations_fts MATCH ? AND user_id = ?
+              AND project_id NOT IN (SELECT project_id FROM project_purge_queue)
+        ''')
+        params += [query, user_id]
+
+    # Fetch one extra row to know whether another page exists
+    sql = ' UNION ALL '.join(selects) + ' ORDER BY rank LIMIT ? OFFSET ?'
+    params += [per_page + 1, (page - 1) * per_page]
+
+    conn = connect_db()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    return {
+        'results': [{
+            'type': kind,
+            'id': row_id,
+            'project_id': project_id,
+            'snippet': snippet,
+            'score': round(-rank, 4)
+        } for kind, row_id, project_id, snippet, rank in rows[:per_page]],
+        'page': page,
+        'per_page': per_page,
+        'has_more': len(rows) > per_page
+    }
+
+def rebuild_search_index():
+    """Drop and rebuild both FTS indexes from the source tables (on every shard)"""
+    for shard in each_shard():
+        with db_lock_for(shard):
+            conn = connect_db()
             cursor = conn.cursor()
-            
-            # Extract project name from the idea (first 100 characters)
-            project_name = project_idea[:100] + "..." if len(project_idea) > 100 else project_idea
-            
-            cursor.execute('''
-                INSERT INTO projects (user_id, project_name, project_idea, report_data, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, project_name, project_idea, json.dumps(report), datetime.now().isoformat()))
-            
-            project_id = cursor.lastrowid
+            cursor.execute('DROP TABLE IF EXISTS main.projects_fts')
+            cursor.execute('DROP TABLE IF EXISTS main.conversations_fts')
+            init_search_index(cursor)
             conn.commit()
             conn.close()
-            
-            print(f"✅ Project saved with ID: {project_id}")
-            return project_id
-            
-    except Exception as e:
-        print(f"Error saving project: {e}")
+
+# === NEAR-DUPLICATE IDEA INDEX ===
+# MinHash signatures over normalized idea tokens, bucketed with LSH banding.
+# Signatures and band buckets live in SQLite, so memory stays flat as the
+# projects table grows and a lookup touches only the matching buckets.
+
+SIMILARITY_THRESHOLD = float(os.getenv('NEXUS_SIMILARITY_THRESHOLD', '0.7'))
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16
+LSH_ROWS = MINHASH_PERMUTATIONS // LSH_BANDS
+SIMILARITY_MAX_CANDIDATES = 50
+# The tech stack (and its learning hub) is scored per idea, so it is never reused
+REUSABLE_SECTIONS = ('opportunity_analysis', 'competitive_landscape', 'mvp_blueprint')
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_MINHASH_PARAMS = [
+    (int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME or 1,
+     int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME)
+    for i in range(MINHASH_PERMUTATIONS)
+]
+
+IDEA_STOPWORDS = {
+    'a', 'an', 'the', 'for', 'of', 'to', 'and', 'or', 'with', 'that', 'which', 'in', 'on',
+    'my', 'our', 'your', 'i', 'we', 'want', 'build', 'create', 'make', 'new', 'powered', 'based', 'driven'
+}
+IDEA_SYNONYMS = {
+    'application': 'app', 'applications': 'app', 'apps': 'app',
+    'platform': 'app', 'tool': 'app', 'website': 'app', 'service': 'app',
+    'artificial': 'ai', 'intelligence': 'ai', 'ml': 'ai'
+}
+
+def idea_shingles(project_idea):
+    """Normalize an idea into its set of content-word shingles"""
+    shingles = set()
+    for word in re.findall(r'[a-z0-9]+', project_idea.lower()):
+        word = IDEA_SYNONYMS.get(word, word)
+        if word in IDEA_STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        shingles.add(word)
+    return shingles
+
+def minhash_signature(shingles):
+    """Compute a MINHASH_PERMUTATIONS-long MinHash signature for a shingle set"""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), 'big') for s in shingles]
+    if not hashes:
+        return [_MAX_HASH] * MINHASH_PERMUTATIONS
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _MINHASH_PARAMS]
+
+def lsh_buckets(signature):
+    """Hash each band of a signature into a bucket id"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]
+        digest = hashlib.blake2b(struct.pack(f'<{LSH_ROWS}I', *rows), digest_size=8).digest()
+        buckets.append((band, int.from_bytes(digest, 'big', signed=True)))
+    return buckets
+
+def init_similarity_index(cursor):
+    """Create the signature / LSH bucket tables and backfill them when new"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'idea_signatures'")
+    is_new = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS idea_signatures (
+            project_id INTEGER PRIMARY KEY,
+            signature BLOB NOT NULL,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS idea_lsh_buckets (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            project_id INTEGER NOT NULL,
+            user_id INTEGER,
+            PRIMARY KEY (band, bucket, project_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_idea_lsh_buckets_project ON idea_lsh_buckets (project_id)')
+    # Bucket tables created before the owner column get it backfilled below
+    added_owner = ensure_column(cursor, 'idea_lsh_buckets', 'user_id', 'INTEGER')
+
+    if is_new:
+        cursor.execute('SELECT id, user_id, project_idea FROM projects WHERE deleted_at IS NULL')
+        for project_id, user_id, project_idea in cursor.fetchall():
+            index_project_similarity(cursor, project_id, user_id, project_idea)
+    elif added_owner:
+        cursor.execute('''
+            UPDATE idea_lsh_buckets
+            SET user_id = (SELECT user_id FROM projects WHERE projects.id = idea_lsh_buckets.project_id)
+        ''')
+
+def index_project_similarity(cursor, project_id, user_id, project_idea):
+    """Insert one project's signature and LSH buckets (incremental)"""
+    signature = minhash_signature(idea_shingles(project_idea))
+    cursor.execute('INSERT OR REPLACE INTO idea_signatures (project_id, signature) VALUES (?, ?)',
+                   (project_id, struct.pack(f'<{MINHASH_PERMUTATIONS}I', *signature)))
+    cursor.executemany('INSERT OR IGNORE INTO idea_lsh_buckets (band, bucket, project_id, user_id) VALUES (?, ?, ?, ?)',
+                       [(band, bucket, project_id, user_id) for band, bucket in lsh_buckets(signature)])
+
+def unindex_project_similarity(cursor, project_id):
+    """Drop one project's signature and LSH buckets"""
+    cursor.execute('DELETE FROM idea_signatures WHERE project_id = ?', (project_id,))
+    cursor.execute('DELETE FROM idea_lsh_buckets WHERE project_id = ?', (project_id,))
+
+def find_similar_project(project_idea, threshold=None):
+    """Find the most similar stored project idea above `threshold`, from any user.
+
+    Returns {'project_id', 'project_idea', 'similarity', 'sections'} or None.
+    Candidates come from shared LSH buckets; the final score is the exact
+    Jaccard similarity of the two shingle sets. Only REUSABLE_SECTIONS are
+    read: they come from market lookups and chat never changes them, so
+    nothing a user refined is copied into another user's report.
+    """
+    threshold = SIMILARITY_THRESHOLD if threshold is None else threshold
+    shingles = idea_shingles(project_idea)
+    if not shingles:
         return None
 
-def update_project_report(project_id, updated_report):
-    """Update project report with refined data"""
+    buckets = lsh_buckets(minhash_signature(shingles))
+    conn = connect_global_db()
     try:
-        with db_lock:
-            conn = sqlite3.connect('nexus_data.db')
-            cursor = conn.cursor()
-            
+        cursor = conn.cursor()
+        clauses = ' OR '.join(['(band = ? AND bucket = ?)'] * len(buckets))
+        cursor.execute(f'''
+            SELECT project_id, COUNT(*) AS shared_bands FROM idea_lsh_buckets
+            WHERE {clauses}
+            GROUP BY project_id
+            ORDER BY shared_bands DESC, project_id DESC
+            LIMIT ?
+        ''', [value for pair in buckets for value in pair] + [SIMILARITY_MAX_CANDIDATES])
+        candidate_ids = [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+    if not candidate_ids:
+        return None
+
+    # Candidates can belong to any user, so with sharding they are looked up on every shard
+    candidates = query_all_shards(f'''
+        SELECT id, project_idea FROM projects
+        WHERE id IN ({','.join('?' * len(candidate_ids))}) AND deleted_at IS NULL
+    ''', candidate_ids)
+    best = None
+    for shard, (candidate_id, candidate_idea) in candidates:
+        other = idea_shingles(candidate_idea)
+        similarity = len(shingles & other) / len(shingles | other) if other else 0.0
+        if similarity >= threshold and (best is None or similarity > best[1]):
+            best = (candidate_id, similarity, candidate_idea, shard)
+    if best is None:
+        return None
+
+    conn = connect_db(best[3])
+    try:
+        sections = read_report_sections(conn, best[0], REUSABLE_SECTIONS)
+    finally:
+        conn.close()
+    return {
+        'project_id': best[0],
+        'project_idea': best[2],
+        'similarity': round(best[1], 3),
+        'sections': {name: value for name, value in sections.items() if value}
+    }
+
+def rebuild_similarity_index():
+    """Rebuild every MinHash signature and LSH bucket from the projects table(s)"""
+    sharded_projects = query_all_shards('SELECT id, user_id, project_idea FROM projects WHERE deleted_at IS NULL') \
+        if SHARD_COUNT > 0 else []
+    with db_lock:
+        conn = connect_global_db()
+        cursor = conn.cursor()
+        cursor.execute('DROP TABLE IF EXISTS idea_signatures')
+        cursor.execute('DROP TABLE IF EXISTS idea_lsh_buckets')
+        init_similarity_index(cursor)
+        for _, (project_id, user_id, project_idea) in sharded_projects:
+            index_project_similarity(cursor, project_id, user_id, project_idea)
+        conn.commit()
+        conn.close()
+
+# === TREND INGESTION ===
+# Configured RSS/Atom feeds are polled in the background with conditional GET
+# (ETag / Last-Modified); only entries not seen before are tokenized. Daily
+# term counts and term co-occurrence are rolled up in trend_terms, so report
+# generation answers "what is trending around this idea" with one indexed
+# query instead of fetching feeds inline.
+
+TREND_FEEDS = [url.strip() for url in os.getenv(
+    'NEXUS_TREND_FEEDS',
+    'https://hnrss.org/frontpage,https://techcrunch.com/feed/,https://www.producthunt.com/feed'
+).split(',') if url.strip()]
+TREND_POLL_MINUTES = float(os.getenv('NEXUS_TREND_POLL_MINUTES', '0'))
+TREND_WINDOW_DAYS = int(os.getenv('NEXUS_TREND_WINDOW_DAYS', '30'))
+TREND_TERMS_PER_ENTRY = 12
+TREND_SHORT_TERMS = {'ai', 'ar', 'vr', 'ev', 'go'}
+
+TREND_STOPWORDS = IDEA_STOPWORDS | {
+    'this', 'from', 'are', 'was', 'were', 'has', 'have', 'had', 'its', 'it', 'you', 'they', 'their',
+    'will', 'can', 'not', 'but', 'all', 'about', 'more', 'how', 'why', 'what', 'when', 'who', 'just',
+    'now', 'out', 'into', 'over', 'after', 'than', 'also', 'says', 'said', 'year', 'years', 'day',
+    'week', 'first', 'one', 'two', 'get', 'use', 'using', 'show', 'comment', 'comments', 'link',
+    'points', 'article', 'http', 'https', 'www', 'com', 'html', 'href', 'nbsp', 'amp', 'quot'
+}
+
+_trend_ingester = {'thread': None}
+
+def extract_trend_terms(text):
+    """Normalized, de-duplicated terms of a feed entry, in order of appearance"""
+    text = re.sub(r'<[^>]+>', ' ', text or '')
+    terms = []
+    for word in re.findall(r'[a-z][a-z0-9+#.-]*[a-z0-9+#]|[a-z]{3,}', text.lower()):
+        for term in idea_shingles(word):
+            if (len(term) >= 3 or term in TREND_SHORT_TERMS) and term not in TREND_STOPWORDS and term not in terms:
+                terms.append(term)
+    return terms[:TREND_TERMS_PER_ENTRY]
+
+def poll_trend_feed(conn, url):
+    """Poll one feed with conditional GET and fold its new entries into trend_terms.
+
+    Returns the number of new entries ingested.
+    """
+    feedparser = get_provider('feedparser')
+    if feedparser is None:
+        return 0
+
+    row = conn.execute('SELECT etag, last_modified FROM trend_feeds WHERE url = ?', (url,)).fetchone()
+    etag, modified = row if row else (None, None)
+    feed = feedparser.parse(url, etag=etag, modified=modified)
+
+    conn.execute('''
+        INSERT INTO trend_feeds (url, etag, last_modified, last_polled_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (url) DO UPDATE SET
+            etag = COALESCE(excluded.etag, trend_feeds.etag),
+            last_modified = COALESCE(excluded.last_modified, trend_feeds.last_modified),
+            last_polled_at = excluded.last_polled_at
+    ''', (url, getattr(feed, 'etag', None), getattr(feed, 'modified', None)))
+
+    if getattr(feed, 'status', 200) == 304:
+        conn.commit()
+        return 0
+
+    day = datetime.utcnow().strftime('%Y-%m-%d')
+    new_entries = 0
+    for entry in feed.entries:
+        entry_id = entry.get('id') or entry.get('link') or entry.get('title')
+        if not entry_id:
+            continue
+        key = hashlib.sha1(f"{url}\x00{entry_id}".encode('utf-8')).hexdigest()
+        inserted = conn.execute('INSERT OR IGNORE INTO trend_entries (entry_key, feed_url, title, seen_at) VALUES (?, ?, ?, ?)',
+                                (key, url, entry.get('title'), day)).rowcount
+        if not inserted:
+            continue
+
+        new_entries += 1
+        terms = extract_trend_terms(f"{entry.get('title', '')} {entry.get('summary', '')}")
+        counts = [(term, '', day) for term in terms]
+        counts += [(term, related, day) for term in terms for related in terms if related != term]
+        conn.executemany('''
+            INSERT INTO trend_terms (term, related, day, count) VALUES (?, ?, ?, 1)
+            ON CONFLICT (term, related, day) DO UPDATE SET count = count + 1
+        ''', counts)
+
+    conn.commit()
+    return new_entries
+
+def ingest_trend_feeds():
+    """Poll every configured feed once and expire days outside the rolling window"""
+    total = 0
+    conn = connect_db()
+    try:
+        for url in TREND_FEEDS:
+            try:
+                total += poll_trend_feed(conn, url)
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️ Trend feed {url} failed: {e}")
+
+        cutoff = (datetime.utcnow() - timedelta(days=TREND_WINDOW_DAYS)).strftime('%Y-%m-%d')
+        conn.execute('DELETE FROM trend_terms WHERE day < ?', (cutoff,))
+        conn.execute('DELETE FROM trend_entries WHERE seen_at < ?', (cutoff,))
+        conn.commit()
+    finally:
+        conn.close()
+    return total
+
+def get_trending_terms(project_idea, limit=5, days=7):
+    """Terms trending alongside an idea's keywords over the last `days` days.
+
+    Returns {'keywords': {term: mentions}, 'related': [(term, co_mentions), ...]}.
+    """
+    keywords = idea_keywords(project_idea)
+    if not keywords:
+        return {'keywords': {}, 'related': []}
+
+    since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+    placeholders = ','.join('?' * len(keywords))
+    conn = connect_db()
+    try:
+        rows = conn.execute(f'''
+            SELECT term, related, SUM(count) FROM trend_terms
+            WHERE term IN ({placeholders}) AND day >= ?
+            GROUP BY term, related
+        ''', keywords + [since]).fetchall()
+    finally:
+        conn.close()
+
+    mentions, related = {}, {}
+    for term, other, count in rows:
+        if other == '':
+            mentions[term] = count
+        elif other not in keywords:
+            related[other] = related.get(other, 0) + count
+    top_related = sorted(related.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return {'keywords': mentions, 'related': top_related}
+
+DEFAULT_MARKET_TRENDS = [
+    'Increasing demand for digital solutions',
+    'Growing mobile-first user base',
+    'Rising expectations for seamless user experience'
+]
+
+def describe_market_trends(project_idea):
+    """Human-readable trend lines for a report, falling back to the defaults"""
+    try:
+        trending = get_trending_terms(project_idea)
+    except sqlite3.Error as e:
+        print(f"Error loading trending terms: {e}")
+        return DEFAULT_MARKET_TRENDS
+
+    lines = [f"'{term}': {count} tech-news mentions this week"
+             for term, count in sorted(trending['keywords'].items(), key=lambda item: -item[1])]
+    if trending['related']:
+        lines.append('Trending alongside your idea: ' + ', '.join(term for term, _ in trending['related']))
+    return lines or DEFAULT_MARKET_TRENDS
+
+def start_trend_ingestion():
+    """Start the background polling thread when NEXUS_TREND_POLL_MINUTES is set"""
+    if TREND_POLL_MINUTES <= 0 or not TREND_FEEDS:
+        return
+    thread = _trend_ingester['thread']
+    if thread is not None and thread.is_alive():
+        return
+
+    def run():
+        while True:
+            try:
+                new_entries = ingest_trend_feeds()
+                if new_entries:
+                    print(f"✅ Ingested {new_entries} new trend entries")
+            except Exception as e:
+                print(f"⚠️ Trend ingestion failed: {e}")
+            time.sleep(TREND_POLL_MINUTES * 60)
+
+    _trend_ingester['thread'] = threading.Thread(target=run, name='trend-ingestion', daemon=True)
+    _trend_ingester['thread'].start()
+
+# === DATA EXPORT ===
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_TABLES = ('projects', 'conversations')
+
+def split_export_cursor(cursor):
+    """Split off the '<shard>/' prefix that full exports of a sharded install carry"""
+    if cursor and '/' in cursor:
+        shard, _, cursor = cursor.partition('/')
+        if not shard.isdigit():
+            raise ValueError(f"Invalid export cursor: {shard}/{cursor}")
+        return int(shard), cursor
+    return None, cursor
+
+def parse_export_cursor(cursor):
+    """Parse a resume cursor of the form '[<shard>/]<table>:<last_id>' into (table, last_id)"""
+    _, cursor = split_export_cursor(cursor)
+    if not cursor:
+        return EXPORT_TABLES[0], 0
+    table, _, last_id = cursor.partition(':')
+    if table not in EXPORT_TABLES or not last_id.isdigit():
+        raise ValueError(f"Invalid export cursor: {cursor}")
+    return table, int(last_id)
+
+def parse_export_since(since):
+    """Normalize an ISO-8601 'since' value to SQLite's datetime format"""
+    if not since:
+        return None
+    return datetime.fromisoformat(since.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+
+def _export_project_row(row):
+    return {
+        'type': 'project',
+        'id': row[0],
+        'user_id': row[1],
+        'project_name': row[2],
+        'project_idea': row[3],
+        'report_data': json.loads(row[4]) if row[4] else None,
+        'created_at': row[5],
+        'updated_at': row[6]
+    }
+
+def _export_conversation_row(row):
+    return {
+        'type': 'conversation',
+        'id': row[0],
+        'project_id': row[1],
+        'user_message': row[2],
+        'ai_response': row[3],
+        'refinements': json.loads(row[4]) if row[4] else None,
+        'created_at': row[5]
+    }
+
+EXPORT_QUERIES = {
+    'projects': ('''
+        SELECT id, user_id, project_name, project_idea, report_data, created_at, updated_at
+        FROM projects
+        WHERE id > ? AND deleted_at IS NULL
+          AND (? IS NULL OR user_id = ?)
+          AND (? IS NULL OR datetime(COALESCE(updated_at, created_at)) >= datetime(?))
+        ORDER BY id
+        LIMIT ?
+    ''', _export_project_row),
+    'conversations': ('''
+        SELECT c.id, c.project_id, c.user_message, c.ai_response, c.refinements, c.created_at
+        FROM conversations c
+        JOIN projects p ON p.id = c.project_id
+        WHERE c.id > ? AND p.deleted_at IS NULL
+          AND (? IS NULL OR p.user_id = ?)
+          AND (? IS NULL OR datetime(c.created_at) >= datetime(?))
+        ORDER BY c.id
+        LIMIT ?
+    ''', _export_conversation_row)
+}
+
+def iter_export_records(user_id=None, since=None, cursor=None, tables=EXPORT_TABLES):
+    """Stream export records for one user (or every user when user_id is None).
+
+    Rows are read in keyset-paginated batches of EXPORT_BATCH_SIZE, so memory
+    stays constant and no read transaction is held open between batches.
+    Every record carries a `cursor` that resumes the export right after it;
+    full exports of a sharded install walk the shards in order and prefix
+    the cursor with the shard.
+    """
+    since = parse_export_since(since)
+    if user_id is None and SHARD_COUNT > 0:
+        start_shard, cursor = split_export_cursor(cursor)
+        start_shard = start_shard or 0
+        for shard in shard_ids()[start_shard:]:
+            shard_cursor = cursor if shard == start_shard else None
+            for record in _iter_export_database(shard, None, since, shard_cursor, tables):
+                record['cursor'] = f"{shard}/{record['cursor']}"
+                yield record
+        return
+    shard = shard_for_user(user_id) if user_id is not None else None
+    yield from _iter_export_database(shard, user_id, since, cursor, tables)
+
+def _iter_export_database(shard, user_id, since, cursor, tables):
+    start_table, last_id = parse_export_cursor(cursor)
+    conn = connect_db(shard)
+    try:
+        for table in EXPORT_TABLES[EXPORT_TABLES.index(start_table):]:
+            if table not in tables:
+                last_id = 0
+                continue
+            query, to_record = EXPORT_QUERIES[table]
+            while True:
+                rows = conn.execute(query, (last_id, user_id, user_id, since, since,
+                                            EXPORT_BATCH_SIZE)).fetchall()
+                for row in rows:
+                    last_id = row[0]
+                    record = to_record(row)
+                    record['cursor'] = f"{table}:{last_id}"
+                    yield record
+                if len(rows) < EXPORT_BATCH_SIZE:
+                    break
+            last_id = 0
+    finally:
+        conn.close()
+
+def iter_export_ndjson(records):
+    """Encode export records as newline-delimited JSON"""
+    for record in records:
+        yield json.dumps(record, default=str) + '\n'
+
+class _ZipStream:
+    """Write-only file object that hands zip output to a generator as it is produced"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return chunks
+
+def iter_export_zip(user_id=None, since=None, cursor=None):
+    """Stream a zip archive with one NDJSON member per exported table"""
+    start_table, _ = parse_export_cursor(cursor)
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for table in EXPORT_TABLES[EXPORT_TABLES.index(start_table):]:
+            table_cursor = cursor if table == start_table else None
+            with archive.open(f"{table}.ndjson", 'w', force_zip64=True) as member:
+                records = iter_export_records(user_id, since, table_cursor, tables=(table,))
+                for line in iter_export_ndjson(records):
+                    member.write(line.encode('utf-8'))
+                    yield from stream.drain()
+            yield from stream.drain()
+    yield from stream.drain()
+
+# === REPORT EXPORTS ===
+# Downloadable renderings of one report version (Markdown, standalone HTML,
+# PDF). Rendering runs on a small per-process thread pool, never in the
+# request thread, and each artifact is written once to
+# NEXUS_EXPORT_DIR/<project_id>/v<version>.<ext>. Later downloads of the same
+# version are plain file responses (conditional, with Range support), and
+# render_report_export() also gives email jobs a file path to attach.
+
+EXPORT_DIR = os.getenv('NEXUS_EXPORT_DIR', 'exports')
+EXPORT_WORKERS = int(os.getenv('NEXUS_EXPORT_WORKERS', '2'))
+# How long a download request waits for a fresh render before answering 202
+EXPORT_WAIT_SECONDS = float(os.getenv('NEXUS_EXPORT_WAIT_SECONDS', '5'))
+EXPORT_FORMATS = {
+    'md': 'text/markdown',
+    'html': 'text/html',
+    'pdf': 'application/pdf'
+}
+
+_export_pool = {'pid': None, 'pool': None, 'jobs': {}}
+_export_lock = threading.Lock()
+
+def _join(items):
+    return ', '.join(str(item) for item in items or [])
+
+def report_export_blocks(project):
+    """Flatten a project report into (kind, content) blocks shared by every export format.
+
+    Kinds are h1/h2/h3, p (text) and ul (list of text).
+    """
+    report = project['report_data'] or {}
+    roadmap = report.get('visual_roadmap', {})
+    intel = report.get('nexus_intelligence', {})
+    blocks = [('h1', roadmap.get('project_name') or project['project_name']),
+              ('p', f"Idea: {project['project_idea']}"),
+              ('p', f"Report version {project['version']} · generated {report.get('generated_at', project['created_at'])}")]
+
+    blocks.append(('h2', f"Roadmap ({roadmap.get('estimated_timeline', 'timeline TBD')})"))
+    for phase in roadmap.get('phases', []):
+        blocks.append(('h3', f"Phase {phase.get('id')}: {phase.get('title')} ({phase.get('duration')})"))
+        blocks.append(('p', phase.get('description', '')))
+        blocks.append(('ul', [f"Activity: {a}" for a in phase.get('key_activities', [])]
+                            + [f"Deliverable: {d}" for d in phase.get('deliverables', [])]))
+    if roadmap.get('success_metrics'):
+        blocks += [('h3', 'Success metrics'), ('ul', roadmap['success_metrics'])]
+
+    opportunity = intel.get('opportunity_analysis')
+    if opportunity:
+        blocks += [('h2', 'Opportunity analysis'),
+                   ('p', f"Opportunity score: {opportunity.get('opportunity_score')}/10 · {opportunity.get('market_size', '')}"),
+                   ('p', f"Target audience: {opportunity.get('target_audience', '')}"),
+                   ('h3', 'Pain points'), ('ul', opportunity.get('pain_points', [])),
+                   ('h3', 'Market trends'), ('ul', opportunity.get('market_trends', []))]
+
+    competitive = intel.get('competitive_landscape')
+    if competitive:
+        blocks += [('h2', 'Competitive landscape'),
+                   ('ul', [f"{c.get('name')} ({c.get('market_share', 'n/a')}): strengths {_join(c.get('strengths'))}; "
+                           f"weaknesses {_join(c.get('weaknesses'))}"
+                           for c in competitive.get('direct_competitors', [])]),
+                   ('p', f"Indirect competitors: {_join(competitive.get('indirect_competitors'))}"),
+                   ('h3', 'Competitive advantages'), ('ul', competitive.get('competitive_advantages', [])),
+                   ('p', f"Market gap: {competitive.get('market_gap', '')}")]
+
+    mvp = intel.get('mvp_blueprint')
+    if mvp:
+        blocks += [('h2', 'MVP blueprint'),
+                   ('ul', [f"{f.get('name')} [{f.get('priority')}, {f.get('effort')}]: {f.get('description')}"
+                           for f in mvp.get('core_features', [])]),
+                   ('h3', 'Nice to have'), ('ul', mvp.get('nice_to_have_features', [])),
+                   ('h3', 'Technical requirements'), ('ul', mvp.get('technical_requirements', []))]
+
+    tech_stack = intel.get('tech_stack')
+    if tech_stack:
+        blocks.append(('h2', 'Tech stack'))
+        blocks.append(('ul', [f"{layer.title()}: {choice.get('primary')} ({choice.get('reasoning')}); "
+                              f"alternatives {_join(choice.get('alternatives'))}"
+                              for layer, choice in tech_stack.items() if isinstance(choice, dict)]))
+        if tech_stack.get('development_timeline'):
+            blocks.append(('p', f"Development timeline: {tech_stack['development_timeline']}"))
+
+    learning = intel.get('learning_hub')
+    if learning:
+        blocks.append(('h2', 'Learning hub'))
+        for level in ('beginner', 'intermediate', 'advanced'):
+            if learning.get(f'{level}_path'):
+                blocks += [('h3', f"{level.title()} path"), ('ul', learning[f'{level}_path'])]
+        resources = [f"{r.get('title')} ({r.get('type')}): {r.get('url')}"
+                     for items in learning.get('resources_by_technology', {}).values() for r in items]
+        if resources:
+            blocks += [('h3', 'Resources'), ('ul', resources)]
+
+    return [(kind, content) for kind, content in blocks if content]
+
+def render_report_markdown(blocks):
+    lines = []
+    for kind, content in blocks:
+        if kind == 'ul':
+            lines += [f"- {item}" for item in content]
+        else:
+            prefix = {'h1': '# ', 'h2': '## ', 'h3': '### '}.get(kind, '')
+            lines.append(f"{prefix}{content}")
+        lines.append('')
+    return '\n'.join(lines)
+
+REPORT_EXPORT_CSS = '''
+body { font-family: -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; max-width: 820px;
+       margin: 2.5rem auto; padding: 0 1.5rem; color: #1f2937; line-height: 1.55; }
+h1 { color: #4f46e5; } h2 { border-bottom: 1px solid #e5e7eb; padding-bottom: .3rem; margin-top: 2rem; }
+li { margin: .25rem 0; }
+'''
+
+def render_report_html(blocks):
+    """Standalone HTML document (inline CSS, no external assets)"""
+    body = []
+    for kind, content in blocks:
+        if kind == 'ul':
+            body.append('<ul>' + ''.join(f'<li>{escape(item)}</li>' for item in content) + '</ul>')
+        else:
+            body.append(f'<{kind}>{escape(content)}</{kind}>')
+    title = escape(blocks[0][1]) if blocks else 'Nexus report'
+    return (f'<!DOCTYPE html>\n<html lang="en"><head><meta charset="utf-8"><title>{title}</title>'
+            f'<style>{REPORT_EXPORT_CSS}</style></head>\n<body>\n' + '\n'.join(body) + '\n</body></html>\n')
+
+# Built-in PDF writer: Helvetica text pages, used when WeasyPrint is unavailable
+PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, PDF_MARGIN = 612, 792, 54
+PDF_STYLES = {'h1': (18, True), 'h2': (14, True), 'h3': (12, True), 'p': (10, False), 'ul': (10, False)}
+PDF_CHARMAP = str.maketrans({'★': '*', '☆': '-', '·': '-', '–': '-', '—': '-', '’': "'", '“': '"', '”': '"', '…': '...'})
+
+def _pdf_text(text):
+    text = str(text).translate(PDF_CHARMAP).encode('latin-1', 'replace').decode('latin-1')
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+def render_text_pdf(blocks):
+    """Lay out blocks as wrapped Helvetica text and write a minimal PDF 1.4 file"""
+    usable = PDF_PAGE_WIDTH - 2 * PDF_MARGIN
+    pages, ops, y = [], [], PDF_PAGE_HEIGHT - PDF_MARGIN
+    for kind, content in blocks:
+        size, bold = PDF_STYLES.get(kind, PDF_STYLES['p'])
+        items = [f"- {item}" for item in content] if kind == 'ul' else [content]
+        y -= size * 0.6 if kind.startswith('h') else 0
+        for item in items:
+            for line in textwrap.wrap(str(item), int(usable / (size * 0.5))) or ['']:
+                if y - size < PDF_MARGIN:
+                    pages.append(ops)
+                    ops, y = [], PDF_PAGE_HEIGHT - PDF_MARGIN
+                y -= size * 1.35
+                ops.append(f"BT /{'F2' if bold else 'F1'} {size} Tf {PDF_MARGIN} {y:.1f} Td ({_pdf_text(line)}) Tj ET")
+        y -= size * 0.5
+    pages.append(ops)
+
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None,
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>']
+    kids = []
+    for page_ops in pages:
+        stream = '\n'.join(page_ops).encode('latin-1')
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n'.encode('latin-1') + stream + b'\nendstream')
+        kids.append(len(objects) + 1)
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PDF_PAGE_WIDTH} {PDF_PAGE_HEIGHT}] '
+                       f'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {len(objects)} 0 R >>')
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>"
+
+    out, offsets = bytearray(b'%PDF-1.4\n'), []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n'.encode('latin-1') + (body if isinstance(body, bytes) else body.encode('latin-1')) + b'\nendobj\n'
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    out += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode('latin-1')
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    return bytes(out)
+
+def render_report_pdf(blocks):
+    weasyprint = get_provider('weasyprint')
+    if weasyprint is not None:
+        return weasyprint.HTML(string=render_report_html(blocks)).write_pdf()
+    return render_text_pdf(blocks)
+
+EXPORT_RENDERERS = {
+    'md': lambda blocks: render_report_markdown(blocks).encode('utf-8'),
+    'html': lambda blocks: render_report_html(blocks).encode('utf-8'),
+    'pdf': render_report_pdf
+}
+
+def export_path(project_id, version, fmt):
+    return os.path.join(EXPORT_DIR, str(project_id), f"v{version}.{fmt}")
+
+def _render_export(project, fmt):
+    """Render one format of one report version to disk (runs on the export pool)"""
+    path = export_path(project['id'], project['version'], fmt)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = EXPORT_RENDERERS[fmt](report_export_blocks(project))
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    # Older versions of this project will never be served again
+    for name in os.listdir(os.path.dirname(path)):
+        match = re.fullmatch(r'v(\d+)\.\w+', name)
+        if match and int(match.group(1)) < project['version']:
+            try:
+                os.remove(os.path.join(os.path.dirname(path), name))
+            except OSError:
+                pass
+    return path
+
+def submit_report_export(project, fmt):
+    """Queue a render on the per-process export pool (single-flight per version/format)"""
+    key = (project['id'], project['version'], fmt)
+    with _export_lock:
+        if _export_pool['pid'] != os.getpid():
+            _export_pool.update(pid=os.getpid(), jobs={},
+                                pool=ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='nexus-export'))
+        future = _export_pool['jobs'].get(key)
+        if future is None:
+            future = _export_pool['pool'].submit(_render_export, project, fmt)
+            _export_pool['jobs'][key] = future
+            future.add_done_callback(lambda _: _export_pool['jobs'].pop(key, None))
+    return future
+
+def render_report_export(project_id, user_id, fmt, timeout=None):
+    """Path of a project's current report in `fmt`, rendering it if needed.
+
+    Returns (project, path); path is None if the render did not finish within
+    `timeout` seconds (it keeps running in the background). project is None
+    when the user does not own the project.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    project = get_project_for_user(project_id, user_id)
+    if project is None:
+        return None, None
+    path = export_path(project_id, project['version'], fmt)
+    if os.path.exists(path):
+        return project, path
+    try:
+        return project, submit_report_export(project, fmt).result(timeout=timeout)
+    except FuturesTimeout:
+        return project, None
+
+def remove_report_exports(project_id):
+    """Delete every cached export of a project"""
+    directory = os.path.join(EXPORT_DIR, str(project_id))
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for name in os.listdir(directory):
+        try:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+        except OSError:
+            pass
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
+    return removed
+
+# === MAINTENANCE ===
+
+# Retention: chat turns older than NEXUS_CONVERSATION_RETENTION_DAYS are moved
+# to gzip'd NDJSON files under NEXUS_ARCHIVE_DIR (same record format as
+# /export), expired or revoked sessions are deleted, and freed pages are
+# returned to the filesystem with incremental VACUUM. Every step works in
+# small batches with a pause in between so foreground writes are not starved.
+CONVERSATION_RETENTION_DAYS = int(os.getenv('NEXUS_CONVERSATION_RETENTION_DAYS', '180'))
+ARCHIVE_DIR = os.getenv('NEXUS_ARCHIVE_DIR', 'archive')
+MAINTENANCE_BATCH_SIZE = int(os.getenv('NEXUS_MAINTENANCE_BATCH_SIZE', '500'))
+MAINTENANCE_PAUSE_SECONDS = float(os.getenv('NEXUS_MAINTENANCE_PAUSE_MS', '50')) / 1000
+MAINTENANCE_INTERVAL_HOURS = float(os.getenv('NEXUS_MAINTENANCE_INTERVAL_HOURS', '0'))
+VACUUM_PAGES_PER_STEP = 256
+# Soft-deleted projects are purged by a background thread, a few rows per transaction
+PURGE_BATCH_SIZE = int(os.getenv('NEXUS_PURGE_BATCH_SIZE', '200'))
+PURGE_INTERVAL_SECONDS = float(os.getenv('NEXUS_PURGE_INTERVAL_SECONDS', '60'))
+
+_maintenance = {'thread': None, 'last_report': None}
+_project_purger = {'thread': None, 'wake': threading.Event()}
+
+def database_size():
+    """Return (file bytes, free-list bytes) summed over the application database files"""
+    total, free = 0, 0
+    for _, path in database_files():
+        conn = open_db(path)
+        try:
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            total += conn.execute('PRAGMA page_count').fetchone()[0] * page_size
+            free += conn.execute('PRAGMA freelist_count').fetchone()[0] * page_size
+        finally:
+            conn.close()
+    return total, free
+
+def archive_old_conversations(days=None):
+    """Move conversations older than the retention window to compressed cold storage.
+
+    Each batch is appended to the archive file and fsynced before its rows
+    are deleted, so a crash can duplicate archived rows but never lose them.
+    Returns (rows archived, archive path or None).
+    """
+    days = CONVERSATION_RETENTION_DAYS if days is None else days
+    if days <= 0:
+        return 0, None
+    path = os.path.join(ARCHIVE_DIR, f"conversations-{datetime.now().strftime('%Y%m%d%H%M%S')}.ndjson.gz")
+    archived = 0
+    for _ in each_shard():
+        archived += _archive_shard_conversations(days, path)
+    return archived, (path if archived else None)
+
+def _archive_shard_conversations(days, path):
+    """Archive loop for the bound shard; returns rows archived"""
+    archived = 0
+    while True:
+        conn = connect_db()
+        try:
+            rows = conn.execute('''
+                SELECT c.id, c.project_id, c.user_message, c.ai_response, c.refinements, c.created_at, p.user_id
+                FROM conversations c
+                LEFT JOIN projects p ON p.id = c.project_id
+                WHERE c.created_at < datetime('now', ?)
+                ORDER BY c.id
+                LIMIT ?
+            ''', (f'-{days} days', MAINTENANCE_BATCH_SIZE)).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            break
+
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        with open(path, 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                for row in rows:
+                    record = _export_conversation_row(row)
+                    record['user_id'] = row[6]
+                    archive.write((json.dumps(record, default=str) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        ids = [(row[0],) for row in rows]
+        def write(cursor):
+            cursor.executemany('DELETE FROM conversations WHERE id = ?', ids)
+            if SEARCH_AVAILABLE:
+                cursor.executemany('DELETE FROM conversations_fts WHERE rowid = ?', ids)
+        submit_write(write)
+
+        archived += len(rows)
+        time.sleep(MAINTENANCE_PAUSE_SECONDS)
+
+    return archived
+
+def purge_expired_sessions():
+    """Delete expired or revoked session rows in small batches"""
+    purged = 0
+    while True:
+        def write(cursor):
             cursor.execute('''
-                UPDATE projects 
-                SET report_data = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (json.dumps(updated_report), project_id))
-            
+                DELETE FROM user_sessions WHERE id IN (
+                    SELECT id FROM user_sessions
+                    WHERE is_revoked OR datetime(expires_at) < datetime('now')
+                    LIMIT ?
+                )
+            ''', (MAINTENANCE_BATCH_SIZE,))
+            return cursor.rowcount
+        deleted = submit_write(write)
+        purged += deleted
+        if deleted < MAINTENANCE_BATCH_SIZE:
+            return purged
+        time.sleep(MAINTENANCE_PAUSE_SECONDS)
+
+def incremental_vacuum():
+    """Release free pages a few at a time; returns False if any file's auto_vacuum is not incremental"""
+    vacuumed = True
+    for shard, path in database_files():
+        conn = open_db(path)
+        try:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                vacuumed = False
+                continue
+            while conn.execute('PRAGMA freelist_count').fetchone()[0] > 0:
+                with db_lock_for(shard):
+                    conn.execute(f'PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})').fetchall()
+                time.sleep(MAINTENANCE_PAUSE_SECONDS)
+        finally:
+            conn.close()
+    return vacuumed
+
+def enable_incremental_vacuum():
+    """One-off full VACUUM that switches existing database files to incremental auto_vacuum"""
+    for shard, path in database_files():
+        with db_lock_for(shard):
+            conn = open_db(path)
+            try:
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+            finally:
+                conn.close()
+
+def analyze_database():
+    """Refresh query-planner statistics with a bounded sample per index"""
+    for _, path in database_files():
+        conn = open_db(path)
+        try:
+            conn.execute('PRAGMA analysis_limit = 400')
+            conn.execute('ANALYZE')
             conn.commit()
+        finally:
             conn.close()
-            return True
-            
-    except Exception as e:
-        print(f"Error updating project report: {e}")
-        return False
+
+def purge_project_batch(project_id, batch_size=None):
+    """Delete one batch of a soft-deleted project's chat history.
+
+    Returns the number of conversations removed; once none are left the
+    project's remaining small rows and the project itself go, and 0 is
+    returned.
+    """
+    batch_size = batch_size or PURGE_BATCH_SIZE
+
+    def write(cursor):
+        cursor.execute('SELECT id FROM conversations WHERE project_id = ? ORDER BY id LIMIT ?',
+                       (project_id, batch_size))
+        ids = [row[0] for row in cursor.fetchall()]
+        if ids:
+            marks = ','.join('?' * len(ids))
+            if SEARCH_AVAILABLE:
+                cursor.execute(f'DELETE FROM conversations_fts WHERE rowid IN ({marks})', ids)
+            cursor.execute(f'DELETE FROM conversations WHERE id IN ({marks})', ids)
+            return len(ids)
+        cursor.execute('DELETE FROM conversation_summaries WHERE project_id = ?', (project_id,))
+        cursor.execute('DELETE FROM project_sections WHERE project_id = ?', (project_id,))
+        cursor.execute('DELETE FROM projects WHERE id = ? AND deleted_at IS NOT NULL', (project_id,))
+        cursor.execute('DELETE FROM project_purge_queue WHERE project_id = ?', (project_id,))
+        return 0
+
+    return submit_write(write)
+
+def purge_deleted_projects(limit=None):
+    """Work through every shard's purge queue in throttled batches; returns projects fully purged"""
+    purged = 0
+    for _ in each_shard():
+        conn = connect_db()
+        try:
+            rows = conn.execute('SELECT project_id FROM project_purge_queue ORDER BY deleted_at LIMIT ?',
+                                (limit or -1,)).fetchall()
+        finally:
+            conn.close()
+
+        for (project_id,) in rows:
+            while purge_project_batch(project_id):
+                time.sleep(MAINTENANCE_PAUSE_SECONDS)
+            remove_report_exports(project_id)
+            purged += 1
+    return purged
+
+def start_project_purger():
+    """Start the background purger; soft deletes wake it, otherwise it polls every NEXUS_PURGE_INTERVAL_SECONDS"""
+    thread = _project_purger['thread']
+    if thread is not None and thread.is_alive():
+        return
+
+    def run():
+        while True:
+            _project_purger['wake'].wait(PURGE_INTERVAL_SECONDS)
+            _project_purger['wake'].clear()
+            try:
+                purged = purge_deleted_projects()
+                if purged:
+                    print(f"✅ Purged {purged} deleted project(s)")
+            except Exception as e:
+                print(f"⚠️ Project purge failed: {e}")
+
+    _project_purger['thread'] = threading.Thread(target=run, name='project-purger', daemon=True)
+    _project_purger['thread'].start()
+
+def run_maintenance(retention_days=None):
+    """Run every retention and compaction step once and report what it did"""
+    # The background leader and a cron `flask maintain` must not archive the same rows
+    with maintenance_run_lock():
+        return _run_maintenance(retention_days)
+
+def _run_maintenance(retention_days):
+    started = time.perf_counter()
+    size_before, _ = database_size()
+
+    archived, archive_path = archive_old_conversations(retention_days)
+    sessions = purge_expired_sessions()
+    projects = purge_deleted_projects()
+    idempotency_keys = purge_expired_idempotency_keys()
+    llm_cache = prune_llm_cache()
+    vacuumed = incremental_vacuum()
+    analyze_database()
+
+    size_after, free_after = database_size()
+    report = {
+        'conversations_archived': archived,
+        'archive_file': archive_path,
+        'sessions_purged': sessions,
+        'deleted_projects_purged': projects,
+        'idempotency_keys_purged': idempotency_keys,
+        'llm_cache_pruned': llm_cache,
+        'incremental_vacuum': vacuumed,
+        'bytes_before': size_before,
+        'bytes_after': size_after,
+        'reclaimed_bytes': size_before - size_after,
+        'free_bytes': free_after,
+        'seconds': round(time.perf_counter() - started, 3),
+        'finished_at': datetime.now().isoformat()
+    }
+    if not vacuumed:
+        print("⚠️ auto_vacuum is not INCREMENTAL; run `flask maintain --enable-incremental-vacuum` once")
+    _maintenance['last_report'] = report
+    return report
+
+def start_maintenance():
+    """Start the background maintenance thread when NEXUS_MAINTENANCE_INTERVAL_HOURS is set"""
+    if MAINTENANCE_INTERVAL_HOURS <= 0:
+        return
+    thread = _maintenance['thread']
+    if thread is not None and thread.is_alive():
+        return
+
+    def run():
+        while True:
+            time.sleep(MAINTENANCE_INTERVAL_HOURS * 3600)
+            try:
+                report = run_maintenance()
+                print(f"✅ Maintenance reclaimed {report['reclaimed_bytes']} bytes in {report['seconds']}s")
+            except Exception as e:
+                print(f"⚠️ Maintenance failed: {e}")
+
+    _maintenance['thread'] = threading.Thread(target=run, name='maintenance', daemon=True)
+    _maintenance['thread'].start()
+
+# Host-wide background jobs (maintenance, purger, tech index and trend
+# polling) run in one worker per host: the process holding an exclusive
+# flock on NEXUS_LOCK_DIR/nexus-background.lock. The other workers retry
+# every BACKGROUND_LEADER_RETRY_SECONDS, so a new leader takes over when the
+# old one exits. run_maintenance() also holds its own lock, so a cron
+# `flask maintain` never overlaps the leader's run.
+LOCK_DIR = os.getenv('NEXUS_LOCK_DIR', '')
+BACKGROUND_LEADER_RETRY_SECONDS = float(os.getenv('NEXUS_BACKGROUND_LEADER_RETRY_SECONDS', '30'))
+
+_background_leader = {'thread': None, 'fd': None}
+
+def lock_file_path(name):
+    return os.path.join(LOCK_DIR or os.path.dirname(os.path.abspath(DATABASE_PATH)), name)
+
+def try_lock_file(name, blocking=False):
+    """Exclusive flock on a file in the lock directory; returns the fd, or None if another process holds it"""
+    fd = os.open(lock_file_path(name), os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is None:
+        return fd  # No flock on this platform: behave as a single process
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+@contextmanager
+def maintenance_run_lock():
+    """Serialize maintenance runs across every process on the host"""
+    fd = try_lock_file('nexus-maintenance.lock', blocking=True)
+    try:
+        yield
+    finally:
+        os.close(fd)
+
+def start_background_jobs():
+    """Start the host-wide background threads once this process wins the leader lock"""
+    thread = _background_leader['thread']
+    if thread is not None and thread.is_alive():
+        return
+
+    def run():
+        while _background_leader['fd'] is None:
+            try:
+                _background_leader['fd'] = try_lock_file('nexus-background.lock')
+            except OSError as e:
+                print(f"⚠️ Background leader lock failed: {e}")
+            if _background_leader['fd'] is None:
+                time.sleep(BACKGROUND_LEADER_RETRY_SECONDS)
+        print(f"✅ Background jobs running in process {os.getpid()}")
+        start_tech_index_refresher()
+        start_trend_ingestion()
+        start_maintenance()
+        start_project_purger()
+
+    _background_leader['thread'] = threading.Thread(target=run, name='background-leader', daemon=True)
+    _background_leader['thread'].start()
+
+def reset_background_jobs():
+    """Drop a leader lock inherited through fork (the parent keeps leading)"""
+    if _background_leader['fd'] is not None:
+        os.close(_background_leader['fd'])
+    _background_leader.update(thread=None, fd=None)
+
+# === GEMINI CALL LAYER ===
+# Every LLM call goes through llm_generate() / llm_stream(), which add:
+#   - a persistent prompt -> response cache (llm_cache table)
+#   - single-flight coalescing of identical in-flight prompts in this process
+#   - per-user and global daily token budgets (llm_token_usage table)
+# NEXUS_LLM_BACKEND=fake swaps in FakeGeminiModel for tests and offline work.
+
+LLM_BACKEND = os.getenv('NEXUS_LLM_BACKEND', 'gemini')
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-pro')
+LLM_CACHE_TTL_HOURS = int(os.getenv('NEXUS_LLM_CACHE_TTL_HOURS', '168'))
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv('NEXUS_LLM_MAX_OUTPUT_TOKENS', '1024'))
+LLM_GLOBAL_DAILY_TOKENS = int(os.getenv('NEXUS_LLM_GLOBAL_DAILY_TOKENS', '2000000'))
+LLM_USER_DAILY_TOKENS = int(os.getenv('NEXUS_LLM_USER_DAILY_TOKENS', '50000'))
+# Per-call Gemini timeout; also how long a coalesced caller waits on the leader
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv('NEXUS_LLM_REQUEST_TIMEOUT_SECONDS', '60'))
+
+_llm_inflight = {}
+_llm_inflight_lock = threading.Lock()
+
+class TokenBudgetExceeded(Exception):
+    """Raised when a call would exceed the per-user or global daily token budget"""
+
+class FakeGeminiModel:
+    """Deterministic, offline stand-in for genai.GenerativeModel"""
+
+    class _Chunk:
+        def __init__(self, text):
+            self.text = text
+
+    def __init__(self, model_name='fake-gemini', delay=0.0):
+        self.model_name = model_name
+        self.delay = delay
+        self.calls = 0
+
+    def _reply(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        words = ' '.join(prompt.split()[:24])
+        return f"[{self.model_name}:{digest}] {words}"
+
+    def generate_content(self, prompt, generation_config=None, stream=False, request_options=None):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        text = self._reply(prompt)
+        if stream:
+            return (self._Chunk(part) for part in re.findall(r'\S+\s*', text))
+        return self._Chunk(text)
+
+_fake_llm_model = FakeGeminiModel()
+
+def get_llm_model():
+    """Return the model object for the configured backend (None in demo mode)"""
+    if LLM_BACKEND == 'fake':
+        return _fake_llm_model
+    genai = get_provider('gemini')
+    if genai is None or GEMINI_API_KEY == 'demo_key':
+        return None
+    ensure_process_resources()
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token) used for budgeting"""
+    return len(text) // 4 + 1
+
+def llm_cache_key(prompt, max_output_tokens):
+    model_name = 'fake' if LLM_BACKEND == 'fake' else GEMINI_MODEL
+    return hashlib.sha256(f"{model_name}\x00{max_output_tokens}\x00{prompt}".encode('utf-8')).hexdigest()
+
+def get_cached_llm_response(key):
+    conn = connect_db()
+    try:
+        row = conn.execute('''
+            SELECT response FROM llm_cache
+            WHERE prompt_hash = ? AND created_at >= datetime('now', ?)
+        ''', (key, f'-{LLM_CACHE_TTL_HOURS} hours')).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+def store_llm_response(key, response, tokens):
+    conn = connect_db()
+    try:
+        conn.execute('''
+            INSERT OR REPLACE INTO llm_cache (prompt_hash, response, tokens, created_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (key, response, tokens))
+        conn.commit()
+    finally:
+        conn.close()
+
+def reserve_llm_tokens(user_id, tokens):
+    """Atomically charge `tokens` to today's global and per-user budgets"""
+    scopes = [('global', LLM_GLOBAL_DAILY_TOKENS)]
+    if user_id is not None:
+        scopes.append((f'user:{user_id}', LLM_USER_DAILY_TOKENS))
+
+    day = datetime.utcnow().strftime('%Y-%m-%d')
+    conn = connect_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        for scope, limit in scopes:
+            row = conn.execute('SELECT tokens FROM llm_token_usage WHERE scope = ? AND day = ?',
+                               (scope, day)).fetchone()
+            if (row[0] if row else 0) + tokens > limit:
+                conn.rollback()
+                raise TokenBudgetExceeded(f"Daily token budget exhausted for {scope}")
+        for scope, _ in scopes:
+            conn.execute('''
+                INSERT INTO llm_token_usage (scope, day, tokens) VALUES (?, ?, ?)
+                ON CONFLICT (scope, day) DO UPDATE SET tokens = tokens + excluded.tokens
+            ''', (scope, day, tokens))
+        conn.commit()
+    finally:
+        conn.close()
+
+def refund_llm_tokens(user_id, tokens):
+    """Return unused reserved tokens once the real usage is known"""
+    if tokens <= 0:
+        return
+    day = datetime.utcnow().strftime('%Y-%m-%d')
+    scopes = ['global'] + ([f'user:{user_id}'] if user_id is not None else [])
+    conn = connect_db()
+    try:
+        conn.executemany('''
+            UPDATE llm_token_usage SET tokens = MAX(0, tokens - ?) WHERE scope = ? AND day = ?
+        ''', [(tokens, scope, day) for scope in scopes])
+        conn.commit()
+    finally:
+        conn.close()
+
+def get_llm_token_usage(user_id=None):
+    """Today's token usage and limits for the global and (optionally) user budget"""
+    day = datetime.utcnow().strftime('%Y-%m-%d')
+    conn = connect_db()
+    try:
+        def used(scope):
+            row = conn.execute('SELECT tokens FROM llm_token_usage WHERE scope = ? AND day = ?',
+                               (scope, day)).fetchone()
+            return row[0] if row else 0
+        usage = {'global': {'used': used('global'), 'limit': LLM_GLOBAL_DAILY_TOKENS}}
+        if user_id is not None:
+            usage['user'] = {'used': used(f'user:{user_id}'), 'limit': LLM_USER_DAILY_TOKENS}
+        return usage
+    finally:
+        conn.close()
+
+def _llm_call(model, prompt, user_id, max_output_tokens):
+    """Yield response chunks from the model, charging the token budgets"""
+    reserved = estimate_tokens(prompt) + max_output_tokens
+    reserve_llm_tokens(user_id, reserved)
+    produced = []
+    try:
+        response = model.generate_content(
+            prompt,
+            generation_config={'max_output_tokens': max_output_tokens},
+            stream=True,
+            request_options={'timeout': LLM_REQUEST_TIMEOUT_SECONDS}
+        )
+        for chunk in response:
+            text = getattr(chunk, 'text', '') or ''
+            produced.append(text)
+            yield text
+    finally:
+        actual = estimate_tokens(prompt) + estimate_tokens(''.join(produced))
+        refund_llm_tokens(user_id, reserved - actual)
+
+def llm_stream(prompt, user_id=None, max_output_tokens=LLM_MAX_OUTPUT_TOKENS, use_cache=True):
+    """Stream a model response as text chunks.
+
+    Cached responses and responses coalesced onto an identical in-flight call
+    are yielded as a single chunk. Raises TokenBudgetExceeded when the budget
+    is exhausted; yields nothing in demo mode (no model configured).
+    """
+    key = llm_cache_key(prompt, max_output_tokens)
+    if use_cache:
+        cached = get_cached_llm_response(key)
+        if cached is not None:
+            yield cached
+            return
+
+    with _llm_inflight_lock:
+        flight = _llm_inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = {'event': threading.Event(), 'result': None}
+            _llm_inflight[key] = flight
+
+    if not leader:
+        flight['event'].wait(LLM_REQUEST_TIMEOUT_SECONDS)
+        if flight['result'] is not None:
+            yield flight['result']
+            return
+        # The leader failed, stalled or was abandoned; make our own call
+        # outside the flight so a stalled leader can't be joined again
+        model = get_llm_model()
+        if model is not None:
+            yield from _llm_call(model, prompt, user_id, max_output_tokens)
+        return
+
+    chunks = []
+    try:
+        model = get_llm_model()
+        if model is None:
+            return
+        for text in _llm_call(model, prompt, user_id, max_output_tokens):
+            chunks.append(text)
+            yield text
+        flight['result'] = ''.join(chunks)
+        store_llm_response(key, flight['result'], estimate_tokens(flight['result']))
+    finally:
+        with _llm_inflight_lock:
+            _llm_inflight.pop(key, None)
+        flight['event'].set()
+
+def llm_generate(prompt, user_id=None, max_output_tokens=LLM_MAX_OUTPUT_TOKENS, use_cache=True):
+    """Return the full model response for a prompt (None in demo mode)"""
+    chunks = list(llm_stream(prompt, user_id, max_output_tokens, use_cache))
+    return ''.join(chunks) if chunks else None
+
+def prune_llm_cache():
+    """Delete cache entries older than the TTL; returns the number removed"""
+    conn = connect_db()
+    try:
+        cursor = conn.execute("DELETE FROM llm_cache WHERE created_at < datetime('now', ?)",
+                              (f'-{LLM_CACHE_TTL_HOURS} hours',))
+        conn.commit()
+        return cursor.rowcount
+    finally:
+        conn.close()
 
 # === AI REFINEMENT SYSTEM ===
 
+# The only report sections generate_refined_response reads
+REFINEMENT_SECTIONS = ('visual_roadmap', 'tech_stack')
+
 def analyze_user_refinement_request(user_message, current_report):
     """Analyze what the user wants to refine about their project"""
     try:
@@ -818,8 +4734,13 @@ def analyze_user_refinement_request(user_message, current_report):
         print(f"Error analyzing refinement request: {e}")
         return {'type': 'general', 'focus_areas': [], 'modifications': []}
 
-def generate_refined_response(user_message, current_report, refinement_intent):
-    """Generate AI response and refined recommendations"""
+def generate_refined_response(user_message, current_report, refinement_intent, context=None):
+    """Generate AI response and refined recommendations
+
+    With a conversation `context` (build_conversation_context) and an LLM
+    configured, the reply text comes from the model; otherwise the rule-based
+    message is used.
+    """
     try:
         response = {
             'message': '',
@@ -837,16 +4758,14 @@ def generate_refined_response(user_message, current_report, refinement_intent):
                 "Use templates and pre-built components"
             ]
             
-            # Update tech stack for budget optimization
-            if 'nexus_intelligence' in current_report and 'tech_stack' in current_report['nexus_intelligence']:
-                tech_stack = current_report['nexus_intelligence']['tech_stack'].copy()
-                tech_stack['deployment'] = {
-                    'primary': 'Vercel + PlanetScale (Free tier)',
-                    'reasoning': 'Optimized for budget-conscious development with generous free tiers',
-                    'alternatives': ['Netlify + Supabase', 'Firebase'],
-                    'supporting_tools': ['GitHub Actions (free)', 'Cloudflare (free)']
-                }
+            # Re-rank the tech stack with affordability weighted up
+            tech_stack = generate_tech_stack_recommendation(
+                current_report.get('project_idea', ''),
+                ['budget', *refinement_intent['modifications']]
+            )
+            if tech_stack:
                 response['report_updates']['tech_stack'] = tech_stack
+                response['report_updates']['learning_hub'] = generate_learning_hub(tech_stack)
                 
         elif refinement_intent['type'] == 'timeline':
             response['message'] = "Let me help you accelerate your development timeline with these strategies:"
@@ -859,13 +4778,14 @@ def generate_refined_response(user_message, current_report, refinement_intent):
             
             # Update timeline in roadmap
             if 'visual_roadmap' in current_report:
-                roadmap = current_report['visual_roadmap'].copy()
-                for phase in roadmap['phases']:
-                    if phase['id'] == 1:
-                        phase['duration'] = '2-4 weeks'
-                        phase['description'] = 'Fast-track MVP development with pre-built components'
-                    elif phase['id'] == 2:
-                        phase['duration'] = '4-8 weeks'
+                # New phase dicts, so the cached report the caller passed in is left untouched
+                timeline_updates = {
+                    1: {'duration': '2-4 weeks', 'description': 'Fast-track MVP development with pre-built components'},
+                    2: {'duration': '4-8 weeks'}
+                }
+                roadmap = dict(current_report['visual_roadmap'])
+                roadmap['phases'] = [dict(phase, **timeline_updates.get(phase['id'], {}))
+                                     for phase in roadmap['phases']]
                 response['report_updates']['visual_roadmap'] = roadmap
                 
         elif refinement_intent['type'] == 'features':
@@ -886,6 +4806,17 @@ def generate_refined_response(user_message, current_report, refinement_intent):
                 "Factor in community support and ecosystem"
             ]
             
+            # Re-rank the stack when the request carries a preference (mobile, web, simple, advanced)
+            if refinement_intent['modifications']:
+                tech_stack = generate_tech_stack_recommendation(
+                    current_report.get('project_idea', ''),
+                    refinement_intent['modifications']
+                )
+                if tech_stack:
+                    response['message'] = "I've re-ranked the technology stack around your preferences:"
+                    response['report_updates']['tech_stack'] = tech_stack
+                    response['report_updates']['learning_hub'] = generate_learning_hub(tech_stack)
+            
         elif refinement_intent['type'] == 'market':
             response['message'] = "I'll help you dive deeper into market analysis and competitive positioning:"
             response['suggestions'] = [
@@ -915,6 +4846,16 @@ def generate_refined_response(user_message, current_report, refinement_intent):
                 "Customize your learning path"
             ]
         
+        if context is not None:
+            try:
+                reply = llm_generate(build_refinement_prompt(user_message, current_report, context),
+                                     user_id=context.get('user_id'))
+            except TokenBudgetExceeded as e:
+                print(f"LLM budget exhausted, using rule-based reply: {e}")
+                reply = None
+            if reply:
+                response['message'] = reply.strip()
+        
         return response
         
     except Exception as e:
@@ -925,9 +4866,420 @@ def generate_refined_response(user_message, current_report, refinement_intent):
             'report_updates': {}
         }
 
+# === CONVERSATION CONTEXT ===
+# Refinement prompts get a bounded view of the project history: a rolling
+# summary of older turns (cached in conversation_summaries) plus the last
+# NEXUS_CONTEXT_RECENT_TURNS raw turns, all within NEXUS_CONTEXT_TOKEN_BUDGET.
+# The request path only reads the cached summary; turns that have aged out
+# are folded into it on a background worker after each saved exchange.
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv('NEXUS_CONTEXT_TOKEN_BUDGET', '1500'))
+CONTEXT_RECENT_TURNS = int(os.getenv('NEXUS_CONTEXT_RECENT_TURNS', '6'))
+SUMMARY_TOKEN_LIMIT = int(os.getenv('NEXUS_SUMMARY_TOKEN_LIMIT', '400'))
+# Each report section in a refinement prompt is clipped to this many tokens
+CONTEXT_SECTION_TOKENS = int(os.getenv('NEXUS_CONTEXT_SECTION_TOKENS', '300'))
+SUMMARY_WORKERS = 1
+
+_summary_pool = {'pid': None, 'pool': None, 'jobs': {}}
+_summary_lock = threading.Lock()
+
+def turn_tokens(turn):
+    return estimate_tokens(turn['user_message']) + estimate_tokens(turn['ai_response'])
+
+def _clip(text, limit):
+    text = ' '.join((text or '').split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+def summarize_turns_extractive(summary, turns):
+    """Offline summary: one clipped line per turn, oldest lines dropped past the limit"""
+    lines = [line for line in (summary or '').splitlines() if line.startswith('- ')]
+    condensed = 0
+    match = re.match(r'\((\d+) earlier turns condensed\)', summary or '')
+    if match:
+        condensed = int(match.group(1))
+
+    for turn in turns:
+        reply = re.split(r'(?<=[.!?:])\s', turn['ai_response'].strip(), maxsplit=1)[0]
+        lines.append(f"- User: {_clip(turn['user_message'], 160)} / Nexus: {_clip(reply, 120)}")
+
+    while lines and estimate_tokens('\n'.join(lines)) > SUMMARY_TOKEN_LIMIT:
+        lines.pop(0)
+        condensed += 1
+    header = [f"({condensed} earlier turns condensed)"] if condensed else []
+    return '\n'.join(header + lines)
+
+def summarize_turns(summary, turns, user_id=None):
+    """Fold turns into the rolling summary, with the LLM when one is configured"""
+    transcript = '\n'.join(f"User: {t['user_message']}\nNexus: {t['ai_response']}" for t in turns)
+    prompt = (
+        "Update the running summary of a conversation about refining a software project plan. "
+        "Keep decisions, constraints and preferences; drop pleasantries. "
+        f"Stay under {SUMMARY_TOKEN_LIMIT * 3 // 4} words.\n\n"
+        f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:"
+    )
+    try:
+        updated = llm_generate(prompt, user_id=user_id, max_output_tokens=SUMMARY_TOKEN_LIMIT)
+    except TokenBudgetExceeded:
+        updated = None
+    if updated:
+        return _clip(updated, SUMMARY_TOKEN_LIMIT * 4)
+    return summarize_turns_extractive(summary, turns)
+
+def read_conversation_window(project_id, budget=None, recent_turns=None):
+    """Cached summary, its last turn id, and the unsummarized turns split into (aged, recent).
+
+    Turns past the recent window, or that do not fit the budget, are aged.
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    recent_turns = CONTEXT_RECENT_TURNS if recent_turns is None else recent_turns
+
+    conn = connect_db()
+    try:
+        row = conn.execute('SELECT summary, summarized_through FROM conversation_summaries WHERE project_id = ?',
+                           (project_id,)).fetchone()
+        summary, through = row if row else ('', 0)
+        turns = [
+            {'id': r[0], 'user_message': r[1], 'ai_response': r[2], 'created_at': r[3]}
+            for r in conn.execute('''
+                SELECT id, user_message, ai_response, created_at FROM conversations
+                WHERE project_id = ? AND id > ? ORDER BY id
+            ''', (project_id, through))
+        ]
+    finally:
+        conn.close()
+
+    split = max(0, len(turns) - recent_turns)
+    aged, recent = turns[:split], turns[split:]
+    recent_budget = budget - SUMMARY_TOKEN_LIMIT
+    while recent and sum(turn_tokens(t) for t in recent) > recent_budget:
+        aged.append(recent.pop(0))
+    return summary, through, aged, recent
+
+def fold_conversation_summary(project_id, user_id=None):
+    """Fold aged-out turns into the cached summary (may call the LLM).
+
+    Saved with a compare-and-set so concurrent folds never fold the same
+    turns twice.
+    """
+    summary, through, aged, _ = read_conversation_window(project_id)
+    if aged:
+        summary = summarize_turns(summary, aged, user_id)
+        new_through = aged[-1]['id']
+
+        def write(cursor):
+            cursor.execute('''
+                INSERT INTO conversation_summaries (project_id, summary, summarized_through, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (project_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    summarized_through = excluded.summarized_through,
+                    updated_at = excluded.updated_at
+                WHERE conversation_summaries.summarized_through = ?
+            ''', (project_id, summary, new_through, through))
+        try:
+            submit_write(write)
+        except sqlite3.Error as e:
+            print(f"⚠️ Could not save conversation summary: {e}")
+
+def _run_summary_fold(project_id, user_id, shard):
+    with shard_scope(shard):
+        try:
+            fold_conversation_summary(project_id, user_id)
+        except Exception as e:
+            print(f"⚠️ Conversation summary fold failed for project {project_id}: {e}")
+
+def schedule_summary_fold(project_id, user_id=None, shard=None):
+    """Queue a summary fold on the per-process summary pool (one pending fold per project)"""
+    with _summary_lock:
+        if _summary_pool['pid'] != os.getpid():
+            _summary_pool.update(pid=os.getpid(), jobs={},
+                                 pool=ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix='nexus-summary'))
+        future = _summary_pool['jobs'].get(project_id)
+        if future is None:
+            try:
+                future = _summary_pool['pool'].submit(_run_summary_fold, project_id, user_id, shard)
+            except RuntimeError:
+                # Interpreter shutdown; the next saved exchange folds these turns
+                return None
+            _summary_pool['jobs'][project_id] = future
+            future.add_done_callback(lambda _: _summary_pool['jobs'].pop(project_id, None))
+    return future
+
+def build_conversation_context(project_id, user_id=None, budget=None, recent_turns=None):
+    """Cached summary + last K turns for a project, within a token budget.
+
+    Never summarizes: aged turns the background fold has not reached yet are
+    left out of the prompt rather than blocking the request on the LLM.
+    """
+    summary, _, _, recent = read_conversation_window(project_id, budget, recent_turns)
+    return {
+        'summary': summary,
+        'turns': recent,
+        'tokens': estimate_tokens(summary) + sum(turn_tokens(t) for t in recent),
+        'user_id': user_id
+    }
+
+def build_refinement_prompt(user_message, current_report, context):
+    """Prompt for an LLM-backed refinement reply from the bounded context and the current report"""
+    parts = [
+        "You are Nexus, an assistant that refines software project plans. Reply concisely.",
+        f"Project idea: {current_report.get('project_idea', '')}"
+    ]
+    for section in REPORT_SECTIONS:
+        if current_report.get(section):
+            content = json.dumps(current_report[section], separators=(',', ':'), default=str)
+            parts.append(f"Current {section.replace('_', ' ')}: {_clip(content, CONTEXT_SECTION_TOKENS * 4)}")
+    if context['summary']:
+        parts.append(f"Earlier conversation (summary):\n{context['summary']}")
+    if context['turns']:
+        parts.append('Recent conversation:\n' + '\n'.join(
+            f"User: {t['user_message']}\nNexus: {t['ai_response']}" for t in context['turns']))
+    parts.append(f"User: {user_message}\nNexus:")
+    return '\n\n'.join(parts)
+
+# === IDEMPOTENCY KEYS ===
+# A client-chosen Idempotency-Key header makes an expensive POST safe to
+# retry. The first request claims (user, scope, key) in idempotency_keys and
+# its successful response is stored there; repeats within the TTL replay it.
+# A repeat that arrives while the original is still running waits for it
+# (on an in-process event, or by polling the row from another worker)
+# instead of recomputing. Failed responses release the key for a real retry.
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('NEXUS_IDEMPOTENCY_TTL_SECONDS', '86400'))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('NEXUS_IDEMPOTENCY_WAIT_SECONDS', '120'))
+# A claim older than this whose response never arrived (worker died) may be retaken
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('NEXUS_IDEMPOTENCY_LOCK_SECONDS', '600'))
+IDEMPOTENCY_MAX_KEY_LENGTH = 255
+IDEMPOTENCY_POLL_SECONDS = 0.25
+IDEMPOTENCY_ROW_QUERY = '''
+    SELECT request_hash, status_code, response_body, content_type, locked_until, expires_at
+    FROM idempotency_keys WHERE user_id = ? AND scope = ? AND idempotency_key = ?
+'''
+
+_idempotency_inflight = {}
+_idempotency_lock = threading.Lock()
+
+def request_fingerprint():
+    """Hash of what makes a request distinct, to catch a key reused for another request"""
+    digest = hashlib.sha256()
+    for part in (request.method, request.path, request.query_string, request.get_data()):
+        digest.update(part if isinstance(part, bytes) else part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def claim_idempotency_key(user_id, scope, key, request_hash):
+    """Claim a key for this request, or return the row of whoever holds it.
+
+    Returns (True, None) when claimed, otherwise (False, row) where row is
+    as read_idempotency_key() returns it.
+    """
+    def write(cursor):
+        now = datetime.now()
+        cursor.execute('''
+            DELETE FROM idempotency_keys
+            WHERE user_id = ? AND scope = ? AND idempotency_key = ?
+              AND (expires_at < ? OR (status_code IS NULL AND locked_until < ?))
+        ''', (user_id, scope, key, now.isoformat(), now.isoformat()))
+        cursor.execute('''
+            INSERT OR IGNORE INTO idempotency_keys
+                (user_id, scope, idempotency_key, request_hash, locked_until, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (user_id, scope, key, request_hash,
+              (now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)).isoformat(),
+              (now + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)).isoformat()))
+        if cursor.rowcount:
+            return True, None
+        cursor.execute(IDEMPOTENCY_ROW_QUERY, (user_id, scope, key))
+        return False, cursor.fetchone()
+
+    return submit_write(write)
+
+def read_idempotency_key(user_id, scope, key):
+    """Read-only lookup of a key's row, or None.
+
+    The row is (request_hash, status_code, response_body, content_type,
+    locked_until, expires_at); status_code is None while the original
+    request is still in flight.
+    """
+    conn = connect_global_db()
+    try:
+        return conn.execute(IDEMPOTENCY_ROW_QUERY, (user_id, scope, key)).fetchone()
+    finally:
+        conn.close()
+
+def idempotency_key_claimable(row):
+    """True when the key is free: no row, expired, or an abandoned claim"""
+    if row is None:
+        return True
+    now = datetime.now().isoformat()
+    return row[5] < now or (row[1] is None and row[4] < now)
+
+def finish_idempotency_key(user_id, scope, key, response):
+    """Store a successful response for replay; release the key otherwise"""
+    def write(cursor):
+        if response is not None and response.status_code < 400:
+            cursor.execute('''
+                UPDATE idempotency_keys SET status_code = ?, response_body = ?, content_type = ?
+                WHERE user_id = ? AND scope = ? AND idempotency_key = ?
+            ''', (response.status_code, response.get_data(as_text=True), response.content_type,
+                  user_id, scope, key))
+        else:
+            cursor.execute('DELETE FROM idempotency_keys WHERE user_id = ? AND scope = ? AND idempotency_key = ?',
+                           (user_id, scope, key))
+
+    try:
+        submit_write(write)
+    except Exception as e:
+        print(f"Error storing idempotent response: {e}")
+
+def _wait_for_original(ident, deadline):
+    """Block until the original request may have finished; False once the deadline passes"""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return False
+    with _idempotency_lock:
+        event = _idempotency_inflight.get(ident)
+    if event is not None:
+        event.wait(remaining)
+    else:
+        time.sleep(min(IDEMPOTENCY_POLL_SECONDS, remaining))
+    return True
+
+def idempotent(scope):
+    """Decorator: honour an Idempotency-Key header on a POST route.
+
+    Apply below require_auth so request.current_user is set; session-auth
+    routes fall back to get_current_user(). Requests without a key or a
+    user run as before.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key', '').strip()
+            user = getattr(request, 'current_user', None) or get_current_user()
+            if not key or not user:
+                return f(*args, **kwargs)
+            if len(key) > IDEMPOTENCY_MAX_KEY_LENGTH:
+                return jsonify({'success': False, 'message': 'Idempotency-Key is too long'}), 400
+
+            ident = (user['id'], scope, key)
+            request_hash = request_fingerprint()
+            deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+            claimed, row = claim_idempotency_key(*ident, request_hash)
+            while not claimed:
+                stored_hash, status_code, body, content_type = row[:4]
+                if stored_hash != request_hash:
+                    return jsonify({
+                        'success': False,
+                        'message': 'Idempotency-Key was already used for a different request'
+                    }), 422
+                if status_code is not None:
+                    replay = Response(body, status=status_code, content_type=content_type)
+                    replay.headers['Idempotent-Replayed'] = 'true'
+                    return replay
+                if not _wait_for_original(ident, deadline):
+                    return jsonify({
+                        'success': False,
+                        'message': 'A request with this Idempotency-Key is still being processed'
+                    }), 409
+                # Poll with a plain read; only go through the writer to take the key over
+                row = read_idempotency_key(*ident)
+                if idempotency_key_claimable(row):
+                    claimed, row = claim_idempotency_key(*ident, request_hash)
+
+            event = threading.Event()
+            with _idempotency_lock:
+                _idempotency_inflight[ident] = event
+            response = None
+            try:
+                response = make_response(f(*args, **kwargs))
+                return response
+            finally:
+                finish_idempotency_key(*ident, response)
+                with _idempotency_lock:
+                    _idempotency_inflight.pop(ident, None)
+                event.set()
+
+        return decorated_function
+    return decorator
+
+def purge_expired_idempotency_keys():
+    """Delete idempotency keys past their TTL in small batches"""
+    purged = 0
+    while True:
+        def write(cursor):
+            cursor.execute('''
+                DELETE FROM idempotency_keys WHERE rowid IN (
+                    SELECT rowid FROM idempotency_keys WHERE expires_at < ? LIMIT ?
+                )
+            ''', (datetime.now().isoformat(), MAINTENANCE_BATCH_SIZE))
+            return cursor.rowcount
+        deleted = submit_write(write)
+        purged += deleted
+        if deleted < MAINTENANCE_BATCH_SIZE:
+            return purged
+        time.sleep(MAINTENANCE_PAUSE_SECONDS)
+
+# === STATIC ASSETS ===
+# The templates' CSS and JS live in static/ and are linked through
+# asset_url(), which puts a hash of the file's content into the name
+# (css/index.css -> /assets/css/index.3f2a9c1b7d4e.css). Those URLs are
+# served as immutable for a year, so a repeat page load only fetches the
+# HTML; any edit to a file changes its URL.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+ASSET_MAX_AGE = int(os.getenv('NEXUS_ASSET_MAX_AGE', str(365 * 24 * 3600)))
+ASSET_HASH_LENGTH = 12
+
+_asset_digests = {}
+_asset_lock = threading.Lock()
+
+def asset_digest(name):
+    """Content hash of static/<name>, recomputed only when the file changes (None if missing)"""
+    path = safe_join(STATIC_DIR, name)
+    if path is None or not os.path.isfile(path):
+        return None
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _asset_digests.get(name)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, 'rb') as source:
+        digest = hashlib.sha256(source.read()).hexdigest()[:ASSET_HASH_LENGTH]
+    with _asset_lock:
+        _asset_digests[name] = (key, digest)
+    return digest
+
+@bp.app_template_global()
+def asset_url(name):
+    """Fingerprinted URL for a file under static/ (use in templates)"""
+    digest = asset_digest(name)
+    if digest is None:
+        raise ValueError(f"Unknown static asset: {name}")
+    base, ext = os.path.splitext(name)
+    return url_for('nexus.asset', filename=f"{base}.{digest}{ext}")
+
+@bp.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted static file with a long-lived immutable cache policy"""
+    match = re.fullmatch(rf'(.+)\.([0-9a-f]{{{ASSET_HASH_LENGTH}}})(\.\w+)', filename)
+    name = match.group(1) + match.group(3) if match else None
+    digest = asset_digest(name) if name else None
+    if digest is None:
+        return jsonify({'error': 'Asset not found'}), 404
+
+    if digest != match.group(2):
+        # A page rendered before a deploy asked for the old version: serve the
+        # current file, but don't let it be cached under the old name
+        return send_from_directory(STATIC_DIR, name, max_age=None)
+
+    response = send_from_directory(STATIC_DIR, name, max_age=ASSET_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
 # === ROUTES ===
 
-@app.route('/')
+@bp.route('/')
 def index():
     """Main landing page"""
     user = get_current_user()
@@ -938,8 +5290,9 @@ def index():
                          usage=usage,
                          authenticated=is_authenticated())
 
-@app.route('/generate', methods=['POST'])
+@bp.route('/generate', methods=['POST'])
 @require_auth
+@idempotent('generate')
 def generate_project():
     """Generate a new project roadmap"""
     try:
@@ -955,53 +5308,118 @@ def generate_project():
         # Get authenticated user
         user = request.current_user
         
-        # Check if user can create more projects (basic freemium logic)
-        user_projects_count = count_user_projects(user['id'])
-        max_projects = 3  # Free tier limit
-        
-        if user_projects_count >= max_projects:
+        # Atomically claim a quota slot before the expensive generation starts
+        try:
+            reservation_id = reserve_project_slots(user['id'])
+        except ProjectLimitReached as e:
+            max_projects = e.usage['max_projects']
             return jsonify({
                 'success': False,
                 'message': f"You've reached your limit of {max_projects} projects. Please delete existing projects to create new ones."
             }), 403
         
-        # Generate the complete report
-        report = generate_complete_project_report(project_idea)
+        try:
+            # Seed idea-independent sections from a near-duplicate prior report
+            similar = None
+            if data.get('reuse_similar', True):
+                try:
+                    similar = find_similar_project(project_idea)
+                except sqlite3.Error as e:
+                    print(f"Similarity lookup failed: {e}")
         
-        if not report:
-            return jsonify({'success': False, 'message': 'Failed to generate project report'}), 500
+            # Generate the complete report
+            shared = similar['sections'] if similar else None
+            report = generate_complete_project_report(project_idea, shared=shared)
         
-        # Save to database
-        project_id = save_project_to_db(user['id'], project_idea, report)
+            if not report:
+                return jsonify({'success': False, 'message': 'Failed to generate project report'}), 500
         
-        if not project_id:
-            return jsonify({'success': False, 'message': 'Failed to save project'}), 500
+            if shared:
+                report['reused_sections'] = {
+                    'similarity': similar['similarity'],
+                    'sections': sorted(shared)
+                }
         
-        return jsonify({
-            'success': True,
-            'project_id': project_id,
-            'message': 'Project roadmap generated successfully!'
-        })
+            # Save to database; an expired reservation falls back to the plan limit
+            try:
+                project_id = save_project_to_db(user['id'], project_idea, report, reservation_id)
+            except ProjectLimitReached as e:
+                return jsonify({
+                    'success': False,
+                    'message': f"You've reached your limit of {e.usage['max_projects']} projects. Please delete existing projects to create new ones."
+                }), 403
+        
+            if not project_id:
+                return jsonify({'success': False, 'message': 'Failed to save project'}), 500
+        
+            return jsonify({
+                'success': True,
+                'project_id': project_id,
+                'message': 'Project roadmap generated successfully!'
+            })
+        finally:
+            # Returns the slot if generation or saving failed; no-op once used
+            release_project_reservation(reservation_id)
         
     except Exception as e:
         print(f"Error in generate_project: {e}")
         return jsonify({'success': False, 'message': 'Internal server error'}), 500
 
-@app.route('/dashboard')
+@bp.route('/generate/batch', methods=['POST'])
+@require_auth
+def generate_project_batch():
+    """Generate many project roadmaps, streaming per-item progress as NDJSON"""
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'success': False, 'message': 'No data provided'}), 400
+
+    ideas = data.get('project_ideas')
+    if not isinstance(ideas, list):
+        return jsonify({'success': False, 'message': 'project_ideas must be a list'}), 400
+    ideas = [idea.strip() for idea in ideas if isinstance(idea, str) and idea.strip()]
+    if not ideas:
+        return jsonify({'success': False, 'message': 'At least one project idea is required'}), 400
+    if len(ideas) > BATCH_MAX_IDEAS:
+        return jsonify({'success': False, 'message': f'A batch can contain at most {BATCH_MAX_IDEAS} ideas'}), 400
+
+    user = request.current_user
+
+    # Quota for the whole batch is reserved once, up front
+    try:
+        reservation_id = reserve_project_slots(user['id'], len(ideas))
+    except ProjectLimitReached as e:
+        usage = e.usage
+        return jsonify({
+            'success': False,
+            'message': f"This batch would exceed your limit of {usage['max_projects']} projects "
+                       f"({max(usage['max_projects'] - usage['current_projects'], 0)} remaining)."
+        }), 403
+
+    def events():
+        try:
+            yield from iter_batch_generation(user['id'], ideas, reservation_id=reservation_id)
+        finally:
+            release_project_reservation(reservation_id)
+
+    return Response(
+        stream_with_context(iter_export_ndjson(events())),
+        mimetype='application/x-ndjson'
+    )
+
+@bp.route('/dashboard')
 def dashboard():
     """User dashboard with saved projects"""
     if not is_authenticated():
-        return redirect(url_for('index'))
+        return redirect(url_for('nexus.index'))
     
     user = get_current_user()
     projects = []
     
-    if supabase:
-        try:
-            result = supabase.table('projects').select('*').eq('user_id', user['id']).order('created_at', desc=True).execute()
-            projects = result.data
-        except Exception as e:
-            print(f"Error loading projects: {e}")
+    try:
+        # Soft-deleted projects are hidden as soon as the delete returns
+        projects = list_user_projects(user['id'])
+    except sqlite3.Error as e:
+        print(f"Error loading projects: {e}")
     
     usage = get_user_usage_limits()
     
@@ -1010,33 +5428,82 @@ def dashboard():
                          projects=projects,
                          usage=usage)
 
-@app.route('/project/<int:project_id>')
+@bp.route('/project/<int:project_id>')
 def view_project(project_id):
-    """View a specific project report"""
+    """View a specific project report (?sections= renders only those sections)"""
     if not is_authenticated():
-        return redirect(url_for('index'))
+        return redirect(url_for('nexus.index'))
     
     user = get_current_user()
     
-    if supabase:
-        try:
-            result = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).execute()
-            
-            if result.data:
-                project = result.data[0]
-                return render_template('project.html', 
-                                     project=project,
-                                     report=project['report_data'])
-            else:
-                return "Project not found", 404
-                
-        except Exception as e:
-            print(f"Error loading project: {e}")
-            return "Error loading project", 500
+    try:
+        sections = parse_field_list(request.args.get('sections'), REPORT_SECTIONS, 'sections')
+    except ValueError as e:
+        return str(e), 400
     
-    return "Database not available", 500
+    try:
+        # Read section rows rather than decoding the whole report_data document
+        project = get_project_for_user(project_id, user['id'], sections or list(REPORT_SECTIONS))
+    except sqlite3.Error as e:
+        print(f"Error loading project: {e}")
+        return "Error loading project", 500
+    
+    if project is None:
+        return "Project not found", 404
+    
+    # Sections left out render as empty blocks
+    report = project['report_data']
+    report.setdefault('visual_roadmap', {})
+    intelligence = report.setdefault('nexus_intelligence', {})
+    for section in REPORT_SECTIONS:
+        if section != 'visual_roadmap':
+            intelligence.setdefault(section, {})
+    
+    return render_template('project.html', 
+                         project=project,
+                         report=report)
+
+@bp.route('/project/<int:project_id>/delete', methods=['DELETE', 'POST'])
+def delete_project_route(project_id):
+    """Delete a project; its quota slot is free as soon as this returns"""
+    try:
+        if not is_authenticated():
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        if not delete_project(project_id, get_current_user()['id']):
+            return jsonify({'error': 'Project not found'}), 404
+        
+        return jsonify({'success': True, 'message': 'Project deleted'})
+        
+    except Exception as e:
+        print(f"Error deleting project: {e}")
+        return jsonify({'error': 'Failed to delete project'}), 500
+
+@bp.route('/project/<int:project_id>/report')
+@require_auth
+def get_project_report(project_id):
+    """Project metadata and report as JSON, narrowed with ?fields= and ?sections="""
+    try:
+        fields = parse_field_list(request.args.get('fields'), PROJECT_FIELDS, 'fields')
+        sections = parse_field_list(request.args.get('sections'), REPORT_SECTIONS, 'sections')
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    # Asking for sections implies report_data; metadata-only requests skip the report
+    if fields is not None and sections is not None and 'report_data' not in fields:
+        fields.append('report_data')
+    if fields is not None and 'report_data' not in fields:
+        sections = []
 
-@app.route('/auth/register', methods=['POST'])
+    project = get_project_for_user(project_id, request.current_user['id'], sections)
+    if project is None:
+        return jsonify({'success': False, 'message': 'Project not found'}), 404
+
+    if fields is not None:
+        project = {key: value for key, value in project.items() if key in fields}
+    return jsonify({'success': True, 'project': project})
+
+@bp.route('/auth/register', methods=['POST'])
 def register():
     """Register a new user"""
     try:
@@ -1081,11 +5548,13 @@ def register():
             }
         })
         
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"Registration error: {e}")
         return jsonify({'success': False, 'message': 'Registration failed'}), 500
 
-@app.route('/auth/login', methods=['POST'])
+@bp.route('/auth/login', methods=['POST'])
 def login():
     """Authenticate user and return JWT token"""
     try:
@@ -1116,11 +5585,13 @@ def login():
             'user': user
         })
         
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({'success': False, 'message': 'Login failed'}), 500
 
-@app.route('/auth/validate', methods=['GET'])
+@bp.route('/auth/validate', methods=['GET'])
 def validate_token():
     """Validate JWT token and return user info"""
     try:
@@ -1151,11 +5622,13 @@ def validate_token():
             'user': user
         })
         
+    except ProviderUnavailable:
+        raise
     except Exception as e:
         print(f"Token validation error: {e}")
         return jsonify({'success': False, 'message': 'Token validation failed'}), 500
 
-@app.route('/auth/logout', methods=['POST'])
+@bp.route('/auth/logout', methods=['POST'])
 def logout():
     """Handle user logout"""
     # For JWT, logout is handled client-side by removing the token
@@ -1168,7 +5641,8 @@ def logout():
 
 # === NEW ROUTES FOR CHAT INTERACTION ===
 
-@app.route('/project/<int:project_id>/chat', methods=['POST'])
+@bp.route('/project/<int:project_id>/chat', methods=['POST'])
+@idempotent('chat')
 def chat_with_project(project_id):
     """Handle chat interactions for project refinement"""
     try:
@@ -1181,64 +5655,100 @@ def chat_with_project(project_id):
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
         
-        # Get current project
-        if supabase:
-            try:
-                result = supabase.table('projects').select('*').eq('id', project_id).eq('user_id', user['id']).execute()
-                if not result.data:
-                    return jsonify({'error': 'Project not found'}), 404
-                
-                project = result.data[0]
-                current_report = project['report_data']
-                
-            except Exception as e:
-                print(f"Error loading project: {e}")
-                return jsonify({'error': 'Failed to load project'}), 500
-        else:
-            return jsonify({'error': 'Database not available'}), 500
+        try:
+            response_sections = parse_field_list(request.args.get('sections'), REPORT_SECTIONS, 'sections')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Analyze refinement intent
-        refinement_intent = analyze_user_refinement_request(user_message, current_report)
+        intents = []
+        contexts = []
         
-        # Generate AI response
-        ai_response_data = generate_refined_response(user_message, current_report, refinement_intent)
+        def compute_updates(current_report):
+            # Built once ownership is confirmed; reused if a conflict forces a recompute
+            if not contexts:
+                contexts.append(build_conversation_context(project_id, user['id']))
+            refinement_intent = analyze_user_refinement_request(user_message, current_report)
+            intents.append(refinement_intent)
+            ai_response_data = generate_refined_response(user_message, current_report, refinement_intent, contexts[0])
+            return ai_response_data['report_updates'], ai_response_data
         
-        # Update project report if there are refinements
-        updated_report = current_report.copy()
-        if ai_response_data['report_updates']:
-            updated_report['nexus_intelligence'].update(ai_response_data['report_updates'])
-            
-            # Update in database
-            if supabase:
-                try:
-                    supabase.table('projects').update({
-                        'report_data': updated_report,
-                        'updated_at': datetime.now().isoformat()
-                    }).eq('id', project_id).execute()
-                except Exception as e:
-                    print(f"Error updating project: {e}")
-        
-        # Save conversation
+        # Apply refinements with optimistic concurrency (only changed sections are written)
+        try:
+            project, ai_response_data, updated = refine_project_report(
+                project_id, user['id'], compute_updates, REFINEMENT_SECTIONS
+            )
+        except ProjectUpdateConflict as e:
+            print(f"Chat update conflict: {e}")
+            return jsonify({'error': 'Project is being updated elsewhere, please retry'}), 409
+        
+        if project is None:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        # Save conversation (queued for the next group commit unless the client asks for durability)
         save_conversation(
             project_id, 
             user_message, 
             ai_response_data['message'],
-            ai_response_data['report_updates']
+            ai_response_data['report_updates'],
+            wait=bool(request.json.get('durable', False)),
+            intent=intents[-1],
+            user_id=user['id']
         )
         
+        # Only decode what the client asked for (?sections=), the full report otherwise
+        updated_report = None
+        if updated:
+            latest = get_project_for_user(project_id, user['id'], response_sections)
+            updated_report = latest['report_data'] if latest else None
+        
         return jsonify({
             'success': True,
             'message': ai_response_data['message'],
             'suggestions': ai_response_data['suggestions'],
-            'has_updates': bool(ai_response_data['report_updates']),
-            'updated_report': updated_report if ai_response_data['report_updates'] else None
+            'has_updates': updated,
+            'updated_report': updated_report,
+            'version': project['version']
         })
         
     except Exception as e:
         print(f"Error in chat: {e}")
         return jsonify({'error': 'Chat processing failed'}), 500
 
-@app.route('/project/<int:project_id>/conversations')
+@bp.route('/project/<int:project_id>/export/<fmt>')
+def export_project_report(project_id, fmt):
+    """Download the current report as Markdown, HTML or PDF (rendered once per version, then cached)"""
+    if not is_authenticated():
+        return jsonify({'error': 'Authentication required'}), 401
+
+    try:
+        project, path = render_report_export(project_id, get_current_user()['id'], fmt,
+                                             timeout=EXPORT_WAIT_SECONDS)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error rendering export: {e}")
+        return jsonify({'error': 'Export failed'}), 500
+
+    if project is None:
+        return jsonify({'error': 'Project not found'}), 404
+    if path is None:
+        # Still rendering in the background; the same URL serves the file once it is ready
+        response = jsonify({'success': True, 'status': 'rendering', 'version': project['version']})
+        response.headers['Retry-After'] = '2'
+        return response, 202
+
+    slug = re.sub(r'[^a-z0-9]+', '-', project['project_name'].lower()).strip('-')[:60] or 'nexus-report'
+    response = send_file(
+        os.path.abspath(path),
+        mimetype=EXPORT_FORMATS[fmt],
+        as_attachment=request.args.get('download', '1') != '0',
+        download_name=f"{slug}-v{project['version']}.{fmt}",
+        conditional=True
+    )
+    response.cache_control.private = True
+    return response
+
+@bp.route('/project/<int:project_id>/conversations')
 def get_project_conversations(project_id):
     """Get conversation history for a project"""
     try:
@@ -1247,15 +5757,13 @@ def get_project_conversations(project_id):
         
         user = get_current_user()
         
-        # Verify project ownership
-        if supabase:
-            try:
-                result = supabase.table('projects').select('id').eq('id', project_id).eq('user_id', user['id']).execute()
-                if not result.data:
-                    return jsonify({'error': 'Project not found'}), 404
-            except Exception as e:
-                print(f"Error verifying project: {e}")
-                return jsonify({'error': 'Verification failed'}), 500
+        # Verify project ownership (a soft-deleted project's history is gone for the user)
+        try:
+            if get_project_for_user(project_id, user['id'], sections=[]) is None:
+                return jsonify({'error': 'Project not found'}), 404
+        except sqlite3.Error as e:
+            print(f"Error verifying project: {e}")
+            return jsonify({'error': 'Verification failed'}), 500
         
         conversations = get_conversation_history(project_id)
         
@@ -1268,7 +5776,405 @@ def get_project_conversations(project_id):
         print(f"Error loading conversations: {e}")
         return jsonify({'error': 'Failed to load conversations'}), 500
 
-if __name__ == '__main__':
-    # Initialize database if it doesn't exist
+@bp.route('/search')
+@require_auth
+def search():
+    """Full-text search over the current user's projects and conversations"""
+    text = request.args.get('q', '').strip()
+    scope = request.args.get('scope', 'all')
+
+    if not text:
+        return jsonify({'success': False, 'message': 'Search query is required'}), 400
+    if scope not in ('all', 'projects', 'conversations'):
+        return jsonify({'success': False, 'message': 'scope must be all, projects or conversations'}), 400
+
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(SEARCH_MAX_PAGE_SIZE, max(1, int(request.args.get('per_page', SEARCH_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'page and per_page must be integers'}), 400
+
+    try:
+        results = search_user_content(request.current_user['id'], text, scope, page, per_page)
+    except sqlite3.Error as e:
+        print(f"Search error: {e}")
+        return jsonify({'success': False, 'message': 'Search failed'}), 500
+
+    return jsonify({'success': True, 'query': text, **results})
+
+@bp.route('/export')
+@require_auth
+def export_data():
+    """Stream the current user's projects and conversations as NDJSON or zip"""
+    export_format = request.args.get('format', 'ndjson')
+    since = request.args.get('since')
+    cursor = request.args.get('cursor')
+
+    try:
+        parse_export_cursor(cursor)
+        parse_export_since(since)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    user_id = request.current_user['id']
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+
+    if export_format == 'zip':
+        body = iter_export_zip(user_id, since, cursor)
+        mimetype, filename = 'application/zip', f"nexus_export_{stamp}.zip"
+    elif export_format == 'ndjson':
+        body = iter_export_ndjson(iter_export_records(user_id, since, cursor))
+        mimetype, filename = 'application/x-ndjson', f"nexus_export_{stamp}.ndjson"
+    else:
+        return jsonify({'success': False, 'message': 'Format must be ndjson or zip'}), 400
+
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@bp.route('/admin/analytics')
+@require_admin
+def admin_analytics():
+    """Refinement-intent and generation-volume dashboards from the daily rollups"""
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'days must be an integer'}), 400
+
+    try:
+        return jsonify({'success': True, **get_usage_analytics(days)})
+    except sqlite3.Error as e:
+        print(f"Analytics error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to load analytics'}), 500
+
+@bp.route('/admin/shards')
+@require_admin
+def admin_shards():
+    """Per-shard users, projects, conversations and file sizes"""
+    try:
+        return jsonify({'success': True, **shard_status()})
+    except sqlite3.Error as e:
+        print(f"Shard status error: {e}")
+        return jsonify({'success': False, 'message': 'Failed to load shard status'}), 500
+
+# === VARIATION ROUTES ===
+
+@bp.route('/variations', methods=['POST'])
+@require_auth
+def generate_variations():
+    """Generate N variants of a project idea in one batch"""
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': 'No data provided'}), 400
+
+        project_idea = data.get('project_idea', '').strip()
+        if not project_idea:
+            return jsonify({'success': False, 'message': 'Project idea is required'}), 400
+
+        try:
+            count = int(data.get('count', 4))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'count must be an integer'}), 400
+
+        user = request.current_user
+        reports = generate_variation_batch(project_idea, count)
+        if not reports or not save_variations_to_db(user['id'], project_idea, reports):
+            return jsonify({'success': False, 'message': 'Failed to generate variations'}), 500
+
+        variations = list(reports)
+        return jsonify({
+            'success': True,
+            'variations': variations,
+            'url': f"/variation-search/{variations[0]}"
+        })
+
+    except Exception as e:
+        print(f"Error in generate_variations: {e}")
+        return jsonify({'success': False, 'message': 'Internal server error'}), 500
+
+@bp.route('/variation-search/<path:variation>')
+def variation_search(variation):
+    """Show the cached report for one variation alongside its siblings"""
+    if not is_authenticated():
+        return redirect(url_for('nexus.index'))
+
+    user = get_current_user()
+    report, user_variations = get_cached_variation(user['id'], variation)
+
+    if report is None:
+        # Generation is quota-checked and only happens via POST /variations
+        return "Variation not found; generate it with POST /variations first", 404
+
+    results = variation_report_to_results(report)
+    return render_template('variation_results.html',
+                         variation=variation,
+                         user_variations=user_variations,
+                         results=results,
+                         total_results=len(results))
+
+@bp.route('/export-variation-results')
+def export_variation_results():
+    """Download the current user's cached variation reports as NDJSON"""
+    if not is_authenticated():
+        return redirect(url_for('nexus.index'))
+
+    user = get_current_user()
+
+    def rows():
+        conn = connect_db()
+        try:
+            cursor = conn.execute('''
+                SELECT base_idea, variation, report_data, created_at
+                FROM idea_variations WHERE user_id = ? ORDER BY id
+            ''', (user['id'],))
+            for base_idea, variation, report_data, created_at in cursor:
+                yield json.dumps({
+                    'base_idea': base_idea,
+                    'variation': variation,
+                    'report_data': json.loads(report_data),
+                    'created_at': created_at
+                }) + '\n'
+        finally:
+            conn.close()
+
+    return Response(
+        stream_with_context(rows()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename="nexus_variations.ndjson"'}
+    )
+
+# === CLI COMMANDS ===
+
+@bp.cli.command('import-report')
+def import_report_command():
+    """Print the provider import-time report for a freshly started process"""
+    print(json.dumps(provider_import_report(), indent=2))
+
+@bp.cli.command('export')
+@click.option('--user-id', type=int, default=None, help='Export a single user (default: every user)')
+@click.option('--format', 'export_format', type=click.Choice(['ndjson', 'zip']), default='ndjson')
+@click.option('--since', default=None, help='Only rows updated at or after this ISO timestamp')
+@click.option('--cursor', default=None, help='Resume after the cursor of the last record received')
+@click.option('--output', type=click.Path(dir_okay=False), default='-', help='Output file (default: stdout)')
+def export_command(user_id, export_format, since, cursor, output):
+    """Stream projects and conversations to NDJSON or a zip archive"""
+    if export_format == 'zip':
+        chunks = iter_export_zip(user_id, since, cursor)
+    else:
+        chunks = (line.encode('utf-8') for line in iter_export_ndjson(iter_export_records(user_id, since, cursor)))
+
+    with click.open_file(output, 'wb') as out:
+        for chunk in chunks:
+            out.write(chunk)
+
+@bp.cli.command('generate-batch')
+@click.option('--user-id', type=int, required=True, help='Owner of the generated projects')
+@click.option('--input', 'input_path', type=click.Path(dir_okay=False), default='-',
+              help='File with one project idea per line (default: stdin)')
+@click.option('--workers', type=int, default=None, help='Generation threads (default: NEXUS_BATCH_WORKERS)')
+@click.option('--chunk-size', type=int, default=None, help='Projects saved per transaction')
+def generate_batch_command(user_id, input_path, workers, chunk_size):
+    """Bulk-generate projects for a user, printing NDJSON progress (no quota check)"""
+    with click.open_file(input_path, 'r') as source:
+        ideas = [line.strip() for line in source if line.strip()]
+    for line in iter_export_ndjson(iter_batch_generation(user_id, ideas, workers, chunk_size)):
+        click.echo(line, nl=False)
+
+@bp.cli.command('set-plan')
+@click.option('--user-id', type=int, required=True)
+@click.option('--plan', type=click.Choice(sorted(PLAN_PROJECT_LIMITS)), default=None)
+@click.option('--project-limit', type=int, default=None, help='Per-user override of the plan limit')
+@click.option('--clear-limit', is_flag=True, help='Drop the override and use the plan limit again')
+def set_plan_command(user_id, plan, project_limit, clear_limit):
+    """Change a user's plan and/or project limit"""
+    conn = connect_db()
+    if plan:
+        conn.execute('UPDATE users SET plan = ? WHERE id = ?', (plan, user_id))
+    if project_limit is not None or clear_limit:
+        conn.execute('UPDATE users SET project_limit = ? WHERE id = ?', (None if clear_limit else project_limit, user_id))
+    conn.commit()
+    conn.close()
+    print(json.dumps(get_project_usage(user_id)))
+
+@bp.cli.command('recount-projects')
+def recount_projects_command():
+    """Rebuild every user's project counter from the projects table(s)"""
+    shard_counts = query_all_shards(
+        'SELECT user_id, COUNT(*) FROM projects WHERE deleted_at IS NULL GROUP BY user_id'
+    ) if SHARD_COUNT > 0 else []
+    conn = connect_global_db()
+    recount_user_projects(conn.cursor())
+    conn.executemany('UPDATE users SET project_count = project_count + ? WHERE id = ?',
+                     [(count, user_id) for _, (user_id, count) in shard_counts])
+    conn.commit()
+    conn.close()
+    print("✅ Project counters rebuilt")
+
+@bp.cli.command('maintain')
+@click.option('--retention-days', type=int, default=None, help='Override NEXUS_CONVERSATION_RETENTION_DAYS')
+@click.option('--enable-incremental-vacuum', 'convert_vacuum', is_flag=True,
+              help='Convert the database first (full VACUUM, run once)')
+def maintain_command(retention_days, convert_vacuum):
+    """Archive old conversations, purge sessions, vacuum and analyze (run from cron)"""
+    if convert_vacuum:
+        enable_incremental_vacuum()
+    print(json.dumps(run_maintenance(retention_days), indent=2))
+
+@bp.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Rebuild the FTS5 search indexes from projects and conversations"""
+    rebuild_search_index()
+    print("✅ Search index rebuilt")
+
+@bp.cli.command('rebuild-similarity-index')
+def rebuild_similarity_index_command():
+    """Rebuild the near-duplicate idea index from the projects table"""
+    rebuild_similarity_index()
+    print("✅ Similarity index rebuilt")
+
+@bp.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the analytics rollups from every project and conversation"""
+    for shard in each_shard():
+        with db_lock_for(shard):
+            conn = connect_db()
+            backfill_usage_rollups(conn.cursor())
+            conn.commit()
+            conn.close()
+    print("✅ Analytics rollups rebuilt")
+
+@bp.cli.command('shard-status')
+def shard_status_command():
+    """Show users, projects, conversations and size per shard"""
+    print(json.dumps(shard_status(), indent=2))
+
+@bp.cli.command('rebalance-shards')
+@click.option('--dry-run', is_flag=True, help='Only list the moves')
+def rebalance_shards_command(dry_run):
+    """Move users onto their hash shard after NEXUS_SHARD_COUNT changes (stop the app first)"""
+    if SHARD_COUNT <= 0:
+        print("⚠️ Sharding is off; set NEXUS_SHARD_COUNT first")
+        return
+    print(json.dumps(rebalance_shards(dry_run), indent=2))
+
+@bp.cli.command('record-reddit')
+@click.argument('project_idea')
+@click.option('--output', type=click.Path(dir_okay=False), required=True)
+def record_reddit_command(project_idea, output):
+    """Record the Reddit posts for an idea as an NDJSON fixture"""
+    count = 0
+    with open(output, 'w', encoding='utf-8') as fixture:
+        for post in iter_reddit_posts(idea_keywords(project_idea), budget_seconds=0):
+            fixture.write(json.dumps(post) + '\n')
+            count += 1
+    print(f"✅ Recorded {count} posts to {output}")
+
+@bp.cli.command('refresh-tech-index')
+def refresh_tech_index_command():
+    """Refresh the GitHub technology popularity snapshot (run from cron)"""
+    refreshed = refresh_tech_popularity_index()
+    print(f"✅ Refreshed {refreshed}/{len(TECH_CANDIDATES)} technologies")
+
+@bp.cli.command('ingest-trends')
+def ingest_trends_command():
+    """Poll the configured RSS/Atom feeds once (run from cron)"""
+    print(f"✅ Ingested {ingest_trend_feeds()} new trend entries from {len(TREND_FEEDS)} feeds")
+
+# === APPLICATION FACTORY ===
+
+def init_process_resources():
+    """Build the outbound API clients for the current process"""
+    global supabase, reddit
+
+    with _process_lock:
+        if _process_state['pid'] == os.getpid():
+            return
+
+        supabase = None
+        if SUPABASE_URL != 'demo_url' and SUPABASE_KEY != 'demo_key' and get_provider('supabase'):
+            try:
+                supabase = get_provider('supabase').create_client(SUPABASE_URL, SUPABASE_KEY)
+                print("✅ Supabase configured successfully")
+            except Exception as e:
+                print(f"⚠️ Supabase configuration failed: {e}")
+
+        if GEMINI_API_KEY != 'demo_key' and get_provider('gemini'):
+            try:
+                get_provider('gemini').configure(api_key=GEMINI_API_KEY)
+                print("✅ Gemini AI configured successfully")
+            except Exception as e:
+                print(f"⚠️ Gemini AI configuration failed: {e}")
+
+        reddit = None
+        if REDDIT_CLIENT_ID != 'demo_id' and get_provider('reddit'):
+            try:
+                reddit = get_provider('reddit').Reddit(
+                    client_id=REDDIT_CLIENT_ID,
+                    client_secret=REDDIT_CLIENT_SECRET,
+                    user_agent=REDDIT_USER_AGENT,
+                    # Bound each HTTP call too; the budget is only checked between posts
+                    timeout=max(1, int(REDDIT_BUDGET_SECONDS))
+                )
+                print("✅ Reddit API configured successfully")
+            except Exception as e:
+                print(f"⚠️ Reddit API configuration failed: {e}")
+                reddit = None
+
+        start_write_queue()
+        start_background_jobs()
+
+        _process_state['pid'] = os.getpid()
+
+def reset_process_resources():
+    """Drop clients inherited from a parent process (runs in the child after fork)"""
+    global supabase, reddit
+    supabase = None
+    reddit = None
+    reset_write_queue()
+    reset_background_jobs()
+    _process_state['pid'] = None
+
+def ensure_process_resources():
+    """Lazily initialize per-process clients on the first request in a process"""
+    if _process_state['pid'] != os.getpid():
+        init_process_resources()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_process_resources)
+
+def create_app(config=None):
+    """Create and configure the Nexus Flask application.
+
+    Only process-independent work happens here (config, blueprint, schema), so
+    the result is safe to preload in a pre-fork master. Outbound clients are
+    created per process by init_process_resources(), either from the server's
+    post-fork hook or lazily on the first request.
+    """
+    global DATABASE_PATH
+
+    app = Flask(__name__)
+    app.secret_key = SECRET_KEY
+    app.config['DATABASE_PATH'] = DATABASE_PATH
+    if config:
+        app.config.update(config)
+    DATABASE_PATH = app.config['DATABASE_PATH']
+
+    app.register_blueprint(bp)
+    app.before_request(ensure_process_resources)
+    app.before_request(bind_request_shard)
+
     init_db()
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    init_shards()
+    print("🚀 Nexus MVP - Project Roadmap Generator")
+    return app
+
+APP_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
+
+if __name__ == '__main__':
+    # Development server; production runs `gunicorn -c gunicorn.conf.py wsgi:app`
+    app = create_app()
+    init_process_resources()
+    app.run(debug=True, host='0.0.0.0', port=5000)
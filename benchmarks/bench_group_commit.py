@@ -0,0 +1,67 @@
+"""Group-commit benchmark for the conversation write path.
+
+Runs N threads that each save conversation turns with save_conversation(),
+once with the group-commit writer disabled (NEXUS_WRITE_QUEUE=0, one commit
+per turn) and once enabled, and reports turns/second for both. Every turn
+waits for durability, so the numbers compare committed writes.
+
+Usage:
+    python benchmarks/bench_group_commit.py --threads 16 --turns 50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, threading, time
+import app
+app.create_app()
+app.init_process_resources()
+threads, turns = int(sys.argv[1]), int(sys.argv[2])
+
+def chat():
+    for turn in range(turns):
+        app.save_conversation(1, f"message {turn}", "response " * 50, wait=True)
+
+workers = [threading.Thread(target=chat) for _ in range(threads)]
+started = time.perf_counter()
+for w in workers:
+    w.start()
+for w in workers:
+    w.join()
+elapsed = time.perf_counter() - started
+app.stop_write_queue()
+print('NEXUS_BENCH ' + json.dumps({'seconds': elapsed, 'writes': threads * turns}))
+'''
+
+
+def measure(queue_enabled, threads, turns):
+    env = dict(os.environ,
+               NEXUS_DB_PATH=os.path.join(tempfile.mkdtemp(), 'group_commit.db'),
+               NEXUS_WRITE_QUEUE='1' if queue_enabled else '0')
+    out = subprocess.run([sys.executable, '-c', PROBE, str(threads), str(turns)], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    line = next(l for l in out.splitlines() if l.startswith('NEXUS_BENCH '))
+    result = json.loads(line[len('NEXUS_BENCH '):])
+    return result['writes'] / result['seconds']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--turns', type=int, default=50)
+    args = parser.parse_args()
+
+    direct = measure(False, args.threads, args.turns)
+    grouped = measure(True, args.threads, args.turns)
+    print(f"per-turn commits: {direct:8.1f} turns/s")
+    print(f"group commit:     {grouped:8.1f} turns/s ({grouped / direct:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
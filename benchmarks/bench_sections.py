@@ -0,0 +1,66 @@
+"""Full-report vs single-section read benchmark.
+
+Creates a project in a scratch database, then times loading it through
+get_project_for_user() with the whole report_data document and with a single
+section from project_sections. JSON decode time and payload size are shown
+separately because per-call connection setup dominates the read column for
+small reports.
+
+Usage:
+    python benchmarks/bench_sections.py --reads 2000 --section tech_stack
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--section', default='tech_stack')
+    args = parser.parse_args()
+
+    os.environ['NEXUS_DB_PATH'] = os.path.join(tempfile.mkdtemp(), 'sections.db')
+    os.environ['NEXUS_WRITE_QUEUE'] = '0'
+    sys.path.insert(0, ROOT)
+    import app
+
+    app.create_app()
+    user_id, _ = app.create_user('bench@example.com', 'Bench', 'bench-password')
+    report = app.generate_complete_project_report('Fitness tracking app for busy parents')
+    project_id = app.save_project_to_db(user_id, report['project_idea'], report)
+
+    def measure(sections):
+        started = time.perf_counter()
+        for _ in range(args.reads):
+            project = app.get_project_for_user(project_id, user_id, sections)
+        elapsed = time.perf_counter() - started
+        return elapsed / args.reads * 1e6, len(json.dumps(project['report_data']))
+
+    def measure_decode(raw):
+        started = time.perf_counter()
+        for _ in range(args.reads):
+            json.loads(raw)
+        return (time.perf_counter() - started) / args.reads * 1e6
+
+    conn = app.connect_db()
+    full_raw = conn.execute('SELECT report_data FROM projects WHERE id = ?', (project_id,)).fetchone()[0]
+    section_raw = conn.execute('SELECT data FROM project_sections WHERE project_id = ? AND section = ?',
+                               (project_id, args.section)).fetchone()[0]
+    conn.close()
+
+    full_us, full_bytes = measure(None)
+    section_us, section_bytes = measure([args.section])
+    print(f"{'':<14} {'read':>10} {'decode':>10} {'payload':>9}")
+    print(f"{'full report':<14} {full_us:7.1f} us {measure_decode(full_raw):7.1f} us {full_bytes:6d} B")
+    print(f"{args.section:<14} {section_us:7.1f} us {measure_decode(section_raw):7.1f} us {section_bytes:6d} B "
+          f"({section_bytes / full_bytes:.0%} of the payload)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Write-throughput benchmark for tenant sharding.
+
+Starts several worker processes (like gunicorn workers sharing one data
+directory), each running one thread per user that saves conversation turns
+on its own project with save_conversation(). It runs once unsharded
+(NEXUS_SHARD_COUNT=0) and once per requested shard count, and reports
+committed turns/second. Users are spread over the shards by the normal hash,
+so processes only contend for a file lock when their users share a shard.
+
+Usage:
+    python benchmarks/bench_shards.py --processes 4 --users 8 --turns 50 --shards 4 8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, threading, time
+import app
+app.create_app()
+app.init_process_resources()
+worker, users, turns = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
+
+projects = []
+for n in range(users):
+    user_id, _ = app.create_user(f"bench{worker}-{n}@example.com", "Bench", "benchmark")
+    projects.append((user_id, app.save_projects_batch(user_id, [("benchmark project", {"summary": "bench"})])[0]))
+sys.stdout.write('ready\\n')
+sys.stdout.flush()
+sys.stdin.readline()
+
+def chat(user_id, project_id):
+    with app.shard_scope(app.shard_for_user(user_id)):
+        for turn in range(turns):
+            app.save_conversation(project_id, f"message {turn}", "response " * 50, wait=True)
+
+workers = [threading.Thread(target=chat, args=project) for project in projects]
+started = time.perf_counter()
+for w in workers:
+    w.start()
+for w in workers:
+    w.join()
+elapsed = time.perf_counter() - started
+app.stop_write_queue()
+print('NEXUS_BENCH ' + json.dumps({'seconds': elapsed, 'writes': users * turns}))
+'''
+
+
+def measure(shards, processes, users, turns):
+    env = dict(os.environ,
+               NEXUS_DB_PATH=os.path.join(tempfile.mkdtemp(), 'shards.db'),
+               NEXUS_SHARD_COUNT=str(shards))
+    # Create the schema once so the workers do not race on it
+    subprocess.run([sys.executable, '-c', 'import app; app.create_app()'], cwd=ROOT, env=env,
+                   capture_output=True, check=True)
+    workers = [subprocess.Popen([sys.executable, '-c', PROBE, str(n), str(users), str(turns)], cwd=ROOT, env=env,
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+               for n in range(processes)]
+    for worker in workers:
+        line = None
+        while line != 'ready':
+            line = worker.stdout.readline()
+            if not line:
+                raise RuntimeError('benchmark worker exited during setup')
+            line = line.strip()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.stdin.write('go\n')
+        worker.stdin.flush()
+    writes = 0
+    for worker in workers:
+        out, _ = worker.communicate()
+        line = next(l for l in out.splitlines() if l.startswith('NEXUS_BENCH '))
+        writes += json.loads(line[len('NEXUS_BENCH '):])['writes']
+    return writes / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--users', type=int, default=8, help='Users (threads) per process')
+    parser.add_argument('--turns', type=int, default=50)
+    parser.add_argument('--shards', type=int, nargs='+', default=[4])
+    args = parser.parse_args()
+
+    single = measure(0, args.processes, args.users, args.turns)
+    print(f"unsharded: {single:8.1f} turns/s")
+    for shards in args.shards:
+        rate = measure(shards, args.processes, args.users, args.turns)
+        print(f"{shards:3d} shards: {rate:8.1f} turns/s ({rate / single:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
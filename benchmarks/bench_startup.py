@@ -0,0 +1,67 @@
+"""Cold-start benchmark and budget check for the Nexus backend.
+
+Each run imports app.py and calls create_app() in a fresh interpreter, then
+checks that no heavy provider SDK was imported during startup. Exits non-zero
+if the median startup time exceeds the budget or a provider loaded eagerly,
+so it can gate CI.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, time
+started = time.perf_counter()
+import app
+app.create_app()
+elapsed = time.perf_counter() - started
+print('NEXUS_STARTUP ' + json.dumps({'seconds': elapsed, 'report': app.provider_import_report()}))
+'''
+
+
+def measure_once():
+    env = dict(os.environ, NEXUS_DB_PATH=os.path.join(tempfile.mkdtemp(), 'startup.db'))
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    line = next(l for l in out.splitlines() if l.startswith('NEXUS_STARTUP '))
+    return json.loads(line[len('NEXUS_STARTUP '):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('NEXUS_STARTUP_BUDGET_MS', '500')))
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    median_ms = statistics.median(s['seconds'] for s in samples) * 1000
+    report = samples[-1]['report']
+    eager = [p['name'] for p in report['providers'] if p['loaded']]
+
+    print(f"startup median: {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"app.py import: {report['app_import_seconds'] * 1000:.1f} ms")
+    for p in report['providers']:
+        state = 'loaded' if p['loaded'] else 'deferred'
+        print(f"  {p['name']:<10} {p['module']:<22} {state}")
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"startup {median_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+    if eager:
+        failures.append(f"providers imported during startup: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
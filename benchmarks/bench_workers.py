@@ -0,0 +1,100 @@
+"""Startup and throughput benchmark: single process vs. N gunicorn workers.
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app` with 1 and then N workers,
+records how long each takes to accept its first request and measures
+throughput against a route with concurrent clients.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 4 --requests 2000 --path /
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return True
+        except Exception:
+            time.sleep(0.05)
+    return False
+
+
+def fetch(url):
+    try:
+        urllib.request.urlopen(url, timeout=10).read()
+        return True
+    except Exception:
+        return False
+
+
+def run_server(workers, total_requests, concurrency, path):
+    port = free_port()
+    env = dict(os.environ,
+               NEXUS_BIND=f'127.0.0.1:{port}',
+               NEXUS_WORKERS=str(workers),
+               NEXUS_DB_PATH=os.path.join(tempfile.mkdtemp(), 'bench.db'))
+    url = f'http://127.0.0.1:{port}{path}'
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not wait_until_ready(url, started + 60):
+            raise RuntimeError(f'server with {workers} worker(s) did not start')
+        startup = time.perf_counter() - started
+
+        begin = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            ok = sum(pool.map(fetch, [url] * total_requests))
+        elapsed = time.perf_counter() - begin
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    return {
+        'workers': workers,
+        'startup_s': startup,
+        'requests_ok': ok,
+        'throughput_rps': ok / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--path', default='/')
+    args = parser.parse_args()
+
+    results = [run_server(n, args.requests, args.concurrency, args.path)
+               for n in sorted({1, args.workers})]
+
+    print(f"{'workers':>8} {'startup (s)':>12} {'ok':>6} {'req/s':>10}")
+    for r in results:
+        print(f"{r['workers']:>8} {r['startup_s']:>12.2f} {r['requests_ok']:>6} {r['throughput_rps']:>10.1f}")
+    if len(results) == 2 and results[0]['throughput_rps']:
+        print(f"speedup: {results[1]['throughput_rps'] / results[0]['throughput_rps']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+"""Gunicorn configuration for the Nexus backend (pre-fork deployment)"""
+import multiprocessing
+import os
+
+bind = os.getenv('NEXUS_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('NEXUS_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('NEXUS_THREADS', '1'))
+timeout = int(os.getenv('NEXUS_TIMEOUT', '60'))
+
+# Import app.py once in the master and fork workers from it. create_app() only
+# builds config and schema; outbound clients are created per worker below.
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Build fork-safe outbound clients (Supabase, Gemini, Reddit) in each worker"""
+    from app import init_process_resources
+    init_process_resources()
+
+
+def worker_exit(server, worker):
+    """Flush queued group-commit writes before the worker goes away"""
+    from app import stop_write_queue
+    stop_write_queue()
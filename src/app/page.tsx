@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Sparkles, Menu, X, User, LogOut, Mail, Lock, ArrowRight, MessageSquare, BarChart3, Route, Target, Brain, Zap } from 'lucide-react';
 
 // API Functions
@@ -12,12 +12,12 @@ const api = {
     const token = localStorage.getItem('token');
     
     const config: RequestInit = {
+      ...options,
       headers: {
         'Content-Type': 'application/json',
         ...(token && { 'Authorization': `Bearer ${token}` }),
         ...options.headers,
       },
-      ...options,
     };
 
     try {
@@ -49,12 +49,23 @@ const api = {
     });
   },
 
-  async generateRoadmap(projectIdea: string) {
+  // Pass the same idempotencyKey when retrying so the server replays the first result
+  async generateRoadmap(projectIdea: string, idempotencyKey?: string) {
     return this.request('/generate', {
       method: 'POST',
+      headers: idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : undefined,
       body: JSON.stringify({ project_idea: projectIdea }),
     });
   },
+
+  // Fetch only the report sections / project fields a view needs
+  async getProject(projectId: number, options: { sections?: string[]; fields?: string[] } = {}) {
+    const params = new URLSearchParams();
+    if (options.sections?.length) params.set('sections', options.sections.join(','));
+    if (options.fields?.length) params.set('fields', options.fields.join(','));
+    const query = params.toString();
+    return this.request(`/project/${projectId}/report${query ? `?${query}` : ''}`);
+  },
 };
 
 // Auth Modal Component
@@ -250,6 +261,8 @@ export default function HomePage() {
   const [loading, setLoading] = useState(false);
   const [results, setResults] = useState<any>(null);
   const [error, setError] = useState('');
+  // Idempotency-Key reused when the same idea is resubmitted after a failure
+  const pendingGeneration = useRef<{ idea: string; key: string } | null>(null);
 
   useEffect(() => {
     // Check if user is logged in on app start
@@ -288,8 +301,14 @@ export default function HomePage() {
     setLoading(true);
     setError('');
 
+    const idea = projectIdea.trim();
+    if (!pendingGeneration.current || pendingGeneration.current.idea !== idea) {
+      pendingGeneration.current = { idea, key: crypto.randomUUID() };
+    }
+
     try {
-      const response = await api.generateRoadmap(projectIdea.trim());
+      const response = await api.generateRoadmap(idea, pendingGeneration.current.key);
+      pendingGeneration.current = null;
       setResults(response);
     } catch (err: any) {
       setError(err.message || 'Failed to generate roadmap. Trying with demo data...');
@@ -0,0 +1,21 @@
+function deleteProject(projectId) {
+    if (confirm('Are you sure you want to delete this project? This action cannot be undone.')) {
+        fetch(`/project/${projectId}/delete`, {
+            method: 'DELETE',
+            headers: {
+                'Content-Type': 'application/json',
+            }
+        })
+        .then(response => {
+            if (response.ok) {
+                location.reload();
+            } else {
+                alert('Failed to delete project');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            alert('Failed to delete project');
+        });
+    }
+}
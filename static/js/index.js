@@ -0,0 +1,250 @@
+// Authentication state
+let currentUser = null;
+let authToken = localStorage.getItem('nexus_token');
+
+// Check authentication on page load
+document.addEventListener('DOMContentLoaded', function() {
+    if (authToken) {
+        validateToken();
+    }
+});
+
+// Modal functions
+function openModal(mode) {
+    const modal = document.getElementById('authModal');
+    const modalTitle = document.getElementById('modalTitle');
+    const modalSubtitle = document.getElementById('modalSubtitle');
+    const loginForm = document.getElementById('loginForm');
+    const registerForm = document.getElementById('registerForm');
+    const authToggleText = document.getElementById('authToggleText');
+
+    clearAlerts();
+
+    if (mode === 'login') {
+        modalTitle.textContent = 'Welcome Back';
+        modalSubtitle.textContent = 'Sign in to continue your journey';
+        loginForm.style.display = 'block';
+        registerForm.style.display = 'none';
+        authToggleText.innerHTML = `Don't have an account? <a href="#" onclick="toggleAuthMode()">Create one now</a>`;
+    } else {
+        modalTitle.textContent = 'Join Nexus';
+        modalSubtitle.textContent = 'Start transforming your ideas today';
+        loginForm.style.display = 'none';
+        registerForm.style.display = 'block';
+        authToggleText.innerHTML = `Already have an account? <a href="#" onclick="toggleAuthMode()">Sign in</a>`;
+    }
+
+    modal.style.display = 'block';
+    document.body.style.overflow = 'hidden';
+}
+
+function closeModal() {
+    const modal = document.getElementById('authModal');
+    modal.style.display = 'none';
+    document.body.style.overflow = 'auto';
+    clearForms();
+}
+
+function toggleAuthMode() {
+    const loginForm = document.getElementById('loginForm');
+    const registerForm = document.getElementById('registerForm');
+    const modalTitle = document.getElementById('modalTitle');
+    const modalSubtitle = document.getElementById('modalSubtitle');
+    const authToggleText = document.getElementById('authToggleText');
+
+    clearAlerts();
+
+    if (loginForm.style.display === 'none') {
+        // Switch to login
+        modalTitle.textContent = 'Welcome Back';
+        modalSubtitle.textContent = 'Sign in to continue your journey';
+        loginForm.style.display = 'block';
+        registerForm.style.display = 'none';
+        authToggleText.innerHTML = `Don't have an account? <a href="#" onclick="toggleAuthMode()">Create one now</a>`;
+    } else {
+        // Switch to register
+        modalTitle.textContent = 'Join Nexus';
+        modalSubtitle.textContent = 'Start transforming your ideas today';
+        loginForm.style.display = 'none';
+        registerForm.style.display = 'block';
+        authToggleText.innerHTML = `Already have an account? <a href="#" onclick="toggleAuthMode()">Sign in</a>`;
+    }
+}
+
+// Authentication handlers
+async function handleAuth(event, type) {
+    event.preventDefault();
+    const form = event.target;
+    const formData = new FormData(form);
+
+    if (type === 'register') {
+        const password = formData.get('password');
+        const confirmPassword = formData.get('confirmPassword');
+
+        if (password !== confirmPassword) {
+            showAlert('Passwords do not match', 'error');
+            return;
+        }
+    }
+
+    try {
+        const response = await fetch(`/auth/${type}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(Object.fromEntries(formData))
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            localStorage.setItem('nexus_token', data.token);
+            authToken = data.token;
+            currentUser = data.user;
+            updateAuthUI();
+            closeModal();
+            showAlert(data.message || 'Authentication successful!', 'success');
+        } else {
+            showAlert(data.message || 'Authentication failed', 'error');
+        }
+    } catch (error) {
+        showAlert('Network error. Please try again.', 'error');
+    }
+}
+
+async function validateToken() {
+    try {
+        const response = await fetch('/auth/validate', {
+            headers: {
+                'Authorization': `Bearer ${authToken}`
+            }
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            currentUser = data.user;
+            updateAuthUI();
+        } else {
+            localStorage.removeItem('nexus_token');
+            authToken = null;
+        }
+    } catch (error) {
+        localStorage.removeItem('nexus_token');
+        authToken = null;
+    }
+}
+
+function logout() {
+    localStorage.removeItem('nexus_token');
+    authToken = null;
+    currentUser = null;
+    updateAuthUI();
+    showAlert('Signed out successfully', 'success');
+}
+
+function updateAuthUI() {
+    const authButtons = document.getElementById('authButtons');
+    const userMenu = document.getElementById('userMenu');
+    const userName = document.getElementById('userName');
+
+    if (currentUser) {
+        authButtons.style.display = 'none';
+        userMenu.style.display = 'flex';
+        userName.textContent = currentUser.name || currentUser.email;
+    } else {
+        authButtons.style.display = 'flex';
+        userMenu.style.display = 'none';
+    }
+}
+
+// Project generation
+// Resubmitting the same idea after a failure reuses the Idempotency-Key,
+// so the server returns the first attempt's project instead of a duplicate
+let pendingGeneration = null;
+
+async function generateProject(event) {
+    event.preventDefault();
+
+    const projectIdea = document.getElementById('projectIdea').value.trim();
+    if (!projectIdea) return;
+
+    if (!authToken) {
+        showAlert('Please sign in to generate projects', 'error');
+        openModal('login');
+        return;
+    }
+
+    if (!pendingGeneration || pendingGeneration.idea !== projectIdea) {
+        pendingGeneration = { idea: projectIdea, key: crypto.randomUUID() };
+    }
+
+    // Show loading
+    document.getElementById('projectForm').style.display = 'none';
+    document.getElementById('loadingState').style.display = 'block';
+
+    try {
+        const response = await fetch('/generate', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${authToken}`,
+                'Idempotency-Key': pendingGeneration.key
+            },
+            body: JSON.stringify({ project_idea: projectIdea })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            pendingGeneration = null;
+            // Redirect to project view
+            window.location.href = `/project/${data.project_id}`;
+        } else {
+            throw new Error(data.message || 'Failed to generate project');
+        }
+    } catch (error) {
+        document.getElementById('projectForm').style.display = 'block';
+        document.getElementById('loadingState').style.display = 'none';
+        showAlert(error.message || 'Failed to generate project. Please try again.', 'error');
+    }
+}
+
+// Utility functions
+function showAlert(message, type) {
+    const alertContainer = document.getElementById('alertContainer');
+    const alert = document.createElement('div');
+    alert.className = `alert alert-${type}`;
+    alert.innerHTML = `
+        <i class="fas fa-${type === 'success' ? 'check-circle' : 'exclamation-circle'}"></i>
+        ${message}
+    `;
+
+    alertContainer.innerHTML = '';
+    alertContainer.appendChild(alert);
+
+    setTimeout(() => {
+        if (alert.parentNode) {
+            alert.parentNode.removeChild(alert);
+        }
+    }, 5000);
+}
+
+function clearAlerts() {
+    document.getElementById('alertContainer').innerHTML = '';
+}
+
+function clearForms() {
+    document.getElementById('loginForm').reset();
+    document.getElementById('registerForm').reset();
+    clearAlerts();
+}
+
+// Close modal on outside click
+window.onclick = function(event) {
+    const modal = document.getElementById('authModal');
+    if (event.target === modal) {
+        closeModal();
+    }
+}
@@ -0,0 +1,181 @@
+const projectId = parseInt(document.body.dataset.projectId);
+let chatVisible = false;
+
+// Toggle chat interface
+function toggleChatInterface() {
+    const chatInterface = document.getElementById('chatInterface');
+    const toggleBtn = document.getElementById('toggleChat');
+    const icon = toggleBtn.querySelector('i');
+    const text = toggleBtn.querySelector('span');
+
+    chatVisible = !chatVisible;
+
+    if (chatVisible) {
+        chatInterface.style.display = 'block';
+        icon.className = 'fas fa-chevron-up';
+        text.textContent = 'Hide Chat';
+        loadConversationHistory();
+    } else {
+        chatInterface.style.display = 'none';
+        icon.className = 'fas fa-chevron-down';
+        text.textContent = 'Show Chat';
+    }
+}
+
+document.getElementById('toggleChat').addEventListener('click', toggleChatInterface);
+
+// Load conversation history
+async function loadConversationHistory() {
+    try {
+        const response = await fetch(`/project/${projectId}/conversations`);
+        const data = await response.json();
+
+        if (data.success && data.conversations.length > 0) {
+            const chatHistory = document.getElementById('chatHistory');
+            chatHistory.innerHTML = '';
+
+            data.conversations.forEach(conv => {
+                addChatMessage(conv.user_message, 'user', conv.created_at);
+                addChatMessage(conv.ai_response, 'ai', conv.created_at, conv.refinements);
+            });
+        }
+    } catch (error) {
+        console.error('Error loading conversation history:', error);
+    }
+}
+
+// Send chat message
+async function sendChatMessage() {
+    const input = document.getElementById('chatInput');
+    const message = input.value.trim();
+
+    if (!message) return;
+
+    // Add user message to chat
+    addChatMessage(message, 'user');
+
+    // Clear input and show loading
+    input.value = '';
+    document.getElementById('chatLoading').style.display = 'block';
+    document.getElementById('sendChatBtn').disabled = true;
+
+    try {
+        const response = await fetch(`/project/${projectId}/chat`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ message: message })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            // Add AI response to chat
+            addChatMessage(data.message, 'ai', null, data.suggestions, data.has_updates);
+
+            // If there are updates, show option to refresh
+            if (data.has_updates) {
+                showUpdateNotification();
+            }
+        } else {
+            addChatMessage(data.error || 'Sorry, I encountered an error. Please try again.', 'ai');
+        }
+    } catch (error) {
+        console.error('Error sending message:', error);
+        addChatMessage('Sorry, I encountered an error. Please try again.', 'ai');
+    } finally {
+        document.getElementById('chatLoading').style.display = 'none';
+        document.getElementById('sendChatBtn').disabled = false;
+    }
+}
+
+// Add message to chat display
+function addChatMessage(message, sender, timestamp = null, suggestions = null, hasUpdates = false) {
+    const chatHistory = document.getElementById('chatHistory');
+
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `chat-message ${sender}`;
+
+    const avatarDiv = document.createElement('div');
+    avatarDiv.className = 'chat-avatar';
+    avatarDiv.innerHTML = sender === 'user' ? '<i class="fas fa-user"></i>' : '<i class="fas fa-robot"></i>';
+
+    const contentDiv = document.createElement('div');
+    contentDiv.className = 'chat-content';
+    contentDiv.innerHTML = message;
+
+    if (hasUpdates) {
+        contentDiv.innerHTML += '<span class="update-badge">Roadmap Updated</span>';
+    }
+
+    // Add suggestions if provided
+    if (suggestions && suggestions.length > 0) {
+        const suggestionsDiv = document.createElement('div');
+        suggestionsDiv.className = 'suggestions-list';
+        suggestionsDiv.innerHTML = '<strong style="color: var(--primary-blue);">💡 Suggestions:</strong>';
+
+        suggestions.forEach(suggestion => {
+            const suggestionDiv = document.createElement('div');
+            suggestionDiv.className = 'suggestion-item';
+            suggestionDiv.textContent = suggestion;
+            suggestionsDiv.appendChild(suggestionDiv);
+        });
+
+        contentDiv.appendChild(suggestionsDiv);
+    }
+
+    messageDiv.appendChild(avatarDiv);
+    messageDiv.appendChild(contentDiv);
+
+    chatHistory.appendChild(messageDiv);
+    chatHistory.scrollTop = chatHistory.scrollHeight;
+}
+
+// Handle keyboard shortcuts
+function handleChatKeydown(event) {
+    if (event.key === 'Enter' && (event.ctrlKey || event.metaKey)) {
+        sendChatMessage();
+    }
+}
+
+// Send suggested questions
+function sendSuggestion(suggestion) {
+    document.getElementById('chatInput').value = suggestion;
+    sendChatMessage();
+}
+
+// Show update notification
+function showUpdateNotification() {
+    const notification = document.createElement('div');
+    notification.style.cssText = `
+        position: fixed;
+        top: 20px;
+        right: 20px;
+        background: var(--success-green);
+        color: white;
+        padding: 1rem 1.5rem;
+        border-radius: 8px;
+        box-shadow: 0 4px 12px rgba(0,0,0,0.3);
+        z-index: 1000;
+        display: flex;
+        align-items: center;
+        gap: 0.5rem;
+    `;
+    notification.innerHTML = `
+        <i class="fas fa-check-circle"></i>
+        <span>Roadmap updated!</span>
+        <button onclick="location.reload()" style="background: none; border: 1px solid white; color: white; padding: 0.3rem 0.8rem; border-radius: 4px; margin-left: 1rem; cursor: pointer;">
+            Refresh to see changes
+        </button>
+    `;
+
+    document.body.appendChild(notification);
+
+    // Auto-remove after 5 seconds
+    setTimeout(() => {
+        if (notification.parentNode) {
+            notification.parentNode.removeChild(notification);
+        }
+    }, 5000);
+}
@@ -0,0 +1,48 @@
+"""Cold-start checks: create_app() stays within budget and imports no provider SDK.
+
+Each probe runs in a fresh interpreter so modules imported by other tests
+cannot hide an eager import. The budget defaults to NEXUS_STARTUP_BUDGET_MS,
+the same setting benchmarks/bench_startup.py uses.
+"""
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_BUDGET_MS = float(os.getenv('NEXUS_STARTUP_BUDGET_MS', '500'))
+STARTUP_RUNS = 3
+
+PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+app.create_app()
+elapsed = time.perf_counter() - started
+report = app.provider_import_report()
+imported = [p['module'] for p in report['providers'] if p['module'] in sys.modules]
+print('NEXUS_STARTUP ' + json.dumps({'seconds': elapsed, 'report': report, 'imported': imported}))
+'''
+
+
+def run_probe(tmp_path):
+    env = dict(os.environ, NEXUS_DB_PATH=str(tmp_path / 'startup.db'))
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True, timeout=60).stdout
+    line = next(l for l in out.splitlines() if l.startswith('NEXUS_STARTUP '))
+    return json.loads(line[len('NEXUS_STARTUP '):])
+
+
+def test_create_app_within_startup_budget(tmp_path):
+    # Best of a few runs, so one slow run on a busy machine does not fail the check
+    best_ms = min(run_probe(tmp_path)['seconds'] for _ in range(STARTUP_RUNS)) * 1000
+    assert best_ms <= STARTUP_BUDGET_MS, f"startup {best_ms:.1f} ms exceeds budget {STARTUP_BUDGET_MS:.0f} ms"
+
+
+def test_create_app_loads_no_provider(tmp_path):
+    sample = run_probe(tmp_path)
+    providers = sample['report']['providers']
+    assert providers
+    eager = [p['name'] for p in providers if p['loaded'] or p['loaded_at'] is not None]
+    assert not eager, f"providers imported during startup: {', '.join(eager)}"
+    assert not sample['imported'], f"provider modules in sys.modules: {', '.join(sample['imported'])}"
@@ -0,0 +1,8 @@
+"""Production WSGI entry point for Nexus.
+
+Run with:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+
+app = create_app()